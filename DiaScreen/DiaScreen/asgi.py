@@ -3,6 +3,10 @@ ASGI config for DiaScreen project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project with an ASGI server (uvicorn, daphne) so that the notification
+long-poll endpoint (``/api/notifications/wait/``) waits on the event loop instead
+of holding a worker thread per open tab.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
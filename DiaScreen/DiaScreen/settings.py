@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     'card.apps.CardConfig',
     'analytic.apps.AnalyticConfig',
     'support.apps.SupportConfig',
+    'scheduler.apps.SchedulerConfig',
 ]
 
 AUTH_USER_MODEL = 'user_auth.User'
@@ -250,7 +251,8 @@ LOGGING = {
 LOGS_DIR = BASE_DIR / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
 
-# Cache configuration for rate limiting
+# Cache configuration for rate limiting and notification versions.
+# Use a shared backend (e.g. Redis) in production so every worker sees the same versions.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -258,4 +260,86 @@ CACHES = {
     }
 }
 
-
+# Notification long-poll (served by the ASGI application in DiaScreen/asgi.py)
+NOTIFICATIONS_LONG_POLL_TIMEOUT = int(os.getenv('NOTIFICATIONS_LONG_POLL_TIMEOUT', '25'))
+NOTIFICATIONS_LONG_POLL_INTERVAL = float(os.getenv('NOTIFICATIONS_LONG_POLL_INTERVAL', '1.0'))
+NOTIFICATIONS_UNREAD_COUNT_TTL = int(os.getenv('NOTIFICATIONS_UNREAD_COUNT_TTL', '3600'))
+
+# Glucose threshold alerts (evaluated in batches by user_auth.alerts)
+GLUCOSE_ALERTS_BACKGROUND_FLUSH = os.getenv('GLUCOSE_ALERTS_BACKGROUND_FLUSH', 'True').lower() == 'true'
+GLUCOSE_ALERTS_FLUSH_DELAY = float(os.getenv('GLUCOSE_ALERTS_FLUSH_DELAY', '2.0'))
+GLUCOSE_ALERTS_BATCH_SIZE = int(os.getenv('GLUCOSE_ALERTS_BATCH_SIZE', '1000'))
+GLUCOSE_ALERTS_DEDUP_MINUTES = int(os.getenv('GLUCOSE_ALERTS_DEDUP_MINUTES', '60'))
+GLUCOSE_ALERTS_MAX_DELAY_MINUTES = int(os.getenv('GLUCOSE_ALERTS_MAX_DELAY_MINUTES', '360'))
+# Readings are consumed only once this old, so transactions that commit late are not skipped.
+GLUCOSE_ALERTS_SETTLE_SECONDS = int(os.getenv('GLUCOSE_ALERTS_SETTLE_SECONDS', '10'))
+
+# Home page statistics (sharded counters in user_auth.stats)
+SITE_COUNTER_SHARDS = int(os.getenv('SITE_COUNTER_SHARDS', '8'))
+SITE_COUNTER_RECONCILE_TOLERANCE = float(os.getenv('SITE_COUNTER_RECONCILE_TOLERANCE', '0.05'))
+SITE_STATS_CACHE_TTL = int(os.getenv('SITE_STATS_CACHE_TTL', '300'))
+
+# Patient card history API (keyset pagination in card.history)
+CARD_HISTORY_PAGE_SIZE = int(os.getenv('CARD_HISTORY_PAGE_SIZE', '50'))
+CARD_HISTORY_MAX_PAGE_SIZE = int(os.getenv('CARD_HISTORY_MAX_PAGE_SIZE', '200'))
+
+# Unified logbook (streaming k-way merge in card.logbook)
+LOGBOOK_PAGE_SIZE = int(os.getenv('LOGBOOK_PAGE_SIZE', '100'))
+LOGBOOK_MAX_PAGE_SIZE = int(os.getenv('LOGBOOK_MAX_PAGE_SIZE', '500'))
+LOGBOOK_CHUNK_SIZE = int(os.getenv('LOGBOOK_CHUNK_SIZE', '500'))
+
+# Glucose meter history import (card.imports)
+GLUCOSE_IMPORT_BATCH_SIZE = int(os.getenv('GLUCOSE_IMPORT_BATCH_SIZE', '2000'))
+GLUCOSE_IMPORT_MAX_REPORTED_ERRORS = int(os.getenv('GLUCOSE_IMPORT_MAX_REPORTED_ERRORS', '100'))
+
+# CGM batch ingestion (card.cgm)
+CGM_MAX_BATCH_SIZE = int(os.getenv('CGM_MAX_BATCH_SIZE', '2000'))
+CGM_BULK_BATCH_SIZE = int(os.getenv('CGM_BULK_BATCH_SIZE', '1000'))
+CGM_MAX_CONCURRENT_WRITES = int(os.getenv('CGM_MAX_CONCURRENT_WRITES', '4'))
+CGM_WRITE_WAIT_SECONDS = float(os.getenv('CGM_WRITE_WAIT_SECONDS', '0.5'))
+CGM_RETRY_AFTER_SECONDS = int(os.getenv('CGM_RETRY_AFTER_SECONDS', '5'))
+
+# Packed per-day glucose series for analytics (card.series). After enabling, run
+# `python manage.py rebuild_glucose_series` once to pack the existing history; until it
+# finishes, analytics keep reading the raw rows.
+GLUCOSE_DAY_SERIES_ENABLED = os.getenv('GLUCOSE_DAY_SERIES_ENABLED', 'False').lower() == 'true'
+
+# Monthly partitioning of measurement tables on PostgreSQL (card.partitioning, manage_partitions command)
+MEASUREMENT_PARTITIONING_ENABLED = os.getenv('MEASUREMENT_PARTITIONING_ENABLED', 'False').lower() == 'true'
+MEASUREMENT_PARTITIONS_AHEAD = int(os.getenv('MEASUREMENT_PARTITIONS_AHEAD', '3'))
+
+# Full-history measurement export (card.exports)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Food catalog autocomplete (in-memory index in card.foods)
+FOOD_AUTOCOMPLETE_LIMIT = int(os.getenv('FOOD_AUTOCOMPLETE_LIMIT', '10'))
+FOOD_AUTOCOMPLETE_MAX_LIMIT = int(os.getenv('FOOD_AUTOCOMPLETE_MAX_LIMIT', '50'))
+
+# Nutrition table loader (card.foods.load_food_items, load_food_items command)
+FOOD_LOAD_BATCH_SIZE = int(os.getenv('FOOD_LOAD_BATCH_SIZE', '5000'))
+
+# Staff cohort dashboard (analytic.cohort)
+COHORT_CACHE_TTL = int(os.getenv('COHORT_CACHE_TTL', '300'))
+COHORT_PAGE_SIZE = int(os.getenv('COHORT_PAGE_SIZE', '50'))
+
+# Nightly patient risk scoring (analytic.risk, compute_risk_scores command)
+RISK_SCORING_DAYS = int(os.getenv('RISK_SCORING_DAYS', '28'))
+RISK_SCORING_WORKERS = int(os.getenv('RISK_SCORING_WORKERS', '4'))
+RISK_SCORING_PARTITION_SIZE = int(os.getenv('RISK_SCORING_PARTITION_SIZE', '200'))
+RISK_SCORING_CHUNK_SIZE = int(os.getenv('RISK_SCORING_CHUNK_SIZE', '2000'))
+
+# Periodic maintenance jobs declared in AppConfig.scheduled_jobs (scheduler app, run_scheduler command)
+SCHEDULER_TICK_SECONDS = int(os.getenv('SCHEDULER_TICK_SECONDS', '30'))
+
+# Daily glycemic profiles derived from glucose readings (card.profiles, scheduled job card.glycemic_profiles)
+GLYCEMIC_PROFILES_BATCH_SIZE = int(os.getenv('GLYCEMIC_PROFILES_BATCH_SIZE', '5000'))
+# Must exceed the longest transaction that inserts glucose readings (e.g. a bulk import).
+GLYCEMIC_PROFILES_SETTLE_SECONDS = int(os.getenv('GLYCEMIC_PROFILES_SETTLE_SECONDS', '900'))
+
+# Hypo/hyperglycemia episode detection (analytic.episodes, scheduled job analytic.glycemic_episodes)
+GLYCEMIC_EPISODE_MIN_MINUTES = int(os.getenv('GLYCEMIC_EPISODE_MIN_MINUTES', '15'))
+GLYCEMIC_EPISODE_MERGE_MINUTES = int(os.getenv('GLYCEMIC_EPISODE_MERGE_MINUTES', '15'))
+GLYCEMIC_EPISODE_MAX_GAP_MINUTES = int(os.getenv('GLYCEMIC_EPISODE_MAX_GAP_MINUTES', '60'))
+GLYCEMIC_EPISODES_BATCH_SIZE = int(os.getenv('GLYCEMIC_EPISODES_BATCH_SIZE', '5000'))
+# Must exceed the longest transaction that inserts glucose readings (e.g. a bulk import).
+GLYCEMIC_EPISODES_SETTLE_SECONDS = int(os.getenv('GLYCEMIC_EPISODES_SETTLE_SECONDS', '900'))
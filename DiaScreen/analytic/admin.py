@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GlycemicEpisode, PatientRiskScore
+
+
+@admin.register(PatientRiskScore)
+class PatientRiskScoreAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'score', 'hypo_percent', 'nocturnal_hypo_episodes', 'cv', 'cv_trend', 'days_without_data', 'computed_at')
+    search_fields = ('patient__user__username',)
+    readonly_fields = ('computed_at',)
+
+
+@admin.register(GlycemicEpisode)
+class GlycemicEpisodeAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'kind', 'started_at', 'ended_at', 'duration_minutes', 'extreme_glucose', 'reading_count')
+    list_filter = ('kind',)
+    search_fields = ('patient__user__username',)
+    date_hierarchy = 'started_at'
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AnalyticConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytic'
+    scheduled_jobs = [
+        {'name': 'analytic.risk_scores', 'func': 'analytic.risk.run_risk_scoring', 'cron': '30 2 * * *', 'timeout': 4 * 3600},
+        {'name': 'analytic.glycemic_episodes', 'func': 'analytic.episodes.update_glycemic_episodes', 'every': 300},
+    ]
@@ -0,0 +1,240 @@
+"""
+Cohort summary of glucose control across all patients.
+
+Every metric of the cohort table comes from one grouped aggregate: patients
+are joined to their readings of the period through a ``FilteredRelation``
+(so patients without readings still appear) and counted, averaged and
+bucketed in SQL. The resulting rows are cached per period; sorting,
+filtering and keyset pagination run over the cached list, so paging through
+ten thousand patients never goes back to the measurement tables. The
+nightly ``PatientRiskScore`` is joined in as well, so the table can be
+ranked by risk.
+"""
+import base64
+import binascii
+import json
+import math
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    F,
+    FilteredRelation,
+    FloatField,
+    Max,
+    Q,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from user_auth.models import Patient
+
+PERIODS = {
+    '7': (7, '7 днів'),
+    '30': (30, '30 днів'),
+    '90': (90, '90 днів'),
+    '365': (365, '1 рік'),
+}
+DEFAULT_PERIOD = '7'
+
+HYPO_THRESHOLD = Decimal('3.9')
+DEFAULT_TARGET_MIN = Decimal('4.0')
+DEFAULT_TARGET_MAX = Decimal('9.0')
+
+COHORT_CACHE_KEY = 'analytic:cohort:{period}:{end}'
+
+SORT_FIELDS = {
+    'name': 'name_key',
+    'tir': 'tir_percent',
+    'mean': 'mean',
+    'cv': 'cv',
+    'hypo': 'hypo_percent',
+    'last': 'last_reading_key',
+    'count': 'reading_count',
+    'risk': 'risk_score',
+}
+DEFAULT_SORT = 'name'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def resolve_period(period, today=None):
+    """Return ``(period, start_date, end_date, label)``; unknown periods fall back to 7 days."""
+    if period not in PERIODS:
+        period = DEFAULT_PERIOD
+    days, label = PERIODS[period]
+    today = today or timezone.localdate()
+    return period, today - timedelta(days=days - 1), today, label
+
+
+def compute_cohort(start, end):
+    """Per-patient glucose metrics for ``start..end`` in one grouped query."""
+    target_field = DecimalField(max_digits=4, decimal_places=1)
+    target_min = Coalesce(F('target_glucose_min'), Value(DEFAULT_TARGET_MIN), output_field=target_field)
+    target_max = Coalesce(F('target_glucose_max'), Value(DEFAULT_TARGET_MAX), output_field=target_field)
+
+    rows = (
+        Patient.objects.exclude(Q(user__is_staff=True) | Q(user__is_superuser=True))
+        .annotate(
+            period_glucose=FilteredRelation(
+                'glucosemeasurement',
+                condition=Q(glucosemeasurement__date_of_measurement__range=(start, end)),
+            )
+        )
+        .values(
+            'pk',
+            'diabetes_type',
+            'user__username',
+            'user__first_name',
+            'user__last_name',
+            'risk_score__score',
+        )
+        .annotate(
+            reading_count=Count('period_glucose__id'),
+            glucose_mean=Avg('period_glucose__glucose', output_field=FloatField()),
+            glucose_square_mean=Avg(
+                F('period_glucose__glucose') * F('period_glucose__glucose'),
+                output_field=FloatField(),
+            ),
+            in_range_count=Count(
+                'period_glucose__id',
+                filter=Q(period_glucose__glucose__gte=target_min, period_glucose__glucose__lte=target_max),
+            ),
+            hypo_count=Count('period_glucose__id', filter=Q(period_glucose__glucose__lt=HYPO_THRESHOLD)),
+            last_reading=Max('period_glucose__measured_at'),
+        )
+        .order_by()
+    )
+    return [_summary(row) for row in rows]
+
+
+def _summary(row):
+    count = row['reading_count']
+    name = ' '.join(part for part in (row['user__first_name'], row['user__last_name']) if part) or row['user__username']
+    summary = {
+        'patient_id': row['pk'],
+        'name': name,
+        'name_key': name.casefold(),
+        'username': row['user__username'],
+        'diabetes_type': row['diabetes_type'],
+        'reading_count': count,
+        'risk_score': row['risk_score__score'],
+        'mean': None,
+        'cv': None,
+        'tir_percent': None,
+        'hypo_percent': None,
+        'last_reading': row['last_reading'],
+        'last_reading_key': row['last_reading'].isoformat() if row['last_reading'] else None,
+    }
+    if count:
+        mean = float(row['glucose_mean'])
+        sd = 0.0
+        if count > 1:
+            # Sample SD from E[x] and E[x^2]; clamp the float noise of near-constant series.
+            variance = (float(row['glucose_square_mean']) - mean * mean) * count / (count - 1)
+            sd = math.sqrt(max(variance, 0.0))
+        summary.update({
+            'mean': round(mean, 2),
+            'cv': round(sd / mean * 100, 1) if mean > 0 else 0.0,
+            'tir_percent': round(row['in_range_count'] / count * 100, 1),
+            'hypo_percent': round(row['hypo_count'] / count * 100, 1),
+        })
+    return summary
+
+
+def get_cohort(period, today=None):
+    """Cached cohort rows of a period, recomputed at most once per ``COHORT_CACHE_TTL``."""
+    period, start, end, _ = resolve_period(period, today)
+    key = COHORT_CACHE_KEY.format(period=period, end=end.isoformat())
+    rows = cache.get(key)
+    if rows is None:
+        rows = compute_cohort(start, end)
+        cache.set(key, rows, timeout=getattr(settings, 'COHORT_CACHE_TTL', 300))
+    return rows
+
+
+def filter_cohort(rows, query=None, diabetes_type=None, tir_below=None, with_readings=False):
+    query = (query or '').strip().casefold()
+    selected = []
+    for row in rows:
+        if query and query not in row['name_key'] and query not in row['username'].casefold():
+            continue
+        if diabetes_type and row['diabetes_type'] != diabetes_type:
+            continue
+        if tir_below is not None and (row['tir_percent'] is None or row['tir_percent'] >= tir_below):
+            continue
+        if with_readings and not row['reading_count']:
+            continue
+        selected.append(row)
+    return selected
+
+
+def parse_sort(sort):
+    """Split ``'-tir'`` into ``('tir', True)``; unknown fields sort by name."""
+    descending = bool(sort) and sort.startswith('-')
+    field = (sort or '').lstrip('-')
+    if field not in SORT_FIELDS:
+        return DEFAULT_SORT, False
+    return field, descending
+
+
+def _sort_key(row, field, descending):
+    value = row[SORT_FIELDS[field]]
+    # Patients without data go last in either direction.
+    missing = value is None
+    return (not missing if descending else missing, 0 if missing else value, row['patient_id'])
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if not isinstance(key, list) or len(key) != 3:
+        raise InvalidCursor('Malformed cursor')
+    return tuple(key)
+
+
+def cohort_page(rows, sort=None, cursor=None, limit=None):
+    """
+    One page of ``rows`` in the requested order, continuing after ``cursor``.
+
+    Returns ``(page_rows, next_cursor)``. Rows are ordered by their sort key in
+    ascending order and descending pages are read from the end, so both
+    directions find the cursor position with a binary search.
+    """
+    limit = limit or getattr(settings, 'COHORT_PAGE_SIZE', 50)
+    field, descending = parse_sort(sort)
+    keys = sorted((_sort_key(row, field, descending), index) for index, row in enumerate(rows))
+    ordered_keys = [key for key, _ in keys]
+
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        if descending:
+            end = len(keys) if after is None else bisect_left(ordered_keys, after)
+            selected = keys[max(end - limit, 0):end][::-1]
+            has_more = end - limit > 0
+        else:
+            start = 0 if after is None else bisect_right(ordered_keys, after)
+            selected = keys[start:start + limit]
+            has_more = start + limit < len(keys)
+    except TypeError as exc:
+        # A cursor issued for a different sort field.
+        raise InvalidCursor(str(exc)) from exc
+
+    page = [rows[index] for _, index in selected]
+    next_cursor = encode_cursor(list(selected[-1][0])) if has_more and selected else None
+    return page, next_cursor
@@ -0,0 +1,262 @@
+"""
+Hypo- and hyperglycemia episodes detected from per-patient glucose series.
+
+``detect_episodes`` works on one sorted series with run-length encoding over
+a threshold mask, entirely in numpy: runs are split where the readings are
+further apart than ``max_gap`` minutes, runs separated by no more than
+``merge_gap`` minutes back in range are merged, and episodes shorter than
+``min_duration`` are dropped. An episode ends at the first reading back in
+range when it follows within ``max_gap``, otherwise at its last reading.
+
+``update_glycemic_episodes`` keeps ``GlycemicEpisode`` current: it follows a
+``ProcessingCursor`` over settled ``GlucoseMeasurement`` primary keys (see
+``user_auth.outbox``) and re-detects only the window of days around newly
+inserted readings, widened to cover the stored episodes it overlaps.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from card.models import GlucoseMeasurement
+from card.series import load_glucose_series
+from user_auth.outbox import consume_new_rows
+
+from .models import GlycemicEpisode
+
+GLYCEMIC_EPISODES_CURSOR = 'glycemic_episodes'
+
+# kind: (threshold in mmol/L, True when the episode lies below it)
+EPISODE_THRESHOLDS = {
+    GlycemicEpisode.KIND_HYPO: (3.9, True),
+    GlycemicEpisode.KIND_SEVERE_HYPO: (3.0, True),
+    GlycemicEpisode.KIND_HYPER: (10.0, False),
+}
+
+EPOCH = datetime(1970, 1, 1)
+TWO_PLACES = Decimal('0.01')
+
+
+def _detection_settings():
+    return {
+        'min_duration': getattr(settings, 'GLYCEMIC_EPISODE_MIN_MINUTES', 15),
+        'merge_gap': getattr(settings, 'GLYCEMIC_EPISODE_MERGE_MINUTES', 15),
+        'max_gap': getattr(settings, 'GLYCEMIC_EPISODE_MAX_GAP_MINUTES', 60),
+    }
+
+
+def series_minutes(days, minutes):
+    """Local wall-clock minutes since the epoch for ``load_glucose_series`` arrays."""
+    return days.astype('datetime64[m]').astype(np.int64) + minutes
+
+
+def _to_minutes(moment):
+    return (timezone.localtime(moment).replace(tzinfo=None) - EPOCH) // timedelta(minutes=1)
+
+
+def _to_datetime(minutes):
+    return timezone.make_aware(EPOCH + timedelta(minutes=int(minutes)))
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def detect_episodes(times, values, threshold, below, min_duration=15, merge_gap=15, max_gap=60):
+    """
+    Episodes of ``values`` below (or above) ``threshold`` in a series sorted by ``times`` (minutes).
+
+    Returns a dict of equal-length arrays: ``start``, ``end``, ``extreme``
+    (nadir or peak), ``extreme_time`` and ``count`` (readings in the episode).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    empty = {
+        'start': np.array([], dtype=np.int64),
+        'end': np.array([], dtype=np.int64),
+        'extreme': np.array([], dtype=np.float64),
+        'extreme_time': np.array([], dtype=np.int64),
+        'count': np.array([], dtype=np.int64),
+    }
+    size = len(values)
+    if not size:
+        return empty
+
+    mask = values < threshold if below else values > threshold
+    linked = np.diff(times) <= max_gap
+    continues_from_previous = np.concatenate(([False], mask[:-1] & linked))
+    continues_to_next = np.concatenate((mask[1:] & linked, [False]))
+    starts = np.flatnonzero(mask & ~continues_from_previous)
+    ends = np.flatnonzero(mask & ~continues_to_next)
+    if not len(starts):
+        return empty
+
+    # Short returns to range do not end an episode.
+    if len(starts) > 1:
+        split = (times[starts[1:]] - times[ends[:-1]]) > merge_gap
+        starts = starts[np.concatenate(([True], split))]
+        ends = ends[np.concatenate((split, [True]))]
+
+    following = np.minimum(ends + 1, size - 1)
+    closed = (ends + 1 < size) & (times[following] - times[ends] <= max_gap)
+    end_times = np.where(closed, times[following], times[ends])
+    keep = end_times - times[starts] >= min_duration
+    starts, ends, end_times = starts[keep], ends[keep], end_times[keep]
+    if not len(starts):
+        return empty
+
+    # Flat indices of every reading inside the episodes, grouped by episode.
+    lengths = ends - starts + 1
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+    episode_values = values[positions]
+    reduce = np.minimum if below else np.maximum
+    extremes = reduce.reduceat(episode_values, offsets)
+    # Stable sort by (episode, value) puts each episode's earliest extreme first.
+    order = np.lexsort((episode_values if below else -episode_values, np.repeat(np.arange(len(starts)), lengths)))
+    extreme_times = times[positions[order[offsets]]]
+
+    return {
+        'start': times[starts],
+        'end': end_times,
+        'extreme': extremes,
+        'extreme_time': extreme_times,
+        'count': lengths,
+    }
+
+
+def build_episodes(patient_id, times, values, **options):
+    """Unsaved ``GlycemicEpisode`` objects of every kind for one patient's series."""
+    options = {**_detection_settings(), **options}
+    episodes = []
+    for kind, (threshold, below) in EPISODE_THRESHOLDS.items():
+        found = detect_episodes(times, values, threshold, below, **options)
+        for start, end, extreme, extreme_time, count in zip(
+            found['start'], found['end'], found['extreme'], found['extreme_time'], found['count']
+        ):
+            episodes.append(GlycemicEpisode(
+                patient_id=patient_id,
+                kind=kind,
+                started_at=_to_datetime(start),
+                ended_at=_to_datetime(end),
+                duration_minutes=int(end - start),
+                extreme_glucose=Decimal(float(extreme)).quantize(TWO_PLACES),
+                extreme_at=_to_datetime(extreme_time),
+                reading_count=int(count),
+            ))
+    return episodes
+
+
+def redetect_patient(patient_id, first_day, last_day):
+    """
+    Replace the patient's episodes around ``first_day``..``last_day``.
+
+    The window grows to the start and end of stored episodes that overlap it,
+    so an episode spanning the edge is rebuilt as a whole. Returns
+    ``(created, deleted)``.
+    """
+    window_start = _day_start(first_day)
+    window_end = _day_start(last_day + timedelta(days=1))
+    overlapping = GlycemicEpisode.objects.filter(
+        patient_id=patient_id,
+        ended_at__gte=window_start,
+        started_at__lt=window_end,
+    ).aggregate(first_start=Min('started_at'), last_end=Max('ended_at'))
+    if overlapping['first_start'] is not None:
+        window_start = min(window_start, overlapping['first_start'])
+        window_end = max(window_end, overlapping['last_end'])
+
+    # One extra day after the window lets an episode crossing its end finish.
+    days, minutes, values = load_glucose_series(
+        patient_id,
+        timezone.localtime(window_start).date(),
+        timezone.localtime(window_end).date() + timedelta(days=1),
+    )
+    episodes = [
+        episode
+        for episode in build_episodes(patient_id, series_minutes(days, minutes), values)
+        if window_start <= episode.started_at < window_end
+    ]
+    deleted, _ = GlycemicEpisode.objects.filter(
+        patient_id=patient_id,
+        started_at__gte=window_start,
+        started_at__lt=window_end,
+    ).delete()
+    GlycemicEpisode.objects.bulk_create(episodes)
+    return len(episodes), deleted
+
+
+def update_glycemic_episodes(batch_size=None):
+    """
+    Re-detect episodes around the readings inserted since the last run.
+
+    Returns the number of episodes written.
+    """
+    def redetect(rows):
+        days_by_patient = defaultdict(set)
+        for _, patient_id, day in rows:
+            days_by_patient[patient_id].add(day)
+
+        written = 0
+        for patient_id, days in days_by_patient.items():
+            # A reading can open an episode the day before or close one the day after.
+            created, _ = redetect_patient(
+                patient_id,
+                min(days) - timedelta(days=1),
+                max(days) + timedelta(days=1),
+            )
+            written += created
+        return written
+
+    return sum(consume_new_rows(
+        GLYCEMIC_EPISODES_CURSOR,
+        GlucoseMeasurement.objects.all(),
+        ['patient_id', 'date_of_measurement'],
+        redetect,
+        batch_size=batch_size or getattr(settings, 'GLYCEMIC_EPISODES_BATCH_SIZE', 5000),
+        settle_seconds=getattr(settings, 'GLYCEMIC_EPISODES_SETTLE_SECONDS', 900),
+    ))
+
+
+def episode_summary(patient, start_date, end_date):
+    """Per-kind episode counts and durations for episodes starting in the date range."""
+    rows = {
+        row['kind']: row
+        for row in (
+            GlycemicEpisode.objects.filter(
+                patient=patient,
+                started_at__gte=_day_start(start_date),
+                started_at__lt=_day_start(end_date + timedelta(days=1)),
+            )
+            .values('kind')
+            .annotate(
+                episodes=Count('id'),
+                total_minutes=Sum('duration_minutes'),
+                longest_minutes=Max('duration_minutes'),
+                lowest=Min('extreme_glucose'),
+                highest=Max('extreme_glucose'),
+            )
+            .order_by()
+        )
+    }
+    summary = []
+    for kind, label in GlycemicEpisode.KIND_CHOICES:
+        row = rows.get(kind)
+        if row is None:
+            summary.append({'kind': kind, 'label': label, 'episodes': 0})
+            continue
+        below = EPISODE_THRESHOLDS[kind][1]
+        summary.append({
+            'kind': kind,
+            'label': label,
+            'episodes': row['episodes'],
+            'total_minutes': row['total_minutes'],
+            'average_minutes': round(row['total_minutes'] / row['episodes']),
+            'longest_minutes': row['longest_minutes'],
+            'extreme': row['lowest'] if below else row['highest'],
+        })
+    return summary
@@ -0,0 +1,42 @@
+"""
+Django management command для нічного розрахунку показників ризику пацієнтів.
+
+Використання:
+    python manage.py compute_risk_scores
+    python manage.py compute_risk_scores --days 28 --workers 8 --partition-size 500
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytic.risk import run_risk_scoring
+
+
+class Command(BaseCommand):
+    help = 'Розраховує показники ризику (гіпоглікемії, нічні епізоди, варіабельність, пропуски даних) для всіх пацієнтів'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Тривалість періоду аналізу в днях')
+        parser.add_argument('--workers', type=int, default=None, help='Кількість процесів (1 — без пулу процесів)')
+        parser.add_argument('--partition-size', type=int, default=None, help='Кількість пацієнтів в одному завданні процесу')
+
+    def handle(self, *args, **options):
+        for option in ('days', 'workers', 'partition_size'):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"Значення --{option.replace('_', '-')} має бути додатним")
+
+        started = time.monotonic()
+
+        def progress(scored, total):
+            self.stdout.write(f'Оброблено пацієнтів: {scored} з {total}')
+
+        scored = run_risk_scoring(
+            days=options['days'],
+            workers=options['workers'],
+            partition_size=options['partition_size'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Розраховано оцінок ризику: {scored}, час: {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='Початок періоду')),
+                ('period_end', models.DateField(verbose_name='Кінець періоду')),
+                ('reading_count', models.PositiveIntegerField(default=0, verbose_name='Кількість замірів')),
+                ('hypo_percent', models.FloatField(default=0, verbose_name='Частка гіпоглікемій (%)')),
+                ('nocturnal_hypo_episodes', models.PositiveIntegerField(default=0, verbose_name='Нічні епізоди гіпоглікемії')),
+                ('cv', models.FloatField(blank=True, null=True, verbose_name='Варіабельність CV (%)')),
+                ('cv_trend', models.FloatField(blank=True, help_text='CV другої половини періоду мінус CV першої; додатне значення — варіабельність зростає', null=True, verbose_name='Зміна CV (п.п.)')),
+                ('days_without_data', models.PositiveIntegerField(default=0, verbose_name='Днів без замірів')),
+                ('longest_gap_hours', models.FloatField(default=0, verbose_name='Найдовша перерва (год)')),
+                ('score', models.FloatField(db_index=True, default=0, verbose_name='Оцінка ризику')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Розраховано')),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to='user_auth.patient')),
+            ],
+            options={
+                'verbose_name': 'Оцінка ризику пацієнта',
+                'verbose_name_plural': 'Оцінки ризику пацієнтів',
+                'ordering': ['-score'],
+            },
+        ),
+    ]
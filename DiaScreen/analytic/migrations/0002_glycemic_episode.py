@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytic', '0001_initial'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlycemicEpisode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hypo', 'Гіпоглікемія (< 3.9 ммоль/л)'), ('severe_hypo', 'Критична гіпоглікемія (< 3.0 ммоль/л)'), ('hyper', 'Гіперглікемія (> 10.0 ммоль/л)')], max_length=16, verbose_name='Тип епізоду')),
+                ('started_at', models.DateTimeField(verbose_name='Початок')),
+                ('ended_at', models.DateTimeField(verbose_name='Кінець')),
+                ('duration_minutes', models.PositiveIntegerField(verbose_name='Тривалість (хв)')),
+                ('extreme_glucose', models.DecimalField(decimal_places=2, help_text='Найнижче значення для гіпоглікемії, найвище — для гіперглікемії', max_digits=4, verbose_name='Екстремум (ммоль/л)')),
+                ('extreme_at', models.DateTimeField(verbose_name='Час екстремуму')),
+                ('reading_count', models.PositiveIntegerField(verbose_name='Кількість замірів')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glycemic_episodes', to='user_auth.patient')),
+            ],
+            options={
+                'verbose_name': 'Епізод глікемії',
+                'verbose_name_plural': 'Епізоди глікемії',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['patient', 'started_at'], name='glycemic_episode_patient_idx')],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'kind', 'started_at'), name='unique_glycemic_episode_start')],
+            },
+        ),
+    ]
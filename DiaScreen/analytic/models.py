@@ -1,3 +1,79 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from user_auth.models import Patient
+
+
+class PatientRiskScore(models.Model):
+    """
+    Precomputed glucose risk indicators of a patient, refreshed by the
+    ``compute_risk_scores`` command (see ``analytic.risk``)
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, related_name='risk_score')
+    period_start = models.DateField(verbose_name='Початок періоду')
+    period_end = models.DateField(verbose_name='Кінець періоду')
+    reading_count = models.PositiveIntegerField(default=0, verbose_name='Кількість замірів')
+    hypo_percent = models.FloatField(default=0, verbose_name='Частка гіпоглікемій (%)')
+    nocturnal_hypo_episodes = models.PositiveIntegerField(default=0, verbose_name='Нічні епізоди гіпоглікемії')
+    cv = models.FloatField(null=True, blank=True, verbose_name='Варіабельність CV (%)')
+    cv_trend = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Зміна CV (п.п.)',
+        help_text='CV другої половини періоду мінус CV першої; додатне значення — варіабельність зростає',
+    )
+    days_without_data = models.PositiveIntegerField(default=0, verbose_name='Днів без замірів')
+    longest_gap_hours = models.FloatField(default=0, verbose_name='Найдовша перерва (год)')
+    score = models.FloatField(default=0, db_index=True, verbose_name='Оцінка ризику')
+    computed_at = models.DateTimeField(default=timezone.now, verbose_name='Розраховано')
+
+    class Meta:
+        verbose_name = 'Оцінка ризику пацієнта'
+        verbose_name_plural = 'Оцінки ризику пацієнтів'
+        ordering = ['-score']
+
+    def __str__(self):
+        return f'{self.patient}: {self.score:.1f}'
+
+
+class GlycemicEpisode(models.Model):
+    """
+    A continuous stretch of readings below or above a glycemic threshold,
+    maintained by ``analytic.episodes.update_glycemic_episodes``
+    """
+    KIND_HYPO = 'hypo'
+    KIND_SEVERE_HYPO = 'severe_hypo'
+    KIND_HYPER = 'hyper'
+    KIND_CHOICES = [
+        (KIND_HYPO, 'Гіпоглікемія (< 3.9 ммоль/л)'),
+        (KIND_SEVERE_HYPO, 'Критична гіпоглікемія (< 3.0 ммоль/л)'),
+        (KIND_HYPER, 'Гіперглікемія (> 10.0 ммоль/л)'),
+    ]
+
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='glycemic_episodes')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, verbose_name='Тип епізоду')
+    started_at = models.DateTimeField(verbose_name='Початок')
+    ended_at = models.DateTimeField(verbose_name='Кінець')
+    duration_minutes = models.PositiveIntegerField(verbose_name='Тривалість (хв)')
+    extreme_glucose = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        verbose_name='Екстремум (ммоль/л)',
+        help_text='Найнижче значення для гіпоглікемії, найвище — для гіперглікемії',
+    )
+    extreme_at = models.DateTimeField(verbose_name='Час екстремуму')
+    reading_count = models.PositiveIntegerField(verbose_name='Кількість замірів')
+
+    class Meta:
+        verbose_name = 'Епізод глікемії'
+        verbose_name_plural = 'Епізоди глікемії'
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'kind', 'started_at'], name='unique_glycemic_episode_start'),
+        ]
+        indexes = [
+            models.Index(fields=['patient', 'started_at'], name='glycemic_episode_patient_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.patient}: {self.get_kind_display()} {self.started_at:%d.%m.%Y %H:%M}'
@@ -0,0 +1,235 @@
+"""
+Per-patient glucose risk indicators for staff triage.
+
+``run_risk_scoring`` splits the patient list into partitions and scores them
+in a ``ProcessPoolExecutor``. Every worker opens its own database connection
+and streams one patient's readings at a time with ``.iterator()``, so a
+worker holds the running sums of a single patient rather than the readings.
+Results come back to the parent, which writes them in batches with
+``bulk_create``/``bulk_update`` into ``PatientRiskScore``.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from card.models import GlucoseMeasurement, combine_measured_at
+from user_auth.models import Patient
+
+from .models import PatientRiskScore
+
+HYPO_THRESHOLD = Decimal('3.9')
+NIGHT_START_HOUR = 0
+NIGHT_END_HOUR = 6
+
+# Scale of each component: the value at which it contributes its full weight.
+HYPO_PERCENT_LIMIT = 4.0
+NOCTURNAL_EPISODES_LIMIT = 4
+CV_STABLE = 36.0
+CV_UNSTABLE = 50.0
+CV_TREND_LIMIT = 10.0
+
+RISK_WEIGHTS = {
+    'hypo': 35,
+    'nocturnal': 25,
+    'variability': 20,
+    'trend': 10,
+    'gaps': 10,
+}
+
+RISK_FIELDS = [
+    'period_start',
+    'period_end',
+    'reading_count',
+    'hypo_percent',
+    'nocturnal_hypo_episodes',
+    'cv',
+    'cv_trend',
+    'days_without_data',
+    'longest_gap_hours',
+    'score',
+    'computed_at',
+]
+
+
+class _Moments:
+    __slots__ = ('count', 'total', 'squares')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.squares += value * value
+
+    def cv(self):
+        if self.count < 2:
+            return None
+        mean = self.total / self.count
+        if mean <= 0:
+            return None
+        variance = (self.squares - self.total * mean) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0)) / mean * 100
+
+
+def _clamp(value):
+    return min(max(value, 0.0), 1.0)
+
+
+def risk_score(indicators, days):
+    """Weighted 0-100 composite used to rank patients; a triage heuristic, not a diagnosis."""
+    cv = indicators['cv'] or 0.0
+    parts = {
+        'hypo': indicators['hypo_percent'] / HYPO_PERCENT_LIMIT,
+        'nocturnal': indicators['nocturnal_hypo_episodes'] / NOCTURNAL_EPISODES_LIMIT,
+        'variability': (cv - CV_STABLE) / (CV_UNSTABLE - CV_STABLE),
+        'trend': (indicators['cv_trend'] or 0.0) / CV_TREND_LIMIT,
+        'gaps': indicators['days_without_data'] / days if days else 0.0,
+    }
+    return round(sum(RISK_WEIGHTS[name] * _clamp(value) for name, value in parts.items()), 1)
+
+
+def score_readings(readings, start, end, now=None):
+    """
+    Risk indicators of ``start..end`` from ``(measured_at, glucose)`` pairs in time order.
+
+    Consecutive night-time readings below the hypo threshold form one
+    nocturnal episode; any other reading ends it. The CV trend compares the
+    second half of the period with the first.
+    """
+    now = now or timezone.now()
+    days = (end - start).days + 1
+    current_tz = timezone.get_default_timezone()
+    period_start = combine_measured_at(start, time.min)
+    period_end = min(combine_measured_at(end + timedelta(days=1), time.min), now)
+    middle = start + timedelta(days=days // 2)
+
+    overall, halves = _Moments(), (_Moments(), _Moments())
+    count = hypo = episodes = 0
+    in_episode = False
+    days_with_data = set()
+    previous = period_start
+    longest_gap = timedelta(0)
+
+    for measured_at, glucose in readings:
+        local = timezone.localtime(measured_at, current_tz)
+        count += 1
+        days_with_data.add(local.date())
+        overall.add(float(glucose))
+        halves[local.date() >= middle].add(float(glucose))
+        longest_gap = max(longest_gap, measured_at - previous)
+        previous = measured_at
+
+        is_hypo = glucose < HYPO_THRESHOLD
+        hypo += is_hypo
+        if is_hypo and NIGHT_START_HOUR <= local.hour < NIGHT_END_HOUR:
+            episodes += not in_episode
+            in_episode = True
+        else:
+            in_episode = False
+
+    longest_gap = max(longest_gap, period_end - previous)
+    first_cv, second_cv, cv = halves[0].cv(), halves[1].cv(), overall.cv()
+
+    indicators = {
+        'period_start': start,
+        'period_end': end,
+        'reading_count': count,
+        'hypo_percent': round(hypo / count * 100, 1) if count else 0.0,
+        'nocturnal_hypo_episodes': episodes,
+        'cv': round(cv, 1) if cv is not None else None,
+        'cv_trend': round(second_cv - first_cv, 1) if first_cv is not None and second_cv is not None else None,
+        'days_without_data': days - len(days_with_data),
+        'longest_gap_hours': round(max(longest_gap.total_seconds(), 0) / 3600, 1),
+    }
+    indicators['score'] = risk_score(indicators, days)
+    return indicators
+
+
+def score_patient(patient_id, start, end, chunk_size=None, now=None):
+    readings = (
+        GlucoseMeasurement.objects.filter(patient_id=patient_id, date_of_measurement__range=(start, end))
+        .order_by('measured_at', 'pk')
+        .values_list('measured_at', 'glucose')
+        .iterator(chunk_size=chunk_size or getattr(settings, 'RISK_SCORING_CHUNK_SIZE', 2000))
+    )
+    return score_readings(readings, start, end, now=now)
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones get a fresh connection on first query.
+    import django
+
+    django.setup()
+
+
+def _score_partition(patient_ids, start, end, chunk_size, now):
+    return [(patient_id, score_patient(patient_id, start, end, chunk_size, now)) for patient_id in patient_ids]
+
+
+def _score_partition_in_worker(*args):
+    # Only pool workers own their connections; the in-process path runs on the caller's.
+    try:
+        return _score_partition(*args)
+    finally:
+        connections.close_all()
+
+
+def save_risk_scores(results, computed_at):
+    """Upsert one partition of ``(patient_id, indicators)`` results."""
+    indicators_by_patient = dict(results)
+    with transaction.atomic():
+        existing = PatientRiskScore.objects.in_bulk(indicators_by_patient, field_name='patient_id')
+        created, updated = [], []
+        for patient_id, indicators in indicators_by_patient.items():
+            score = existing.get(patient_id)
+            if score is None:
+                created.append(PatientRiskScore(patient_id=patient_id, computed_at=computed_at, **indicators))
+                continue
+            for field, value in indicators.items():
+                setattr(score, field, value)
+            score.computed_at = computed_at
+            updated.append(score)
+        PatientRiskScore.objects.bulk_create(created)
+        PatientRiskScore.objects.bulk_update(updated, RISK_FIELDS)
+    return len(indicators_by_patient)
+
+
+def run_risk_scoring(days=None, workers=None, partition_size=None, chunk_size=None, today=None, progress=None):
+    """Score every patient over the last ``days`` days; returns the number of patients scored."""
+    days = days or getattr(settings, 'RISK_SCORING_DAYS', 28)
+    workers = workers or getattr(settings, 'RISK_SCORING_WORKERS', 4)
+    partition_size = partition_size or getattr(settings, 'RISK_SCORING_PARTITION_SIZE', 200)
+    end = today or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    now = timezone.now()
+
+    patient_ids = list(Patient.objects.order_by('pk').values_list('pk', flat=True))
+    partitions = [patient_ids[i:i + partition_size] for i in range(0, len(patient_ids), partition_size)]
+    arguments = ([start] * len(partitions), [end] * len(partitions), [chunk_size] * len(partitions), [now] * len(partitions))
+
+    scored = 0
+    # Closing the parent's connections before forking would abort an enclosing transaction.
+    if workers <= 1 or len(partitions) <= 1 or connection.in_atomic_block:
+        results = map(_score_partition, partitions, *arguments)
+        for batch in results:
+            scored += save_risk_scores(batch, now)
+            if progress:
+                progress(scored, len(patient_ids))
+        return scored
+
+    # Forked workers must not reuse the parent's sockets.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for batch in pool.map(_score_partition_in_worker, partitions, *arguments):
+            scored += save_risk_scores(batch, now)
+            if progress:
+                progress(scored, len(patient_ids))
+    return scored
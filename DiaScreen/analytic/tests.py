@@ -1,3 +1,330 @@
-from django.test import TestCase
+import io
+import time as clock
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from card.models import GlucoseDaySeries, GlucoseMeasurement
+
+from .cohort import cohort_page, compute_cohort, filter_cohort, get_cohort
+from .episodes import detect_episodes, update_glycemic_episodes
+from .models import GlycemicEpisode, PatientRiskScore
+from .risk import run_risk_scoring, score_readings
+
+
+User = get_user_model()
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False)
+class PatientAnalyticsSeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="analytics",
+            email="analytics@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = cls.user.profile
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _reading(self, value, at):
+        with self.captureOnCommitCallbacks(execute=True):
+            GlucoseMeasurement.objects.create(
+                patient=self.patient,
+                glucose=value,
+                date_of_measurement=timezone.localdate(),
+                time_of_measurement=at,
+            )
+
+    def _dashboard_payload(self):
+        response = self.client.get(reverse('analytic:patient_dashboard', args=[self.patient.pk]))
+        return response.context['chart_payload'], response.context['advanced_metrics']
+
+    def test_dashboard_reads_the_same_numbers_from_raw_rows_and_packed_series(self):
+        with override_settings(GLUCOSE_DAY_SERIES_ENABLED=True):
+            self._reading('5.0', time(8, 10))
+            self._reading('7.0', time(8, 40))
+            self._reading('9.0', time(13, 5))
+            self.assertEqual(GlucoseDaySeries.objects.get().point_count, 3)
+            call_command('rebuild_glucose_series', stdout=io.StringIO())
+            packed_payload, packed_metrics = self._dashboard_payload()
+
+        raw_payload, raw_metrics = self._dashboard_payload()
+        self.assertEqual(packed_payload, raw_payload)
+        self.assertEqual(packed_metrics, raw_metrics)
+        self.assertEqual(packed_payload['glucoseByHour']['labels'], ['08:00', '13:00'])
+        self.assertEqual(packed_payload['glucoseByHour']['means'], [6.0, 9.0])
+        self.assertEqual(packed_payload['glucoseTrend']['data'], [7.0])
+
+
+class CohortDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="clinician",
+            email="clinician@example.com",
+            password="StrongPass123",
+            is_staff=True,
+        )
+        today = timezone.localdate()
+        readings = {
+            "steady": ['5.0', '6.0', '7.0', '8.0'],
+            "lows": ['3.0', '3.5', '6.0', '12.0'],
+            "quiet": [],
+        }
+        cls.patients = {}
+        rows = []
+        for username, values in readings.items():
+            user = User.objects.create_user(
+                username=username,
+                email=f"{username}@example.com",
+                password="StrongPass123",
+            )
+            cls.patients[username] = user.profile
+            for minute, value in enumerate(values):
+                rows.append(GlucoseMeasurement(
+                    patient=user.profile,
+                    glucose=value,
+                    date_of_measurement=today,
+                    time_of_measurement=time(8, minute),
+                ))
+            # Outside every period: must not be counted.
+            rows.append(GlucoseMeasurement(
+                patient=user.profile,
+                glucose='20.0',
+                date_of_measurement=today - timedelta(days=400),
+                time_of_measurement=time(9, 0),
+            ))
+        GlucoseMeasurement.objects.bulk_create(rows)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cohort_metrics_come_from_one_grouped_query(self):
+        today = timezone.localdate()
+        with self.assertNumQueries(1):
+            rows = {row['username']: row for row in compute_cohort(today - timedelta(days=6), today)}
+
+        self.assertEqual(set(rows), {"steady", "lows", "quiet"})
+        steady = rows["steady"]
+        self.assertEqual(steady['reading_count'], 4)
+        self.assertEqual(steady['mean'], 6.5)
+        self.assertEqual(steady['tir_percent'], 100.0)
+        self.assertEqual(steady['hypo_percent'], 0.0)
+        self.assertEqual(steady['cv'], 19.9)
+        self.assertEqual(steady['last_reading'].time(), time(8, 3))
+
+        lows = rows["lows"]
+        self.assertEqual(lows['tir_percent'], 25.0)
+        self.assertEqual(lows['hypo_percent'], 50.0)
+        self.assertIsNone(rows["quiet"]['mean'])
+        self.assertEqual(rows["quiet"]['reading_count'], 0)
+
+        with self.assertNumQueries(1):
+            get_cohort('7')
+        with self.assertNumQueries(0):
+            get_cohort('7')
+
+    def test_keyset_pages_follow_sort_order_with_missing_data_last(self):
+        rows = get_cohort('7')
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = cohort_page(rows, sort='-tir', cursor=cursor, limit=1)
+            seen.extend(row['username'] for row in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["steady", "lows", "quiet"])
+
+        page, _ = cohort_page(rows, sort='hypo', limit=10)
+        self.assertEqual([row['username'] for row in page], ["steady", "lows", "quiet"])
+        self.assertEqual([row['username'] for row in filter_cohort(rows, tir_below=50)], ["lows"])
+
+    def test_cohort_view_is_staff_only(self):
+        self.client.force_login(self.patients["steady"].user)
+        response = self.client.get(reverse('analytic:cohort_dashboard'))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('analytic:cohort_dashboard'), {'period': '30', 'sort': '-hypo', 'q': 'lo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['username'] for row in response.context['patients']], ["lows"])
+        self.assertEqual(response.context['total_patients'], 3)
+
+
+class PatientRiskScoreTests(TestCase):
+    def test_score_readings_counts_episodes_gaps_and_variability_trend(self):
+        today = timezone.localdate()
+        start = today - timedelta(days=3)
+        current_tz = timezone.get_default_timezone()
+
+        def at(days_ago, hour, minute=0):
+            day = today - timedelta(days=days_ago)
+            return timezone.make_aware(timezone.datetime.combine(day, time(hour, minute)), current_tz)
+
+        readings = [
+            (at(3, 2, 0), Decimal('3.2')),
+            (at(3, 2, 30), Decimal('3.0')),   # same nocturnal episode
+            (at(3, 8, 0), Decimal('6.0')),
+            (at(2, 3, 0), Decimal('3.5')),    # second nocturnal episode
+            (at(0, 8, 0), Decimal('4.0')),
+            (at(0, 12, 0), Decimal('14.0')),
+        ]
+        indicators = score_readings(readings, start, today, now=at(0, 23, 0))
+
+        self.assertEqual(indicators['reading_count'], 6)
+        self.assertEqual(indicators['hypo_percent'], 50.0)
+        self.assertEqual(indicators['nocturnal_hypo_episodes'], 2)
+        self.assertEqual(indicators['days_without_data'], 1)
+        self.assertEqual(indicators['longest_gap_hours'], 53.0)
+        self.assertGreater(indicators['cv_trend'], 0)
+        self.assertGreater(indicators['score'], 60)
+
+        empty = score_readings([], start, today, now=at(0, 23, 0))
+        self.assertEqual(empty['reading_count'], 0)
+        self.assertIsNone(empty['cv'])
+        self.assertEqual(empty['days_without_data'], 4)
+
+    def test_run_risk_scoring_creates_then_updates_scores(self):
+        today = timezone.localdate()
+        risky = User.objects.create_user(username="risky", email="risky@example.com", password="StrongPass123").profile
+        calm = User.objects.create_user(username="calm", email="calm@example.com", password="StrongPass123").profile
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=risky, glucose='3.1', date_of_measurement=today, time_of_measurement=time(3, 0)),
+            GlucoseMeasurement(patient=calm, glucose='6.0', date_of_measurement=today, time_of_measurement=time(9, 0)),
+        ])
+
+        self.assertEqual(run_risk_scoring(days=7, workers=1, partition_size=1), 2)
+        self.assertEqual(PatientRiskScore.objects.count(), 2)
+        self.assertEqual(PatientRiskScore.objects.first().patient, risky)
+        self.assertEqual(PatientRiskScore.objects.get(patient=risky).nocturnal_hypo_episodes, 1)
+
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=calm, glucose='2.9', date_of_measurement=today, time_of_measurement=time(2, 0)),
+        ])
+        # Patient ids, one stream per patient, then one read and one UPDATE in a savepoint.
+        with self.assertNumQueries(7):
+            run_risk_scoring(days=7, workers=1, partition_size=10)
+        self.assertEqual(PatientRiskScore.objects.count(), 2)
+        self.assertEqual(PatientRiskScore.objects.get(patient=calm).hypo_percent, 50.0)
+
+        # In-process scoring must keep the caller's connection (and transaction) open.
+        with mock.patch('analytic.risk.connections.close_all') as close_all, transaction.atomic():
+            run_risk_scoring(days=7, workers=4, partition_size=1)
+            self.assertEqual(PatientRiskScore.objects.count(), 2)
+        close_all.assert_not_called()
+
+        cache.clear()
+        page, _ = cohort_page(get_cohort('7'), sort='-risk')
+        self.assertEqual([row['username'] for row in page[:2]], ["calm", "risky"])
+
+
+@override_settings(GLYCEMIC_EPISODES_SETTLE_SECONDS=0)
+class GlycemicEpisodeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="episodes",
+            email="episodes@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = cls.user.profile
+
+    def _readings(self, day, points):
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=self.patient, glucose=value, date_of_measurement=day, time_of_measurement=at)
+            for at, value in points
+        ])
+
+    def test_detect_episodes_merges_short_returns_and_drops_short_or_broken_runs(self):
+        points = [
+            (0, 6.0), (5, 3.5), (10, 3.2), (15, 4.5), (20, 3.1), (25, 3.6), (30, 5.0),  # one episode, 5 min back in range
+            (200, 3.0), (205, 6.0),                                                    # too short
+            (400, 3.5), (420, 3.3), (600, 6.0),                                        # ends at its last reading
+            (700, 3.5), (800, 3.5), (810, 6.0),                                        # split by a data gap, both too short
+            (1000, 11.0), (1010, 12.5), (1020, 11.5), (1030, 8.0),
+        ]
+        times, values = np.array(points).T
+
+        hypo = detect_episodes(times, values, 3.9, True)
+        self.assertEqual(hypo['start'].tolist(), [5, 400])
+        self.assertEqual(hypo['end'].tolist(), [30, 420])
+        self.assertEqual(hypo['extreme'].tolist(), [3.1, 3.3])
+        self.assertEqual(hypo['extreme_time'].tolist(), [20, 420])
+        self.assertEqual(hypo['count'].tolist(), [5, 2])
+
+        hyper = detect_episodes(times, values, 10.0, False)
+        self.assertEqual(hyper['start'].tolist(), [1000])
+        self.assertEqual(hyper['end'].tolist(), [1030])
+        self.assertEqual(hyper['extreme'].tolist(), [12.5])
+        self.assertEqual(hyper['extreme_time'].tolist(), [1010])
+
+        self.assertEqual(len(detect_episodes(times, values, 3.0, True)['start']), 0)
+        self.assertEqual(len(detect_episodes([], [], 3.9, True)['start']), 0)
+
+    def test_detect_episodes_scans_a_year_of_five_minute_readings_quickly(self):
+        times = np.arange(365 * 288, dtype=np.int64) * 5
+        values = 7 + 4 * np.sin(times / 300) + np.random.default_rng(0).normal(0, 1.5, len(times))
+
+        started = clock.perf_counter()
+        for threshold, below in ((3.9, True), (3.0, True), (10.0, False)):
+            found = detect_episodes(times, values, threshold, below)
+            self.assertGreater(len(found['start']), 0)
+        self.assertLess(clock.perf_counter() - started, 0.5)
+
+    @override_settings(GLYCEMIC_EPISODES_SETTLE_SECONDS=60)
+    def test_update_waits_for_the_settle_window(self):
+        day = timezone.localdate() - timedelta(days=1)
+        self._readings(day, [(time(8, 0), '3.5'), (time(8, 20), '3.4'), (time(8, 40), '6.0')])
+        self.assertEqual(update_glycemic_episodes(), 0)
+
+        GlucoseMeasurement.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(update_glycemic_episodes(), 1)
+
+    def test_update_redetects_only_episodes_around_new_readings(self):
+        today = timezone.localdate()
+        self._readings(today - timedelta(days=10), [(time(12, 0), '11.0'), (time(12, 30), '12.0'), (time(13, 0), '7.0')])
+        self._readings(today - timedelta(days=1), [(time(8, 0), '3.5'), (time(8, 10), '3.2'), (time(8, 20), '3.4')])
+
+        self.assertEqual(update_glycemic_episodes(batch_size=100), 2)
+        hyper = GlycemicEpisode.objects.get(kind=GlycemicEpisode.KIND_HYPER)
+        self.assertEqual(hyper.duration_minutes, 60)
+        self.assertEqual(hyper.extreme_glucose, Decimal('12.00'))
+        hypo = GlycemicEpisode.objects.get(kind=GlycemicEpisode.KIND_HYPO)
+        self.assertEqual(hypo.duration_minutes, 20)
+
+        self._readings(today - timedelta(days=1), [(time(8, 30), '2.9'), (time(8, 45), '6.0')])
+        self.assertEqual(update_glycemic_episodes(batch_size=100), 2)
+        self.assertEqual(update_glycemic_episodes(batch_size=100), 0)
+
+        self.assertEqual(GlycemicEpisode.objects.get(kind=GlycemicEpisode.KIND_HYPER).pk, hyper.pk)
+        hypo = GlycemicEpisode.objects.get(kind=GlycemicEpisode.KIND_HYPO)
+        self.assertEqual(timezone.localtime(hypo.started_at).time(), time(8, 0))
+        self.assertEqual(timezone.localtime(hypo.ended_at).time(), time(8, 45))
+        self.assertEqual(hypo.extreme_glucose, Decimal('2.90'))
+        self.assertEqual(hypo.reading_count, 4)
+        severe = GlycemicEpisode.objects.get(kind=GlycemicEpisode.KIND_SEVERE_HYPO)
+        self.assertEqual(severe.duration_minutes, 15)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('analytic:patient_dashboard', args=[self.patient.pk]))
+        summary = {row['kind']: row for row in response.context['episode_summary']}
+        self.assertEqual(summary['hypo']['episodes'], 1)
+        self.assertEqual(summary['hypo']['extreme'], Decimal('2.90'))
+        self.assertEqual(summary['hyper']['episodes'], 0)
+        self.assertContains(response, 'Епізоди гіпо- та гіперглікемії')
+
+        pdf = self.client.get(reverse('analytic:patient_dashboard_pdf', args=[self.patient.pk]))
+        self.assertEqual(pdf.status_code, 200)
@@ -4,6 +4,7 @@ from decimal import Decimal
 from io import BytesIO
 from pathlib import Path
 import json
+import numpy as np
 import requests
 
 from django.conf import settings
@@ -22,6 +23,8 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from chatAI.telemetry import classify_rag_error, record_rag_call
+from chatAI.utils import call_rag_api_with_retry
 from card.models import (
     GlucoseMeasurement,
     PhysicalActivityMeasurement,
@@ -29,8 +32,13 @@ from card.models import (
     InsulineDoseMeasurement,
     GlycemicProfileMeasurement,
 )
+from card.series import load_glucose_series
 from user_auth.models import Patient
 
+from .cohort import InvalidCursor, cohort_page, filter_cohort, get_cohort, parse_sort, resolve_period
+from .episodes import episode_summary
+from .models import GlycemicEpisode
+
 PDF_PRIMARY_FONT = "DiaScreenSans"
 PDF_BOLD_FONT = "DiaScreenSans-Bold"
 _PDF_FONTS_READY = False
@@ -158,7 +166,8 @@ class PatientAnalyticsView(LoginRequiredMixin, TemplateView):
             "hba1c": glycemic_profile_qs.aggregate(avg=Avg("hba1c"))["avg"],
         }
 
-        glucose_values = [float(g.glucose) for g in glucose_period_qs]
+        series = load_glucose_series(patient, start_date, today)
+        glucose_values = series[2].tolist()
         if glucose_values:
             context["advanced_metrics"] = self._calculate_advanced_metrics(
                 glucose_values=glucose_values,
@@ -171,8 +180,11 @@ class PatientAnalyticsView(LoginRequiredMixin, TemplateView):
             glucose_qs.select_related("patient__user").order_by("-created_at")[:5]
         )
 
+        context["episode_summary"] = episode_summary(patient, start_date, today)
+        context["recent_episodes"] = GlycemicEpisode.objects.filter(patient=patient)[:10]
+
         context["chart_payload"] = self._build_chart_payload(
-            glucose_qs=glucose_period_qs,
+            series=series,
             glucose_all_qs=glucose_qs,
             weekly_metrics=context["weekly_metrics"],
             start_date=start_date,
@@ -222,41 +234,26 @@ class PatientAnalyticsView(LoginRequiredMixin, TemplateView):
             "mean": round(mean, 2),
         }
 
-    def _build_chart_payload(self, *, glucose_qs, glucose_all_qs, weekly_metrics, start_date, today):
-        daily_glucose = (
-            glucose_qs.values("date_of_measurement")
-            .annotate(avg=Avg("glucose"))
-            .order_by("date_of_measurement")
-        )
+    def _build_chart_payload(self, *, series, glucose_all_qs, weekly_metrics, start_date, today):
+        days, minutes, values = series
 
-        glucose_trend_labels = [
-            entry["date_of_measurement"].strftime("%d.%m") for entry in daily_glucose
-        ]
-        glucose_trend_values = [
-            float(entry["avg"]) if entry["avg"] is not None else None
-            for entry in daily_glucose
-        ]
+        glucose_trend_labels = []
+        glucose_trend_values = []
+        if values.size:
+            unique_days, day_index = np.unique(days, return_inverse=True)
+            daily_avg = np.bincount(day_index, weights=values) / np.bincount(day_index)
+            glucose_trend_labels = [day.strftime("%d.%m") for day in unique_days.astype(object)]
+            glucose_trend_values = [round(float(avg), 2) for avg in daily_avg]
 
-        hourly_data = {}
-        for measurement in glucose_qs:
-            hour = measurement.time_of_measurement.hour
-            if hour not in hourly_data:
-                hourly_data[hour] = []
-            hourly_data[hour].append(float(measurement.glucose))
-        
         hourly_labels = []
         hourly_means = []
         hourly_medians = []
-        if hourly_data:
-            for hour in sorted(hourly_data.keys()):
-                values = hourly_data[hour]
-                if values:
-                    hourly_labels.append(f"{hour:02d}:00")
-                    hourly_means.append(round(statistics.mean(values), 2))
-                    try:
-                        hourly_medians.append(round(statistics.median(values), 2))
-                    except:
-                        hourly_medians.append(hourly_means[-1])
+        hours = minutes // 60
+        for hour in np.unique(hours):
+            hour_values = values[hours == hour]
+            hourly_labels.append(f"{int(hour):02d}:00")
+            hourly_means.append(round(float(hour_values.mean()), 2))
+            hourly_medians.append(round(float(np.median(hour_values)), 2))
 
         weekly_activity_labels = [
             "Замірів глюкози",
@@ -368,7 +365,7 @@ class PatientAnalyticsPDFExportView(LoginRequiredMixin, TemplateView):
         glucose_avg = glucose_qs.aggregate(avg=Avg("glucose"))["avg"]
         hba1c_avg = glycemic_profile_qs.aggregate(avg=Avg("hba1c"))["avg"]
 
-        glucose_values = [float(g.glucose) for g in glucose_period_qs]
+        glucose_values = load_glucose_series(self.patient, start_date, today)[2].tolist()
         advanced_metrics = None
         if glucose_values:
             advanced_metrics = self._calculate_advanced_metrics(
@@ -395,6 +392,8 @@ class PatientAnalyticsPDFExportView(LoginRequiredMixin, TemplateView):
             glucose_avg=glucose_avg,
             hba1c_avg=hba1c_avg,
             advanced_metrics=advanced_metrics,
+            episode_summary=episode_summary(self.patient, start_date, today),
+            recent_episodes=list(GlycemicEpisode.objects.filter(patient=self.patient)[:10]),
             recent_glucose=list(glucose_qs.order_by("-created_at")[:10]),
             font_regular=font_regular,
             font_bold=font_bold,
@@ -450,6 +449,86 @@ class PatientAnalyticsPDFExportView(LoginRequiredMixin, TemplateView):
         }
 
 
+class CohortDashboardView(LoginRequiredMixin, TemplateView):
+    """Glucose control summary of all patients for staff, see ``analytic.cohort``."""
+    template_name = "analytic/cohort.html"
+    columns = [
+        ("name", "Пацієнт"),
+        ("tir", "TIR, %"),
+        ("mean", "Середня глюкоза"),
+        ("cv", "CV, %"),
+        ("hypo", "Гіпо, %"),
+        ("last", "Останній замір"),
+        ("count", "Замірів"),
+        ("risk", "Ризик"),
+    ]
+
+    def dispatch(self, request, *args, **kwargs):
+        user = request.user
+        if user.is_authenticated and not (user.is_staff or user.is_superuser):
+            raise PermissionDenied("Only staff can view the patient cohort.")
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET
+
+        period, start_date, end_date, period_label = resolve_period(params.get('period'))
+        try:
+            tir_below = float(params['tir_below']) if params.get('tir_below') else None
+        except ValueError:
+            tir_below = None
+        filters = {
+            'query': params.get('q', '').strip(),
+            'diabetes_type': params.get('diabetes_type') or None,
+            'tir_below': tir_below,
+            'with_readings': params.get('with_readings') == '1',
+        }
+
+        rows = get_cohort(period)
+        selected = filter_cohort(rows, **filters)
+        sort_field, descending = parse_sort(params.get('sort'))
+        sort = f"-{sort_field}" if descending else sort_field
+        try:
+            page, next_cursor = cohort_page(selected, sort=sort, cursor=params.get('cursor'))
+        except InvalidCursor:
+            page, next_cursor = cohort_page(selected, sort=sort)
+
+        base_query = params.copy()
+        base_query.pop('cursor', None)
+        base_query.pop('sort', None)
+        next_query = None
+        if next_cursor:
+            next_query = base_query.copy()
+            next_query['sort'] = sort
+            next_query['cursor'] = next_cursor
+
+        context.update({
+            "period": period,
+            "period_label": period_label,
+            "start_date": start_date,
+            "end_date": end_date,
+            "filters": filters,
+            "diabetes_types": Patient._meta.get_field("diabetes_type").choices,
+            "sort": sort,
+            "columns": [
+                {
+                    "label": label,
+                    "sort": f"-{field}" if field == sort_field and not descending else field,
+                    "active": field == sort_field,
+                }
+                for field, label in self.columns
+            ],
+            "descending": descending,
+            "base_query": base_query.urlencode(),
+            "next_query": next_query.urlencode() if next_query else None,
+            "patients": page,
+            "total_patients": len(rows),
+            "matched_patients": len(selected),
+        })
+        return context
+
+
 def _format_decimal(value, suffix="", default="—", precision=2):
     if value is None:
         return default
@@ -476,6 +555,8 @@ def _render_analytics_pdf(
     glucose_avg,
     hba1c_avg,
     advanced_metrics,
+    episode_summary,
+    recent_episodes,
     recent_glucose,
     font_regular,
     font_bold,
@@ -567,6 +648,23 @@ def _render_analytics_pdf(
         draw_bullet_line(f"GMI (оцінка HbA1c): {advanced_metrics['gmi']}%")
         draw_bullet_line(f"Середнє значення: {advanced_metrics['mean']} ммоль/л")
 
+    if any(row["episodes"] for row in episode_summary):
+        draw_heading("Епізоди гіпо- та гіперглікемії", size=14)
+        for row in episode_summary:
+            if not row["episodes"]:
+                continue
+            draw_bullet_line(
+                f"{row['label']}: {row['episodes']} еп., сумарно {row['total_minutes']} хв, "
+                f"середня тривалість {row['average_minutes']} хв, екстремум {row['extreme']} ммоль/л"
+            )
+        for episode in recent_episodes:
+            started_at = timezone.localtime(episode.started_at)
+            draw_bullet_line(
+                f"{started_at.strftime('%d.%m.%Y %H:%M')} — {episode.get_kind_display()}, "
+                f"{episode.duration_minutes} хв, екстремум {episode.extreme_glucose} ммоль/л",
+                size=10,
+            )
+
     if recent_glucose:
         draw_heading("Останні заміри глюкози", size=14)
         for record in recent_glucose[:10]:
@@ -692,7 +790,7 @@ def analyze_analytics_data(request, pk):
         glucose_avg = glucose_qs.aggregate(avg=Avg("glucose"))["avg"]
         hba1c_avg = glycemic_profile_qs.aggregate(avg=Avg("hba1c"))["avg"]
 
-        glucose_values = [float(g.glucose) for g in glucose_period_qs]
+        glucose_values = load_glucose_series(patient, start_date, today)[2].tolist()
         advanced_metrics = None
         if glucose_values:
             target_min = float(patient.target_glucose_min) if patient.target_glucose_min else 4.0
@@ -759,16 +857,31 @@ def analyze_analytics_data(request, pk):
             f"{getattr(settings, 'RAG_API_URL', 'http://127.0.0.1:8001/get-response').rstrip('/')}/personalized"
         )
         
-        response = requests.post(
-            rag_personal_url,
-            json={
-                'question': question,
-                'context': analytics_context,
-                'mode': 'personalized',
-            },
-            timeout=300
-        )
-        response.raise_for_status()
+        timings = {}
+        try:
+            response, error = call_rag_api_with_retry(
+                rag_personal_url,
+                method='POST',
+                timeout=300,
+                timings=timings,
+                json={
+                    'question': question,
+                    'context': analytics_context,
+                    'mode': 'personalized',
+                },
+            )
+            if error or response is None:
+                raise error or requests.RequestException("RAG API request failed")
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            record_rag_call(
+                source='analytics',
+                mode='personalized',
+                timings=timings,
+                error_type=classify_rag_error(exc),
+            )
+            raise
+        record_rag_call(source='analytics', mode='personalized', timings=timings)
         data = response.json()
         answer_text = (data.get('answer') or '').strip()
         
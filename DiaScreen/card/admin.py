@@ -3,6 +3,7 @@ from django.contrib import admin
 from .models import (
     AnthropometricMeasurement,
     FoodMeasurement,
+    GlucoseDevice,
     GlucoseMeasurement,
     GlycemicProfileMeasurement,
     InsulineDoseMeasurement,
@@ -13,15 +14,23 @@ from .models import (
 
 @admin.register(GlucoseMeasurement)
 class GlucoseMeasurementAdmin(admin.ModelAdmin):
-    list_display = ('patient', 'glucose', 'date_of_measurement', 'time_of_measurement', 'glucose_measurement_category')
+    list_display = ('patient', 'glucose', 'date_of_measurement', 'time_of_measurement', 'glucose_measurement_category', 'source')
     list_filter = ('glucose_measurement_category', 'date_of_measurement')
-    search_fields = ('patient__user__username',)
+    search_fields = ('patient__user__username', 'source')
+
+
+@admin.register(GlucoseDevice)
+class GlucoseDeviceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'patient', 'source', 'is_active', 'last_seen_at', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('patient__user__username', 'name', 'source')
+    readonly_fields = ('source', 'last_seen_at', 'created_at')
 
 
 @admin.register(GlycemicProfileMeasurement)
 class GlycemicProfileMeasurementAdmin(admin.ModelAdmin):
-    list_display = ('patient', 'average_glucose', 'hba1c', 'measurement_date', 'measurement_time')
-    list_filter = ('measurement_date',)
+    list_display = ('patient', 'average_glucose', 'hba1c', 'measurement_date', 'measurement_time', 'source')
+    list_filter = ('source', 'measurement_date')
     search_fields = ('patient__user__username',)
 
 
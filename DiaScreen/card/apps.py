@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'card'
+    scheduled_jobs = [
+        {'name': 'card.glycemic_profiles', 'func': 'card.profiles.generate_glycemic_profiles', 'every': 300},
+        {'name': 'card.measurement_partitions', 'func': 'card.partitioning.maintain_partitions', 'cron': '15 1 * * *'},
+    ]
+
+    def ready(self):
+        import card.signals
@@ -0,0 +1,127 @@
+"""
+Batched ingestion of continuous glucose monitor (CGM) readings.
+
+A device posts arrays of timestamped readings. Each batch is written with a
+single ``INSERT ... ON CONFLICT`` (``bulk_create(update_conflicts=True)``)
+keyed on (patient, date, time, source), so re-sent readings update in place
+instead of duplicating. A bounded semaphore caps concurrent batch writes;
+when every slot stays busy the caller gets a 429 and retries later.
+"""
+import threading
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from user_auth.alerts import schedule_glucose_alerts
+from user_auth.stats import adjust_site_counter
+
+from .models import GlucoseDevice, GlucoseMeasurement
+from .series import rebuild_day_series, series_enabled
+from .snapshots import refresh_snapshot
+
+MIN_GLUCOSE = Decimal('0.5')
+MAX_GLUCOSE = Decimal('35')
+
+_write_slots = threading.BoundedSemaphore(getattr(settings, 'CGM_MAX_CONCURRENT_WRITES', 4))
+
+
+class IngestionBusy(Exception):
+    """Raised when no write slot frees up in time; the client should retry after a pause."""
+
+
+def authenticate_device(authorization_header):
+    """Return the active device for an ``Authorization: Bearer <token>`` header, or ``None``."""
+    scheme, _, token = (authorization_header or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return (
+        GlucoseDevice.objects.select_related('patient')
+        .filter(token_hash=GlucoseDevice.hash_token(token.strip()), is_active=True)
+        .first()
+    )
+
+
+def parse_readings(items):
+    """
+    Validate raw readings; returns ``(readings, rejected)``.
+
+    ``readings`` maps ``(date, time)`` in the server timezone to the glucose value
+    (a reading repeated within the batch keeps the last value).
+    """
+    current_tz = timezone.get_default_timezone()
+    readings = {}
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            measured = parse_datetime(str(item['timestamp']))
+            glucose = Decimal(str(item['glucose']))
+            # NaN and infinities would only fail later, in the range comparison.
+            glucose = glucose.quantize(Decimal('0.01')) if glucose.is_finite() else None
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            measured, glucose = None, None
+        if measured is None or glucose is None:
+            rejected.append({'index': index, 'error': 'Некоректний час або значення'})
+            continue
+        if not MIN_GLUCOSE <= glucose <= MAX_GLUCOSE:
+            rejected.append({'index': index, 'error': 'Значення поза допустимим діапазоном'})
+            continue
+        if timezone.is_naive(measured):
+            measured = timezone.make_aware(measured, current_tz)
+        local = timezone.localtime(measured, current_tz).replace(microsecond=0)
+        readings[(local.date(), local.time())] = glucose
+    return readings, rejected
+
+
+def ingest_readings(device, readings):
+    """
+    Upsert a batch of parsed readings for ``device``; returns the number of new rows.
+
+    Raises ``IngestionBusy`` if no write slot becomes available within ``CGM_WRITE_WAIT_SECONDS``.
+    """
+    if not readings:
+        return 0
+    if not _write_slots.acquire(timeout=getattr(settings, 'CGM_WRITE_WAIT_SECONDS', 0.5)):
+        raise IngestionBusy()
+    try:
+        patient_id = device.patient_id
+        with transaction.atomic():
+            existing = set(
+                GlucoseMeasurement.objects.filter(
+                    patient_id=patient_id,
+                    source=device.source,
+                    date_of_measurement__in={measured_date for measured_date, _ in readings},
+                ).values_list('date_of_measurement', 'time_of_measurement')
+            )
+            GlucoseMeasurement.objects.bulk_create(
+                [
+                    GlucoseMeasurement(
+                        patient_id=patient_id,
+                        source=device.source,
+                        glucose=glucose,
+                        date_of_measurement=measured_date,
+                        time_of_measurement=measured_time,
+                    )
+                    for (measured_date, measured_time), glucose in readings.items()
+                ],
+                batch_size=getattr(settings, 'CGM_BULK_BATCH_SIZE', 1000),
+                update_conflicts=True,
+                unique_fields=['patient', 'date_of_measurement', 'time_of_measurement', 'source'],
+                update_fields=['glucose', 'updated_at'],
+            )
+            GlucoseDevice.objects.filter(pk=device.pk).update(last_seen_at=timezone.now())
+
+            created = len(readings.keys() - existing)
+            # bulk_create sends no post_save: refresh derived state once per batch.
+            if created:
+                transaction.on_commit(lambda: adjust_site_counter('glucose', created))
+                transaction.on_commit(schedule_glucose_alerts)
+            transaction.on_commit(lambda: refresh_snapshot(patient_id, kinds=['glucose']))
+            if series_enabled():
+                days = {measured_date for measured_date, _ in readings}
+                transaction.on_commit(lambda: rebuild_day_series(patient_id, days))
+        return created
+    finally:
+        _write_slots.release()
@@ -0,0 +1,113 @@
+"""
+Streaming export of a patient's full measurement history as CSV or NDJSON.
+
+Each measurement table is read with a ``values_list`` projection and
+``.iterator()``, rows are serialized one by one, grouped into chunks of
+roughly ``EXPORT_BUFFER_SIZE`` bytes and optionally gzip-compressed on the
+fly, so the memory used does not depend on how long the history is.
+"""
+import csv
+import json
+import zlib
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .history import HISTORY_SOURCES
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+COMMON_COLUMNS = ['kind', 'id', 'measured_at', 'date', 'time']
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(kinds):
+    """CSV header: common columns followed by the union of the kinds' value fields."""
+    columns = list(COMMON_COLUMNS)
+    for kind in kinds:
+        for field in HISTORY_SOURCES[kind]['fields']:
+            if field not in columns:
+                columns.append(field)
+    return columns
+
+
+def iter_export_records(patient, kinds, start=None, end=None, chunk_size=None):
+    """Yield ``(kind, field names, row tuple)`` for every record, type by type, oldest first."""
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    for kind in kinds:
+        source = HISTORY_SOURCES[kind]
+        model = apps.get_model('card', source['model'])
+        qs = model.objects.filter(patient=patient)
+        if start:
+            qs = qs.filter(**{f"{source['date']}__gte": start})
+        if end:
+            qs = qs.filter(**{f"{source['date']}__lte": end})
+        names = ['id', 'measured_at', 'date', 'time', *source['fields']]
+        rows = (
+            qs.order_by('measured_at', 'pk')
+            .values_list('id', 'measured_at', source['date'], source['time'], *source['fields'])
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            yield kind, names, row
+
+
+def _csv_lines(records, kinds):
+    writer = csv.writer(_Echo())
+    columns = export_columns(kinds)
+    yield writer.writerow(columns)
+    for kind, names, row in records:
+        values = dict(zip(names, row))
+        values['kind'] = kind
+        values['measured_at'] = values['measured_at'].isoformat()
+        yield writer.writerow(['' if values.get(column) is None else values[column] for column in columns])
+
+
+def _ndjson_lines(records):
+    for kind, names, row in records:
+        yield json.dumps({'kind': kind, **dict(zip(names, row))}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Join small lines into chunks of about ``size`` bytes."""
+    buffer = []
+    buffered = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(patient, kinds, file_format='csv', compress=False, start=None, end=None):
+    """Return an iterator of byte chunks with the export body."""
+    records = iter_export_records(patient, kinds, start=start, end=end)
+    lines = _csv_lines(records, kinds) if file_format == 'csv' else _ndjson_lines(records)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if compress else chunks
@@ -0,0 +1,291 @@
+"""
+Food catalogue helpers.
+
+``resolve_food_items`` maps the product names of a whole portion formset to
+``FoodItem`` rows with a fixed number of queries, however many portions the
+meal has. ``load_food_items`` upserts a nutrition table in batches keyed by
+the normalized name. ``search_food_items`` serves autocomplete from a per-process sorted
+index of normalized and transliterated names, rebuilt lazily when the catalog
+version kept in the cache changes.
+"""
+import bisect
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import FoodItem, normalize_food_name
+
+
+def resolve_food_items(carbohydrates_by_name):
+    """
+    Return ``{name: FoodItem}`` for ``{name: carbohydrates per 100 g}``.
+
+    Missing products are created, and products whose carbohydrates changed are
+    updated. ``None`` keeps the catalog value (a new product starts at 0).
+    """
+    if not carbohydrates_by_name:
+        return {}
+
+    # Spellings that differ only in case or spacing share one catalog entry.
+    requested = {}
+    for name, carbohydrates in carbohydrates_by_name.items():
+        carbohydrates = Decimal(carbohydrates) if carbohydrates is not None else None
+        requested[normalize_food_name(name)] = (' '.join(name.split()), carbohydrates)
+
+    by_key = {item.normalized_name: item for item in FoodItem.objects.filter(normalized_name__in=list(requested))}
+
+    missing = [
+        FoodItem(name=name, normalized_name=key, proteins=0, fats=0, carbohydrates=carbohydrates or 0)
+        for key, (name, carbohydrates) in requested.items()
+        if key not in by_key
+    ]
+    if missing:
+        # A concurrent request may create the same product; its row is picked up by the re-read below.
+        FoodItem.objects.bulk_create(missing, ignore_conflicts=True)
+        by_key.update(
+            (item.normalized_name, item)
+            for item in FoodItem.objects.filter(normalized_name__in=[item.normalized_name for item in missing])
+        )
+
+    changed = []
+    for key, item in by_key.items():
+        carbohydrates = requested[key][1]
+        if carbohydrates is not None and item.carbohydrates != carbohydrates:
+            item.carbohydrates = carbohydrates
+            changed.append(item)
+    if changed:
+        FoodItem.objects.bulk_update(changed, ['carbohydrates'])
+    items = {name: by_key[normalize_food_name(name)] for name in carbohydrates_by_name}
+    if missing or changed:
+        # Bulk writes send no signals.
+        bump_catalog_version()
+    return items
+
+
+# Column names of common nutrition tables mapped onto FoodItem fields.
+NUTRITION_FIELD_ALIASES = {
+    'name': 'name',
+    'назва': 'name',
+    'product': 'name',
+    'proteins': 'proteins',
+    'protein': 'proteins',
+    'білки': 'proteins',
+    'fats': 'fats',
+    'fat': 'fats',
+    'жири': 'fats',
+    'carbohydrates': 'carbohydrates',
+    'carbs': 'carbohydrates',
+    'вуглеводи': 'carbohydrates',
+}
+NUTRIENT_FIELDS = ('proteins', 'fats', 'carbohydrates')
+MAX_NUTRIENT_VALUE = Decimal('9999.99')
+CENT = Decimal('0.01')
+
+
+def clean_nutrition_row(raw):
+    """Return ``(values, error)`` for one nutrition table row; values per 100 g."""
+    if not isinstance(raw, dict):
+        return None, 'Рядок має бути об\'єктом'
+    row = {}
+    for key, value in raw.items():
+        field = NUTRITION_FIELD_ALIASES.get(str(key).strip().lower()) if key is not None else None
+        if field:
+            row[field] = value
+    name = ' '.join(str(row.get('name') or '').split())
+    if not name:
+        return None, 'Порожня назва'
+    if len(name) > 200:
+        return None, 'Назва довша за 200 символів'
+    values = {'name': name}
+    for field in NUTRIENT_FIELDS:
+        raw_value = row.get(field)
+        try:
+            value = Decimal(str(raw_value).strip().replace(',', '.')) if raw_value not in (None, '') else Decimal('0')
+        except InvalidOperation:
+            return None, f'Некоректне значення {field}: {raw_value}'
+        if not value.is_finite() or value < 0 or value > MAX_NUTRIENT_VALUE:
+            return None, f'Некоректне значення {field}: {raw_value}'
+        values[field] = value.quantize(CENT)
+    return values, None
+
+
+def _upsert_food_items(batch, batch_size):
+    with transaction.atomic():
+        FoodItem.objects.bulk_create(
+            [FoodItem(normalized_name=key, **values) for key, values in batch.items()],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['normalized_name'],
+            update_fields=['name', *NUTRIENT_FIELDS],
+        )
+
+
+def load_food_items(stream, file_format='csv', batch_size=None, max_reported_errors=100, progress=None):
+    """
+    Upsert a nutrition table (CSV, NDJSON or JSON array) into the food catalog.
+
+    Rows are deduplicated by normalized name (the last row wins) and written in
+    batches, each in its own transaction. ``progress(rows_read, rows_loaded)``
+    is called after every batch.
+    """
+    from .imports import iter_import_rows
+
+    batch_size = batch_size or getattr(settings, 'FOOD_LOAD_BATCH_SIZE', 5000)
+    report = {'rows': 0, 'loaded': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+    batch = {}
+    for row_number, raw in iter_import_rows(stream, file_format):
+        report['rows'] += 1
+        values, error = clean_nutrition_row(raw)
+        if error:
+            report['error_count'] += 1
+            if len(report['errors']) < max_reported_errors:
+                report['errors'].append({'row': row_number, 'error': error})
+            continue
+        key = normalize_food_name(values['name'])
+        if key in batch:
+            # One INSERT ... ON CONFLICT may not touch the same row twice.
+            report['duplicates'] += 1
+        batch[key] = values
+        if len(batch) >= batch_size:
+            _upsert_food_items(batch, batch_size)
+            report['loaded'] += len(batch)
+            batch = {}
+            if progress:
+                progress(report['rows'], report['loaded'])
+    if batch:
+        _upsert_food_items(batch, batch_size)
+        report['loaded'] += len(batch)
+        if progress:
+            progress(report['rows'], report['loaded'])
+    if report['loaded']:
+        bump_catalog_version()
+    return report
+
+
+FOOD_CATALOG_VERSION_KEY = 'food_catalog:version'
+
+# Ukrainian national transliteration (2010), simplified to one variant per letter.
+TRANSLITERATION = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh',
+    'з': 'z', 'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n',
+    'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', 'ё': 'e', 'ы': 'y', 'э': 'e',
+    'ъ': '', "'": '',
+}
+# Common alternative spellings typed by users (Russian-style "g" for "г", "y" for "й"...)
+TRANSLITERATION_VARIANTS = {'г': 'g', 'и': 'i', 'й': 'y', 'х': 'h', 'ю': 'yu', 'я': 'ya', 'є': 'ye', 'ї': 'yi'}
+
+def transliterate(text, variants=False):
+    table = {**TRANSLITERATION, **TRANSLITERATION_VARIANTS} if variants else TRANSLITERATION
+    return ''.join(table.get(char, char) for char in text)
+
+
+def _spellings(phrase):
+    return {phrase, transliterate(phrase), transliterate(phrase, variants=True)}
+
+
+def index_keys(name):
+    """
+    ``(name keys, word keys)`` of a product: spellings of the whole normalized
+    name and of every phrase starting at a later word.
+    """
+    words = normalize_food_name(name).split(' ')
+    name_keys = _spellings(' '.join(words))
+    word_keys = set()
+    for start in range(1, len(words)):
+        word_keys.update(_spellings(' '.join(words[start:])))
+    name_keys.discard('')
+    return name_keys, word_keys - name_keys
+
+
+def get_catalog_version():
+    version = cache.get(FOOD_CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(FOOD_CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(FOOD_CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(FOOD_CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(FOOD_CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+class _SortedKeys:
+    def __init__(self, entries):
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [item_id for _, item_id in entries]
+
+    def scan(self, prefix):
+        position = bisect.bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            yield self.ids[position]
+            position += 1
+
+
+class FoodCatalogIndex:
+    """
+    Sorted arrays of ``(key, item id)`` pairs; a prefix lookup is one ``bisect``
+    followed by a scan that stops after ``limit`` distinct products. Products
+    whose name starts with the query are listed before matches on a later word.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.items = {}
+        name_entries = []
+        word_entries = []
+        for item_id, name, carbohydrates in rows:
+            self.items[item_id] = (name, carbohydrates)
+            name_keys, word_keys = index_keys(name)
+            name_entries.extend((key, item_id) for key in name_keys)
+            word_entries.extend((key, item_id) for key in word_keys)
+        self.names = _SortedKeys(name_entries)
+        self.words = _SortedKeys(word_entries)
+
+    def search(self, query, limit=10):
+        prefix = normalize_food_name(query)
+        found = []
+        if not prefix:
+            return found
+        seen = set()
+        for keys in (self.names, self.words):
+            for item_id in keys.scan(prefix):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                name, carbohydrates = self.items[item_id]
+                found.append({'id': item_id, 'name': name, 'carbohydrates': carbohydrates})
+                if len(found) >= limit:
+                    return found
+        return found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_food_index():
+    """Per-process index, rebuilt when the catalog version in the cache changes."""
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            rows = FoodItem.objects.order_by().values_list('id', 'name', 'carbohydrates').iterator(chunk_size=2000)
+            _index = FoodCatalogIndex(rows, version=version)
+        return _index
+
+
+def search_food_items(query, limit=None):
+    limit = limit or getattr(settings, 'FOOD_AUTOCOMPLETE_LIMIT', 10)
+    return get_food_index().search(query, limit=limit)
@@ -1,9 +1,9 @@
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
 
+from .foods import resolve_food_items
 from .models import (
     AnthropometricMeasurement,
-    FoodItem,
     FoodMeasurement,
     FoodPortion,
     GlucoseMeasurement,
@@ -51,9 +51,13 @@ class FoodMeasurementForm(forms.ModelForm):
 
 
 class FoodPortionForm(forms.ModelForm):
-    food_name = forms.CharField(label='Назва продукту', max_length=200)
+    food_name = forms.CharField(
+        label='Назва продукту',
+        max_length=200,
+        widget=forms.TextInput(attrs={'list': 'food-suggestions', 'autocomplete': 'off', 'data-food-autocomplete': ''}),
+    )
     carbohydrates = forms.DecimalField(
-        label='Вуглеводи (г у порції)',
+        label='Вуглеводи (г на 100 г)',
         max_digits=6,
         decimal_places=2,
         required=False,
@@ -69,46 +73,112 @@ class FoodPortionForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.food_item = None
         self.fields['grams'].required = False
         if self.instance and self.instance.pk and self.instance.food:
             self.fields['food_name'].initial = self.instance.food.name
             self.fields['carbohydrates'].initial = self.instance.food.carbohydrates
 
+    def clean(self):
+        cleaned_data = super().clean()
+        food_name = (cleaned_data.get('food_name') or '').strip()
+        if food_name and cleaned_data.get('grams') is None and 'grams' not in self.errors:
+            self.add_error('grams', 'Вкажіть вагу порції')
+        return cleaned_data
+
     def save(self, commit=True):
-        food_name = self.cleaned_data.get('food_name')
-        carbs = self.cleaned_data.get('carbohydrates', 0) or 0
+        food_name = (self.cleaned_data.get('food_name') or '').strip()
+        carbs = self.cleaned_data.get('carbohydrates')
 
-        if not food_name or not food_name.strip():
+        if not food_name:
             if self.instance.pk:
                 return self.instance
             return None
 
-        defaults = {
-            'proteins': 0,
-            'fats': 0,
-            'carbohydrates': carbs,
-        }
-        food_item, created = FoodItem.objects.get_or_create(
-            name=food_name.strip(),
-            defaults=defaults,
-        )
-        
-        if not created:
-            if food_item.carbohydrates != carbs:
-                food_item.carbohydrates = carbs
-                food_item.save(update_fields=['carbohydrates'])
-
-        self.instance.food = food_item
+        if self.food_item is None:
+            # Standalone use; inside a formset the items are resolved for all rows at once.
+            self.food_item = resolve_food_items({food_name: carbs})[food_name]
+        self.instance.food = self.food_item
 
         if commit:
             return super().save(commit=True)
         return self.instance
 
 
+class BaseFoodPortionFormSet(BaseInlineFormSet):
+    def __init__(self, *args, **kwargs):
+        # Every edit row shows its product, so load them with the portions.
+        kwargs.setdefault('queryset', FoodPortion.objects.select_related('food'))
+        super().__init__(*args, **kwargs)
+
+    def portion_forms(self):
+        """Valid, non-deleted forms that name a product."""
+        for form in self.forms:
+            cleaned_data = getattr(form, 'cleaned_data', None)
+            if not cleaned_data or self._should_delete_form(form):
+                continue
+            if (cleaned_data.get('food_name') or '').strip():
+                yield form
+
+    def bread_unit(self):
+        """
+        Bread units of the submitted portions.
+
+        A blank carbohydrates field means the catalog value of the resolved product.
+        """
+        self.resolve_food_items()
+        portions = []
+        for form in self.portion_forms():
+            carbohydrates = form.cleaned_data.get('carbohydrates')
+            if carbohydrates is None:
+                food = form.food_item or form.instance.food
+                carbohydrates = food.carbohydrates if food else None
+            portions.append((carbohydrates, form.cleaned_data.get('grams')))
+        return FoodMeasurement.bread_units_for(portions)
+
+    def resolve_food_items(self):
+        """Resolve the products of all added or edited rows with one batch of queries (once per formset)."""
+        if getattr(self, '_food_items_resolved', False):
+            return
+        forms_by_name = {}
+        carbohydrates_by_name = {}
+        for form in self.portion_forms():
+            if form.instance.pk and not form.has_changed():
+                continue
+            name = form.cleaned_data['food_name'].strip()
+            forms_by_name.setdefault(name, []).append(form)
+            carbohydrates = form.cleaned_data.get('carbohydrates')
+            if carbohydrates is not None or name not in carbohydrates_by_name:
+                carbohydrates_by_name[name] = carbohydrates
+        items = resolve_food_items(carbohydrates_by_name)
+        for name, forms_for_name in forms_by_name.items():
+            for form in forms_for_name:
+                form.food_item = items[name]
+        self._food_items_resolved = True
+
+    def save(self, commit=True):
+        self.resolve_food_items()
+        if not commit:
+            return super().save(commit=False)
+        # Collect the instances first, then write them with one bulk statement per kind of change.
+        super().save(commit=False)
+        new_portions = [portion for portion in self.new_objects if portion is not None]
+        changed_portions = [portion for portion, _ in self.changed_objects]
+        deleted_ids = [portion.pk for portion in self.deleted_objects]
+        if deleted_ids:
+            FoodPortion.objects.filter(pk__in=deleted_ids).delete()
+        if new_portions:
+            FoodPortion.objects.bulk_create(new_portions)
+        if changed_portions:
+            FoodPortion.objects.bulk_update(changed_portions, ['food', 'grams'])
+        return new_portions + changed_portions
+
+
 FoodPortionFormSet = inlineformset_factory(
     parent_model=FoodMeasurement,
     model=FoodPortion,
     form=FoodPortionForm,
+    formset=BaseFoodPortionFormSet,
     extra=1,
     can_delete=True,
 )
@@ -117,6 +187,7 @@ FoodPortionFormSetEdit = inlineformset_factory(
     parent_model=FoodMeasurement,
     model=FoodPortion,
     form=FoodPortionForm,
+    formset=BaseFoodPortionFormSet,
     extra=0,
     can_delete=True,
 )
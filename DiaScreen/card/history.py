@@ -0,0 +1,123 @@
+"""
+Keyset-paginated measurement history for the patient card.
+
+Pages are ordered newest first by ``(measured_at, id)`` and continue from an
+opaque cursor holding the last row's key, so every page is an index range
+scan no matter how deep the client has scrolled.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FoodPortion
+
+HISTORY_SOURCES = {
+    'glucose': {
+        'model': 'GlucoseMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_measurement',
+        'fields': ['glucose', 'glucose_measurement_category'],
+    },
+    'insuline': {
+        'model': 'InsulineDoseMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time',
+        'fields': ['insuline_dose', 'category'],
+    },
+    'food': {
+        'model': 'FoodMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_eating',
+        'fields': ['category', 'bread_unit', 'insuline_dose_before', 'insuline_dose_after'],
+    },
+    'activity': {
+        'model': 'PhysicalActivityMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_activity',
+        'fields': ['type_of_activity__name', 'number_of_approaches', 'commentary'],
+    },
+    'glycemic': {
+        'model': 'GlycemicProfileMeasurement',
+        'date': 'measurement_date',
+        'time': 'measurement_time',
+        'fields': ['average_glucose', 'hba1c', 'hypoglycemic_events', 'hyperglycemic_events'],
+    },
+    'anthropometry': {
+        'model': 'AnthropometricMeasurement',
+        'date': 'measurement_date',
+        'time': 'measurement_time',
+        'fields': ['weight', 'bmi', 'waist_circumference', 'hip_circumference', 'notes'],
+    },
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def format_moment(measured_at):
+    # Naive UTC keeps "+" out of the cursor, which clients tend to forget to URL-encode.
+    return measured_at.astimezone(dt_timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def parse_moment(raw):
+    return datetime.fromisoformat(raw).replace(tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(measured_at, pk):
+    return f"{format_moment(measured_at)}_{pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        raw_measured_at, raw_pk = cursor.split('_')
+        return parse_moment(raw_measured_at), int(raw_pk)
+    except (AttributeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def _after_cursor(cursor):
+    """Rows strictly older than the cursor in ``(measured_at, id)`` descending order."""
+    cursor_measured_at, cursor_pk = decode_cursor(cursor)
+    return Q(measured_at__lt=cursor_measured_at) | Q(measured_at=cursor_measured_at, pk__lt=cursor_pk)
+
+
+def fetch_history_page(patient, kind, cursor=None, limit=None):
+    """
+    Return ``(rows, next_cursor)`` for one page of a measurement type.
+
+    Raises ``KeyError`` for an unknown kind and ``InvalidCursor`` for a malformed cursor.
+    """
+    source = HISTORY_SOURCES[kind]
+    max_limit = getattr(settings, 'CARD_HISTORY_MAX_PAGE_SIZE', 200)
+    limit = min(max(int(limit or getattr(settings, 'CARD_HISTORY_PAGE_SIZE', 50)), 1), max_limit)
+
+    model = apps.get_model('card', source['model'])
+    qs = model.objects.filter(patient=patient)
+    if cursor:
+        qs = qs.filter(_after_cursor(cursor))
+    rows = list(
+        qs.order_by('-measured_at', '-pk')
+        .values('id', 'measured_at', source['date'], source['time'], *source['fields'])[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['measured_at'], last['id'])
+
+    if kind == 'food' and rows:
+        portions = {}
+        for measurement_id, food_name, grams in (
+            FoodPortion.objects.filter(measurement_id__in=[row['id'] for row in rows])
+            .order_by('pk')
+            .values_list('measurement_id', 'food__name', 'grams')
+        ):
+            portions.setdefault(measurement_id, []).append({'food': food_name, 'grams': grams})
+        for row in rows:
+            row['portions'] = portions.get(row['id'], [])
+
+    return rows, next_cursor
@@ -0,0 +1,245 @@
+"""
+Bulk import of glucose meter history from CSV, NDJSON or JSON-array files.
+
+Uploads are parsed as a stream and validated with the field rules of
+``GlucoseMeasurementForm``. Duplicates are dropped both within the file and
+against the patient's stored readings (same date, time and value). The
+remaining rows are written with ``bulk_create`` in batches inside one
+transaction. ``bulk_create`` sends no ``post_save``, so per-row signal work
+is skipped. Counters and the latest-readings snapshot are updated once for
+the whole import.
+"""
+import codecs
+import csv
+import json
+from datetime import date, time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from user_auth.stats import adjust_site_counter
+
+from .forms import GlucoseMeasurementForm
+from .models import GlucoseMeasurement
+from .series import rebuild_day_series, series_enabled
+from .snapshots import refresh_snapshot
+
+IMPORT_FIELDS = ['glucose', 'glucose_measurement_category', 'date_of_measurement', 'time_of_measurement']
+
+# Column names used by common meter exports mapped onto model fields.
+FIELD_ALIASES = {
+    'glucose': 'glucose',
+    'value': 'glucose',
+    'glucose_mmol': 'glucose',
+    'date': 'date_of_measurement',
+    'date_of_measurement': 'date_of_measurement',
+    'time': 'time_of_measurement',
+    'time_of_measurement': 'time_of_measurement',
+    'category': 'glucose_measurement_category',
+    'glucose_measurement_category': 'glucose_measurement_category',
+}
+
+JSON_READ_SIZE = 64 * 1024
+
+ISO_PARSERS = {
+    'date_of_measurement': date.fromisoformat,
+    'time_of_measurement': time.fromisoformat,
+}
+
+
+def _normalize_row(raw):
+    row = {}
+    for key, value in raw.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower()) if key is not None else None
+        if field:
+            row[field] = value.strip() if isinstance(value, str) else value
+    timestamp = raw.get('datetime') or raw.get('timestamp')
+    if timestamp and ('date_of_measurement' not in row or 'time_of_measurement' not in row):
+        date_part, _, time_part = str(timestamp).replace('T', ' ').partition(' ')
+        row.setdefault('date_of_measurement', date_part)
+        row.setdefault('time_of_measurement', time_part[:8])
+    return row
+
+
+def _iter_csv(text):
+    reader = csv.DictReader(text)
+    for row_number, raw in enumerate(reader, start=2):
+        yield row_number, raw
+
+
+def _iter_json(text):
+    """
+    Yield objects from NDJSON or from a top-level JSON array without loading the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buffer = text.read(JSON_READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        row_number = 0
+        for line in _iter_lines(buffer, text):
+            row_number += 1
+            if line.strip():
+                yield row_number, json.loads(line)
+        return
+
+    position = 1
+    row_number = 0
+    eof = False
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = text.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        if position >= len(buffer) or buffer[position] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = text.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        row_number += 1
+        yield row_number, obj
+        buffer, position = buffer[end:], 0
+
+
+def _iter_lines(head, text):
+    pending = head
+    while True:
+        *lines, pending = pending.split('\n')
+        yield from lines
+        chunk = text.read(JSON_READ_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+    if pending:
+        yield pending
+
+
+def iter_import_rows(stream, file_format):
+    """Yield ``(row_number, raw_dict)`` from a binary stream in ``csv`` or ``json`` format."""
+    text = codecs.getreader('utf-8-sig')(stream)
+    if file_format == 'csv':
+        yield from _iter_csv(text)
+    elif file_format == 'json':
+        yield from _iter_json(text)
+    else:
+        raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def detect_format(filename):
+    return 'json' if filename.lower().endswith(('.json', '.ndjson', '.jsonl')) else 'csv'
+
+
+def clean_import_row(raw):
+    """Validate one row with the ``GlucoseMeasurementForm`` field rules; returns ``(data, errors)``."""
+    row = _normalize_row(raw) if isinstance(raw, dict) else {}
+    data, errors = {}, {}
+    for name in IMPORT_FIELDS:
+        field = GlucoseMeasurementForm.base_fields[name]
+        raw_value = row.get(name)
+        parse_iso = ISO_PARSERS.get(name)
+        if parse_iso and isinstance(raw_value, str):
+            # Meter exports are almost always ISO; skip the form's strptime loop over input formats.
+            try:
+                data[name] = parse_iso(raw_value)
+                continue
+            except ValueError:
+                pass
+        try:
+            value = field.clean(raw_value)
+            # The form also runs model field validators (e.g. the 0.5-35 range) in _post_clean.
+            if value not in field.empty_values:
+                GlucoseMeasurement._meta.get_field(name).run_validators(value)
+            data[name] = value
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if not data.get('glucose_measurement_category'):
+        data['glucose_measurement_category'] = None
+    return data, errors
+
+
+def _flush(patient, pending, seen, batch_size):
+    dates = {data['date_of_measurement'] for data in pending}
+    existing = set(
+        GlucoseMeasurement.objects.filter(patient=patient, date_of_measurement__in=dates)
+        .values_list('date_of_measurement', 'time_of_measurement', 'glucose')
+    )
+    objects = []
+    duplicates = 0
+    for data in pending:
+        key = (data['date_of_measurement'], data['time_of_measurement'], data['glucose'])
+        if key in existing or key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        objects.append(GlucoseMeasurement(patient=patient, **data))
+    GlucoseMeasurement.objects.bulk_create(objects, batch_size=batch_size)
+    return len(objects), duplicates
+
+
+def import_glucose_readings(patient, stream, file_format='csv', batch_size=None, max_reported_errors=None):
+    """
+    Import glucose readings for ``patient``.
+
+    Returns a report: ``created``, ``duplicates``, ``error_count`` and ``errors``
+    (``[{'row': n, 'errors': {...}}]``, capped at ``max_reported_errors``).
+    """
+    batch_size = batch_size or getattr(settings, 'GLUCOSE_IMPORT_BATCH_SIZE', 2000)
+    if max_reported_errors is None:
+        max_reported_errors = getattr(settings, 'GLUCOSE_IMPORT_MAX_REPORTED_ERRORS', 100)
+
+    report = {'created': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+    seen = set()
+    pending = []
+    imported_days = set()
+
+    def report_error(row_number, errors):
+        report['error_count'] += 1
+        if len(report['errors']) < max_reported_errors:
+            report['errors'].append({'row': row_number, 'errors': errors})
+
+    with transaction.atomic():
+        rows = iter_import_rows(stream, file_format)
+        while True:
+            try:
+                row_number, raw = next(rows)
+            except StopIteration:
+                break
+            except (csv.Error, UnicodeDecodeError, ValueError) as exc:
+                # A malformed document cannot be resynchronised; stop at the first broken chunk.
+                report_error(None, {'__all__': [str(exc)]})
+                break
+
+            data, errors = clean_import_row(raw)
+            if errors:
+                report_error(row_number, errors)
+                continue
+            pending.append(data)
+            imported_days.add(data['date_of_measurement'])
+            if len(pending) >= batch_size:
+                created, duplicates = _flush(patient, pending, seen, batch_size)
+                report['created'] += created
+                report['duplicates'] += duplicates
+                pending = []
+
+        if pending:
+            created, duplicates = _flush(patient, pending, seen, batch_size)
+            report['created'] += created
+            report['duplicates'] += duplicates
+
+        if report['created']:
+            created_total = report['created']
+            transaction.on_commit(lambda: adjust_site_counter('glucose', created_total))
+            transaction.on_commit(lambda: refresh_snapshot(patient.pk, kinds=['glucose']))
+            if series_enabled():
+                transaction.on_commit(lambda: rebuild_day_series(patient.pk, imported_days))
+
+    return report
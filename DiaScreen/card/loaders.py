@@ -0,0 +1,51 @@
+"""
+Data loader for the patient card page.
+
+Fetches the most recent records of every measurement type with one query per
+type and derives everything else (latest record, inactivity warning) from
+those lists, so the page costs a fixed number of queries.
+"""
+from datetime import timedelta
+
+from django.apps import apps
+from django.utils import timezone
+
+from .snapshots import SNAPSHOT_SOURCES
+
+CARD_LIST_SIZE = 10
+
+CARD_SELECT_RELATED = {
+    'activity': ['type_of_activity'],
+}
+
+NO_RECORDS_WARNING = 'Ви ще не додали жодного запису. Почніть вести картку, щоб система могла аналізувати ваш стан.'
+INACTIVITY_WARNING = 'Більше двох днів без нових записів у картці. Будь ласка, оновіть дані для точнішого моніторингу.'
+
+
+def load_patient_card(patient, limit=CARD_LIST_SIZE):
+    """
+    Return ``{kind}_list`` and ``{kind}_latest`` for every measurement type plus ``inactivity_warning``.
+    """
+    data = {}
+    latest_dt = None
+    for kind, source in SNAPSHOT_SOURCES.items():
+        model = apps.get_model('card', source['model'])
+        records = list(
+            model.objects.filter(patient=patient)
+            .select_related(*CARD_SELECT_RELATED.get(kind, []))
+            .order_by('-measured_at', '-pk')[:limit]
+        )
+        latest = records[0] if records else None
+        data[f'{kind}_list'] = records
+        data[f'{kind}_latest'] = latest
+
+        if latest is not None and (latest_dt is None or latest.measured_at > latest_dt):
+            latest_dt = latest.measured_at
+
+    if latest_dt is None:
+        data['inactivity_warning'] = NO_RECORDS_WARNING
+    elif timezone.now() - latest_dt > timedelta(days=2):
+        data['inactivity_warning'] = INACTIVITY_WARNING
+    else:
+        data['inactivity_warning'] = None
+    return data
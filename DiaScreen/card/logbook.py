@@ -0,0 +1,144 @@
+"""
+Unified chronological logbook of glucose, insulin, food and activity entries.
+
+Each measurement table is read with ``.iterator()`` in ``(measured_at, id)``
+order and the streams are combined with ``heapq.merge``; only one chunk per
+table is held in memory, so a logbook over any date range streams in
+constant memory. Entries sharing a timestamp are ordered by kind, then id.
+"""
+import heapq
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+
+from .history import format_moment, parse_moment
+
+LOGBOOK_SOURCES = [
+    {
+        'kind': 'glucose',
+        'label': 'Глюкоза',
+        'model': 'GlucoseMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_measurement',
+        'fields': ['glucose', 'glucose_measurement_category'],
+    },
+    {
+        'kind': 'insuline',
+        'label': 'Інсулін',
+        'model': 'InsulineDoseMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time',
+        'fields': ['insuline_dose', 'category'],
+    },
+    {
+        'kind': 'food',
+        'label': 'Їжа',
+        'model': 'FoodMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_eating',
+        'fields': ['category', 'bread_unit', 'insuline_dose_before'],
+    },
+    {
+        'kind': 'activity',
+        'label': 'Активність',
+        'model': 'PhysicalActivityMeasurement',
+        'date': 'date_of_measurement',
+        'time': 'time_of_activity',
+        'fields': ['type_of_activity__name', 'number_of_approaches'],
+    },
+]
+
+KIND_ORDER = {source['kind']: index for index, source in enumerate(LOGBOOK_SOURCES)}
+
+
+def encode_cursor(entry):
+    return f"{format_moment(entry['measured_at'])}_{entry['kind']}_{entry['id']}"
+
+
+def decode_cursor(cursor):
+    """Return the ``(measured_at, kind_order, id)`` key encoded in a cursor; raises ``ValueError``."""
+    try:
+        raw_measured_at, kind, raw_pk = cursor.split('_')
+        return parse_moment(raw_measured_at), KIND_ORDER[kind], int(raw_pk)
+    except (AttributeError, KeyError, ValueError):
+        raise ValueError(f'Invalid logbook cursor: {cursor!r}')
+
+
+def describe_entry(entry):
+    """Short human-readable value and details for one logbook entry."""
+    kind = entry['kind']
+    if kind == 'glucose':
+        return f"{entry['glucose']} ммоль/л", entry['glucose_measurement_category'] or ''
+    if kind == 'insuline':
+        return f"{entry['insuline_dose']} ОД", entry['category']
+    if kind == 'food':
+        bread_unit = f"{entry['bread_unit']} ХЕ" if entry['bread_unit'] is not None else '—'
+        return bread_unit, f"{entry['category']}, доза до {entry['insuline_dose_before']} ОД"
+    approaches = entry['number_of_approaches']
+    details = f"{approaches} підходів" if approaches is not None else ''
+    return entry['type_of_activity__name'], details
+
+
+def _after(source, key):
+    """Rows of ``source`` that sort strictly after ``key`` in the merged order."""
+    cursor_measured_at, cursor_kind, cursor_pk = key
+    condition = Q(measured_at__gt=cursor_measured_at)
+    kind_order = KIND_ORDER[source['kind']]
+    if kind_order > cursor_kind:
+        condition |= Q(measured_at=cursor_measured_at)
+    elif kind_order == cursor_kind:
+        condition |= Q(measured_at=cursor_measured_at, pk__gt=cursor_pk)
+    return condition
+
+
+def _stream(source, patient, start, end, after_key, chunk_size):
+    model = apps.get_model('card', source['model'])
+    date_field, time_field = source['date'], source['time']
+    qs = model.objects.filter(patient=patient)
+    if start:
+        qs = qs.filter(**{f'{date_field}__gte': start})
+    if end:
+        qs = qs.filter(**{f'{date_field}__lte': end})
+    if after_key:
+        qs = qs.filter(_after(source, after_key))
+
+    kind = source['kind']
+    kind_order = KIND_ORDER[kind]
+    rows = (
+        qs.order_by('measured_at', 'pk')
+        .values('id', 'measured_at', date_field, time_field, *source['fields'])
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        entry = {
+            'kind': kind,
+            'label': source['label'],
+            'id': row.pop('id'),
+            'measured_at': row.pop('measured_at'),
+            'date': row.pop(date_field),
+            'time': row.pop(time_field),
+            **row,
+        }
+        yield (entry['measured_at'], kind_order, entry['id']), entry
+
+
+def iter_logbook(patient, start=None, end=None, cursor=None, chunk_size=None):
+    """Yield logbook entries in chronological order, continuing after ``cursor`` if given."""
+    after_key = decode_cursor(cursor) if cursor else None
+    chunk_size = chunk_size or getattr(settings, 'LOGBOOK_CHUNK_SIZE', 500)
+    streams = [_stream(source, patient, start, end, after_key, chunk_size) for source in LOGBOOK_SOURCES]
+    for _, entry in heapq.merge(*streams, key=lambda item: item[0]):
+        yield entry
+
+
+def logbook_page(patient, start=None, end=None, cursor=None, limit=None):
+    """Return ``(entries, next_cursor)`` for one page of the logbook."""
+    limit = min(max(int(limit or getattr(settings, 'LOGBOOK_PAGE_SIZE', 100)), 1), getattr(settings, 'LOGBOOK_MAX_PAGE_SIZE', 500))
+    entries = list(islice(iter_logbook(patient, start, end, cursor, chunk_size=limit + 1), limit + 1))
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1])
+    return entries, next_cursor
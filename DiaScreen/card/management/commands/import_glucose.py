@@ -0,0 +1,39 @@
+"""
+Django management command для імпорту історії замірів глюкози з CSV/JSON файлу.
+
+Використання:
+    python manage.py import_glucose <username> readings.csv
+    python manage.py import_glucose <username> readings.json --format json
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from card.imports import detect_format, import_glucose_readings
+
+
+class Command(BaseCommand):
+    help = 'Імпортує заміри глюкози пацієнта з CSV або JSON файлу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Ім'я користувача пацієнта")
+        parser.add_argument('path', help='Шлях до файлу з замірами')
+        parser.add_argument('--format', choices=['csv', 'json'], default=None, help='Формат файлу (за замовчуванням — за розширенням)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Кількість записів в одній вставці')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            patient = User.objects.get(username=options['username']).profile
+        except User.DoesNotExist:
+            raise CommandError(f"Користувача {options['username']} не знайдено")
+
+        file_format = options['format'] or detect_format(options['path'])
+        with open(options['path'], 'rb') as stream:
+            report = import_glucose_readings(patient, stream, file_format, batch_size=options['batch_size'])
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"Рядок {error['row']}: {error['errors']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Імпортовано: {report['created']}, дублікатів: {report['duplicates']}, помилок: {report['error_count']}"
+        ))
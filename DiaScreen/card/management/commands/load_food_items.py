@@ -0,0 +1,44 @@
+"""
+Django management command для завантаження таблиці харчової цінності продуктів у каталог.
+
+Використання:
+    python manage.py load_food_items nutrition.csv
+    python manage.py load_food_items nutrition.json --format json --batch-size 10000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from card.foods import load_food_items
+from card.imports import detect_format
+
+
+class Command(BaseCommand):
+    help = 'Завантажує продукти (назва, білки, жири, вуглеводи на 100 г) з CSV або JSON з оновленням наявних'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Шлях до файлу з продуктами')
+        parser.add_argument('--format', choices=['csv', 'json'], default=None, help='Формат файлу (за замовчуванням — за розширенням)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Кількість продуктів в одній вставці')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        started = time.monotonic()
+
+        def progress(rows, loaded):
+            elapsed = max(time.monotonic() - started, 0.001)
+            self.stdout.write(f'Прочитано рядків: {rows}, збережено: {loaded} ({int(rows / elapsed)} рядків/с)')
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = load_food_items(stream, file_format, batch_size=options['batch_size'], progress=progress)
+        except OSError as exc:
+            raise CommandError(f'Не вдалося прочитати файл: {exc}')
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"Рядок {error['row']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Завантажено продуктів: {report['loaded']}, дублікатів: {report['duplicates']}, "
+            f"помилок: {report['error_count']}, час: {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,57 @@
+"""
+Django management command для обслуговування щомісячних партицій таблиць замірів (PostgreSQL).
+
+Використання:
+    python manage.py manage_partitions convert
+    python manage.py manage_partitions create --months-ahead 3
+    python manage.py manage_partitions detach --keep-months 36 --archive-schema archive
+    python manage.py manage_partitions detach --keep-months 36 --drop
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from card.partitioning import (
+    convert_all,
+    detach_old_partitions,
+    ensure_future_partitions,
+    partitioning_supported,
+)
+
+
+class Command(BaseCommand):
+    help = 'Переводить таблиці замірів на щомісячні партиції та підтримує набір партицій'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'create', 'detach'], help='Дія: convert, create або detach')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Скільки майбутніх місяців створити наперед')
+        parser.add_argument('--keep-months', type=int, default=36, help='Скільки останніх місяців залишати приєднаними')
+        parser.add_argument('--archive-schema', default=None, help='Схема, куди переносяться від\'єднані партиції')
+        parser.add_argument('--drop', action='store_true', help='Видаляти від\'єднані партиції замість архівування')
+
+    def handle(self, *args, **options):
+        if not partitioning_supported(connection):
+            self.stdout.write(f'Партиціювання підтримується лише на PostgreSQL ({connection.vendor}): нічого не змінено')
+            return
+
+        action = options['action']
+        if action == 'convert':
+            with transaction.atomic():
+                converted = convert_all(connection)
+                ensure_future_partitions(connection, options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Переведено на партиції таблиць: {len(converted)}'))
+        elif action == 'create':
+            with transaction.atomic():
+                created = ensure_future_partitions(connection, options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Створено партицій: {len(created)}'))
+        else:
+            if options['keep_months'] < 1:
+                raise CommandError('--keep-months має бути не менше 1')
+            with transaction.atomic():
+                detached = detach_old_partitions(
+                    connection,
+                    options['keep_months'],
+                    archive_schema=options['archive_schema'],
+                    drop=options['drop'],
+                )
+            self.stdout.write(self.style.SUCCESS(f'Від\'єднано партицій: {len(detached)}'))
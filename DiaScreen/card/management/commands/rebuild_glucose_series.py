@@ -0,0 +1,50 @@
+"""
+Django management command для перебудови добових серій глюкози з сирих замірів.
+
+Використання:
+    python manage.py rebuild_glucose_series
+    python manage.py rebuild_glucose_series --since 2024-01-01
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from card.models import GlucoseMeasurement
+from card.series import mark_series_backfilled, rebuild_day_series
+
+
+class Command(BaseCommand):
+    help = 'Пакує заміри глюкози в добові серії для швидкої аналітики'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, default=None, help='Перебудувати дні починаючи з дати (YYYY-MM-DD)')
+        parser.add_argument('--batch-days', type=int, default=100, help='Кількість днів пацієнта за один прохід')
+
+    def handle(self, *args, **options):
+        # Later inserts are packed by the signals, so a full pass covers everything up to here.
+        last_id = GlucoseMeasurement.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        qs = GlucoseMeasurement.objects.all()
+        if options['since']:
+            qs = qs.filter(date_of_measurement__gte=options['since'])
+
+        pending = {}
+        rebuilt = 0
+        for patient_id, day in (
+            qs.order_by('patient_id', 'date_of_measurement')
+            .values_list('patient_id', 'date_of_measurement')
+            .distinct()
+            .iterator()
+        ):
+            days = pending.setdefault(patient_id, [])
+            days.append(day)
+            if len(days) >= options['batch_days']:
+                rebuild_day_series(patient_id, pending.pop(patient_id))
+                rebuilt += len(days)
+        for patient_id, days in pending.items():
+            rebuild_day_series(patient_id, days)
+            rebuilt += len(days)
+
+        if not options['since']:
+            mark_series_backfilled(last_id)
+        self.stdout.write(self.style.SUCCESS(f'Перебудовано добових серій: {rebuilt}'))
@@ -0,0 +1,31 @@
+"""
+Django management command для реєстрації пристрою моніторингу глюкози (CGM).
+
+Використання:
+    python manage.py register_glucose_device <username> "Libre 3"
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from card.models import GlucoseDevice
+
+
+class Command(BaseCommand):
+    help = 'Реєструє CGM-пристрій пацієнта та виводить токен для передачі замірів'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Ім'я користувача пацієнта")
+        parser.add_argument('name', help='Назва пристрою')
+        parser.add_argument('--source', default=None, help='Ідентифікатор джерела (за замовчуванням генерується)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            patient = User.objects.get(username=options['username']).profile
+        except User.DoesNotExist:
+            raise CommandError(f"Користувача {options['username']} не знайдено")
+
+        device, token = GlucoseDevice.register(patient, options['name'], source=options['source'])
+        self.stdout.write(self.style.SUCCESS(f'Пристрій {device.name} зареєстровано, джерело: {device.source}'))
+        self.stdout.write(f'Токен (показується лише один раз): {token}')
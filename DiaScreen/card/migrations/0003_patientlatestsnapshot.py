@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0002_anthropometricmeasurement_glycemicprofilemeasurement'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientLatestSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('glucose_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('glucose_at', models.DateTimeField(blank=True, null=True)),
+                ('glucose_value', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('glucose_category', models.CharField(blank=True, max_length=50, null=True)),
+                ('insuline_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('insuline_at', models.DateTimeField(blank=True, null=True)),
+                ('insuline_dose', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('insuline_category', models.CharField(blank=True, max_length=50, null=True)),
+                ('glycemic_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('glycemic_at', models.DateTimeField(blank=True, null=True)),
+                ('glycemic_average_glucose', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('glycemic_hba1c', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('activity_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('activity_at', models.DateTimeField(blank=True, null=True)),
+                ('activity_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('food_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('food_at', models.DateTimeField(blank=True, null=True)),
+                ('food_category', models.CharField(blank=True, max_length=50, null=True)),
+                ('anthropometry_record_id', models.BigIntegerField(blank=True, null=True)),
+                ('anthropometry_at', models.DateTimeField(blank=True, null=True)),
+                ('anthropometry_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('anthropometry_bmi', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='latest_snapshot', to='user_auth.patient')),
+            ],
+            options={
+                'verbose_name': 'Останні показники пацієнта',
+                'verbose_name_plural': 'Останні показники пацієнтів',
+            },
+        ),
+    ]
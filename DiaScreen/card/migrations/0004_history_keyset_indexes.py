@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0003_patientlatestsnapshot'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='anthropometricmeasurement',
+            options={'ordering': ['-measurement_date', '-measurement_time', '-id'], 'verbose_name': 'Антропометричний замір', 'verbose_name_plural': 'Антропометричні заміри'},
+        ),
+        migrations.AlterModelOptions(
+            name='foodmeasurement',
+            options={'ordering': ['-date_of_measurement', '-time_of_eating', '-id'], 'verbose_name': 'Замір їжі', 'verbose_name_plural': 'Заміри їжі'},
+        ),
+        migrations.AlterModelOptions(
+            name='glucosemeasurement',
+            options={'ordering': ['-date_of_measurement', '-time_of_measurement', '-id'], 'verbose_name': 'Замір глюкози', 'verbose_name_plural': 'Заміри глюкози'},
+        ),
+        migrations.AlterModelOptions(
+            name='glycemicprofilemeasurement',
+            options={'ordering': ['-measurement_date', '-measurement_time', '-id'], 'verbose_name': 'Замір глюкозного профілю', 'verbose_name_plural': 'Заміри глюкозного профілю'},
+        ),
+        migrations.AlterModelOptions(
+            name='insulinedosemeasurement',
+            options={'ordering': ['-date_of_measurement', '-time', '-id'], 'verbose_name': 'Замір інсуліну', 'verbose_name_plural': 'Заміри інсуліну'},
+        ),
+        migrations.AlterModelOptions(
+            name='physicalactivitymeasurement',
+            options={'ordering': ['-date_of_measurement', '-time_of_activity', '-id'], 'verbose_name': 'Замір фізичної активності', 'verbose_name_plural': 'Заміри фізичної активності'},
+        ),
+        migrations.AddIndex(
+            model_name='anthropometricmeasurement',
+            index=models.Index(fields=['patient', '-measurement_date', '-measurement_time', '-id'], name='card_anthro_patient_bfc4bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodmeasurement',
+            index=models.Index(fields=['patient', '-date_of_measurement', '-time_of_eating', '-id'], name='card_foodme_patient_5d6ac5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='glucosemeasurement',
+            index=models.Index(fields=['patient', '-date_of_measurement', '-time_of_measurement', '-id'], name='card_glucos_patient_2c7137_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='glycemicprofilemeasurement',
+            index=models.Index(fields=['patient', '-measurement_date', '-measurement_time', '-id'], name='card_glycem_patient_7d9d76_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insulinedosemeasurement',
+            index=models.Index(fields=['patient', '-date_of_measurement', '-time', '-id'], name='card_insuli_patient_5f757a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='physicalactivitymeasurement',
+            index=models.Index(fields=['patient', '-date_of_measurement', '-time_of_activity', '-id'], name='card_physic_patient_63895b_idx'),
+        ),
+    ]
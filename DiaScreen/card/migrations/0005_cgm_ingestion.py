@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0004_history_keyset_indexes'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlucoseDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Назва пристрою')),
+                ('source', models.CharField(max_length=64, unique=True, verbose_name='Ідентифікатор джерела')),
+                ('token_hash', models.CharField(editable=False, max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активний')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True, verbose_name='Остання передача')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Пристрій моніторингу глюкози',
+                'verbose_name_plural': 'Пристрої моніторингу глюкози',
+            },
+        ),
+        migrations.AddField(
+            model_name='glucosemeasurement',
+            name='source',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='glucosemeasurement',
+            constraint=models.UniqueConstraint(fields=('patient', 'date_of_measurement', 'time_of_measurement', 'source'), name='unique_glucose_reading_per_source'),
+        ),
+        migrations.AddField(
+            model_name='glucosedevice',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glucose_devices', to='user_auth.patient'),
+        ),
+    ]
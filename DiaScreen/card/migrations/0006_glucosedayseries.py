@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0005_cgm_ingestion'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlucoseDaySeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('points', models.BinaryField()),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glucose_day_series', to='user_auth.patient')),
+            ],
+            options={
+                'verbose_name': 'Добова серія глюкози',
+                'verbose_name_plural': 'Добові серії глюкози',
+                'ordering': ['patient', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'day'), name='unique_glucose_day_series')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+
+from card.partitioning import convert_all, ensure_future_partitions
+
+
+def partition_measurements(apps, schema_editor):
+    # Opt-in: existing installations convert later with ``manage_partitions convert``.
+    if not getattr(settings, 'MEASUREMENT_PARTITIONING_ENABLED', False):
+        return
+    convert_all(schema_editor.connection)
+    ensure_future_partitions(schema_editor.connection, getattr(settings, 'MEASUREMENT_PARTITIONS_AHEAD', 3))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0006_glucosedayseries'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_measurements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,186 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:27
+
+from datetime import datetime
+
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+BACKFILL_BATCH_SIZE = 2000
+
+MEASURED_FIELDS = {
+    'GlucoseMeasurement': ('date_of_measurement', 'time_of_measurement'),
+    'InsulineDoseMeasurement': ('date_of_measurement', 'time'),
+    'FoodMeasurement': ('date_of_measurement', 'time_of_eating'),
+    'PhysicalActivityMeasurement': ('date_of_measurement', 'time_of_activity'),
+    'GlycemicProfileMeasurement': ('measurement_date', 'measurement_time'),
+    'AnthropometricMeasurement': ('measurement_date', 'measurement_time'),
+}
+
+
+def backfill_measured_at(apps, schema_editor):
+    current_tz = timezone.get_default_timezone()
+    for model_name, (date_field, time_field) in MEASURED_FIELDS.items():
+        model = apps.get_model('card', model_name)
+        last_pk = 0
+        while True:
+            # One short transaction per batch keeps row locks and WAL bursts bounded on large tables.
+            with transaction.atomic():
+                batch = list(
+                    model.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .only('pk', date_field, time_field)[:BACKFILL_BATCH_SIZE]
+                )
+                if not batch:
+                    break
+                for obj in batch:
+                    obj.measured_at = timezone.make_aware(
+                        datetime.combine(getattr(obj, date_field), getattr(obj, time_field)), current_tz
+                    )
+                model.objects.bulk_update(batch, ['measured_at'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('card', '0007_measurement_partitioning'),
+        ('user_auth', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='anthropometricmeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Антропометричний замір', 'verbose_name_plural': 'Антропометричні заміри'},
+        ),
+        migrations.AlterModelOptions(
+            name='foodmeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Замір їжі', 'verbose_name_plural': 'Заміри їжі'},
+        ),
+        migrations.AlterModelOptions(
+            name='glucosemeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Замір глюкози', 'verbose_name_plural': 'Заміри глюкози'},
+        ),
+        migrations.AlterModelOptions(
+            name='glycemicprofilemeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Замір глюкозного профілю', 'verbose_name_plural': 'Заміри глюкозного профілю'},
+        ),
+        migrations.AlterModelOptions(
+            name='insulinedosemeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Замір інсуліну', 'verbose_name_plural': 'Заміри інсуліну'},
+        ),
+        migrations.AlterModelOptions(
+            name='physicalactivitymeasurement',
+            options={'ordering': ['-measured_at', '-id'], 'verbose_name': 'Замір фізичної активності', 'verbose_name_plural': 'Заміри фізичної активності'},
+        ),
+        migrations.RemoveIndex(
+            model_name='anthropometricmeasurement',
+            name='card_anthro_patient_bfc4bb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='foodmeasurement',
+            name='card_foodme_patient_5d6ac5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='glucosemeasurement',
+            name='card_glucos_patient_2c7137_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='glycemicprofilemeasurement',
+            name='card_glycem_patient_7d9d76_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='insulinedosemeasurement',
+            name='card_insuli_patient_5f757a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='physicalactivitymeasurement',
+            name='card_physic_patient_63895b_idx',
+        ),
+        migrations.AddField(
+            model_name='anthropometricmeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodmeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='glucosemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='glycemicprofilemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='insulinedosemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='physicalactivitymeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_measured_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='anthropometricmeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='foodmeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='glucosemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='glycemicprofilemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='insulinedosemeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='physicalactivitymeasurement',
+            name='measured_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='anthropometricmeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('weight', 'bmi'), name='anthropo_patient_measured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodmeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('category', 'bread_unit', 'insuline_dose_before'), name='food_patient_measured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='glucosemeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('glucose', 'glucose_measurement_category'), name='glucose_patient_measured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='glycemicprofilemeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('average_glucose', 'hba1c'), name='glycemic_patient_measured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insulinedosemeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('insuline_dose', 'category'), name='insuline_patient_measured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='physicalactivitymeasurement',
+            index=models.Index(fields=['patient', '-measured_at', '-id'], include=('type_of_activity', 'number_of_approaches'), name='activity_patient_measured_idx'),
+        ),
+    ]
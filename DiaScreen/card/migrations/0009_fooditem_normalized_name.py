@@ -0,0 +1,61 @@
+from django.db import migrations, models, transaction
+
+APOSTROPHES = str.maketrans({'ʼ': "'", '’': "'", '`': "'"})
+
+
+def normalize_food_name(name):
+    return ' '.join((name or '').translate(APOSTROPHES).casefold().split())
+
+
+def merge_duplicate_food_items(apps, schema_editor):
+    """Fill normalized_name and fold duplicates into the oldest item, repointing their portions."""
+    FoodItem = apps.get_model('card', 'FoodItem')
+    FoodPortion = apps.get_model('card', 'FoodPortion')
+
+    with transaction.atomic():
+        keepers = {}
+        duplicates = {}
+        for pk, name in FoodItem.objects.order_by('pk').values_list('pk', 'name').iterator(chunk_size=2000):
+            key = normalize_food_name(name)
+            if key in keepers:
+                duplicates.setdefault(keepers[key], []).append(pk)
+            else:
+                keepers[key] = pk
+
+        for keeper, duplicate_ids in duplicates.items():
+            FoodPortion.objects.filter(food_id__in=duplicate_ids).update(food_id=keeper)
+            FoodItem.objects.filter(pk__in=duplicate_ids).delete()
+
+        batch = []
+        for key, pk in keepers.items():
+            batch.append(FoodItem(pk=pk, normalized_name=key))
+            if len(batch) >= 2000:
+                FoodItem.objects.bulk_update(batch, ['normalized_name'])
+                batch = []
+        if batch:
+            FoodItem.objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    # The unique index is added after the data step commits: PostgreSQL refuses to
+    # alter a table with pending foreign-key trigger events from the deletes.
+    atomic = False
+
+    dependencies = [
+        ('card', '0008_measured_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_food_items, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='fooditem',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, unique=True),
+        ),
+    ]
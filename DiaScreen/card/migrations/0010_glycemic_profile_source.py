@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0009_fooditem_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='glycemicprofilemeasurement',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Введено вручну'), ('auto', 'Розраховано із замірів глюкози')], default='manual', editable=False, max_length=10, verbose_name='Джерело'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:07
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card', '0010_glycemic_profile_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='glycemicprofilemeasurement',
+            name='hba1c',
+            field=models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(20)]),
+        ),
+    ]
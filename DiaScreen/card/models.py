@@ -1,8 +1,12 @@
+import hashlib
+import secrets
+from datetime import datetime
 from decimal import Decimal
 from turtle import up
 
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, F, Sum
 from django.utils import timezone
 
 from user_auth.models import Patient
@@ -12,7 +16,61 @@ def current_local_time():
     return timezone.localtime().time()
 
 
-class GlucoseMeasurement(models.Model):
+APOSTROPHES = str.maketrans({'ʼ': "'", '’': "'", '`': "'"})
+
+
+def normalize_food_name(name):
+    """Case-folded name with unified apostrophes and single spaces."""
+    return ' '.join((name or '').translate(APOSTROPHES).casefold().split())
+
+
+def combine_measured_at(record_date, record_time):
+    return timezone.make_aware(datetime.combine(record_date, record_time), timezone.get_default_timezone())
+
+
+class MeasurementQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create bypasses save(), so fill the denormalized timestamp here.
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_measured_at()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class MeasuredAtModel(models.Model):
+    """
+    Measurement with a denormalized timezone-aware ``measured_at`` combined from
+    its date and time fields; kept in sync by ``save`` and ``bulk_create``
+    (``QuerySet.update`` of the date or time must set it explicitly)
+    """
+    MEASURED_DATE_FIELD = 'date_of_measurement'
+    MEASURED_TIME_FIELD = None
+
+    measured_at = models.DateTimeField(editable=False)
+
+    objects = MeasurementQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def sync_measured_at(self):
+        date_field = self._meta.get_field(self.MEASURED_DATE_FIELD)
+        time_field = self._meta.get_field(self.MEASURED_TIME_FIELD)
+        self.measured_at = combine_measured_at(
+            date_field.to_python(getattr(self, self.MEASURED_DATE_FIELD)),
+            time_field.to_python(getattr(self, self.MEASURED_TIME_FIELD)),
+        )
+
+    def save(self, *args, **kwargs):
+        self.sync_measured_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {self.MEASURED_DATE_FIELD, self.MEASURED_TIME_FIELD} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'measured_at'}
+        super().save(*args, **kwargs)
+
+
+class GlucoseMeasurement(MeasuredAtModel):
+    MEASURED_TIME_FIELD = 'time_of_measurement'
 
     CATEGORY = (
         ('Натщесердце', 'Натщесердце'),
@@ -42,6 +100,8 @@ class GlucoseMeasurement(models.Model):
     date_of_measurement = models.DateField(default=timezone.localdate)
     time_of_measurement = models.TimeField(default=current_local_time)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
+    # Device that reported the reading (e.g. a CGM); empty for manual entries.
+    source = models.CharField(max_length=64, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,12 +112,83 @@ class GlucoseMeasurement(models.Model):
     class Meta:
         verbose_name = 'Замір глюкози'
         verbose_name_plural = 'Заміри глюкози'
-        ordering = ['-date_of_measurement', '-time_of_measurement']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'date_of_measurement']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['glucose', 'glucose_measurement_category'],
+                name='glucose_patient_measured_idx',
+            ),
+        ]
+        constraints = [
+            # NULL sources are distinct, so manual entries never conflict with each other.
+            models.UniqueConstraint(
+                fields=['patient', 'date_of_measurement', 'time_of_measurement', 'source'],
+                name='unique_glucose_reading_per_source',
+            ),
         ]
 
 
+class GlucoseDaySeries(models.Model):
+    """
+    Packed glucose readings of one patient-day: little-endian (minute-of-day uint16,
+    centi-mmol/L int16) pairs sorted by minute, maintained by ``card.series``
+    """
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='glucose_day_series')
+    day = models.DateField()
+    points = models.BinaryField()
+    point_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Добова серія глюкози'
+        verbose_name_plural = 'Добові серії глюкози'
+        ordering = ['patient', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'day'], name='unique_glucose_day_series'),
+        ]
+
+    def __str__(self):
+        return f'{self.patient} {self.day}: {self.point_count} замірів'
+
+
+class GlucoseDevice(models.Model):
+    """
+    A glucose monitor allowed to push readings for a patient; authenticates with a bearer token
+    """
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='glucose_devices')
+    name = models.CharField(max_length=100, verbose_name='Назва пристрою')
+    source = models.CharField(max_length=64, unique=True, verbose_name='Ідентифікатор джерела')
+    token_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True, verbose_name='Активний')
+    last_seen_at = models.DateTimeField(blank=True, null=True, verbose_name='Остання передача')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Пристрій моніторингу глюкози'
+        verbose_name_plural = 'Пристрої моніторингу глюкози'
+
+    def __str__(self):
+        return f'{self.name} ({self.patient})'
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def register(cls, patient, name, source=None):
+        """Create a device and return ``(device, token)``; only the token hash is stored."""
+        token = secrets.token_urlsafe(32)
+        device = cls.objects.create(
+            patient=patient,
+            name=name,
+            source=source or f'cgm-{secrets.token_hex(6)}',
+            token_hash=cls.hash_token(token),
+        )
+        return device, token
+
+
 class TypeOfActivity(models.Model):
     name = models.CharField(max_length=100, blank=False, null=False, unique=True)
 
@@ -69,7 +200,8 @@ class TypeOfActivity(models.Model):
         verbose_name_plural = 'Типи активності'
 
 
-class PhysicalActivityMeasurement(models.Model):
+class PhysicalActivityMeasurement(MeasuredAtModel):
+    MEASURED_TIME_FIELD = 'time_of_activity'
 
     number_of_approaches = models.IntegerField(blank=True, null=True)
     type_of_activity = models.ForeignKey(TypeOfActivity, on_delete=models.PROTECT)
@@ -87,28 +219,41 @@ class PhysicalActivityMeasurement(models.Model):
     class Meta:
         verbose_name = 'Замір фізичної активності'
         verbose_name_plural = 'Заміри фізичної активності'
-        ordering = ['-date_of_measurement', '-time_of_activity']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'date_of_measurement']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['type_of_activity', 'number_of_approaches'],
+                name='activity_patient_measured_idx',
+            ),
         ]
 
 
 class FoodItem(models.Model):
 
     name = models.CharField(max_length=200, blank=False, null=False, db_index=True)
+    # Lookup key: one catalog entry per spelling regardless of case and spacing.
+    normalized_name = models.CharField(max_length=200, unique=True, editable=False)
     proteins = models.DecimalField(max_digits=6, decimal_places=2)
     fats = models.DecimalField(max_digits=6, decimal_places=2)
     carbohydrates = models.DecimalField(max_digits=6, decimal_places=2)
 
     def __str__(self):
         return f"Їжа: {self.name}, білки - {self.proteins}, жири - {self.fats}, вуглеводи - {self.carbohydrates}"
+
+    def save(self, *args, **kwargs):
+        self.name = ' '.join(self.name.split())
+        self.normalized_name = normalize_food_name(self.name)
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = 'Порція їжі'
         verbose_name_plural = 'Порції їжі'
 
 
-class FoodMeasurement(models.Model):
+class FoodMeasurement(MeasuredAtModel):
+    MEASURED_TIME_FIELD = 'time_of_eating'
 
     CATEGORY = (
         ('Сніданок', 'Сніданок'),
@@ -129,18 +274,29 @@ class FoodMeasurement(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     food_items = models.ManyToManyField(FoodItem, through='FoodPortion', related_name='food_measurements')
 
-    def calculate_bread_unit(self):
+    @staticmethod
+    def bread_units_for(portions):
         """
-        Calculate bread unit (≈12g carbohydrate) based on portions weight.
+        Bread units (12 g carbohydrate) of ``(carbohydrates per 100 g, grams)`` pairs; ``None`` without portions.
         """
-        qs = self.portions.select_related('food').all()
-        if not qs.exists():
+        portions = list(portions)
+        if not portions:
             return None
+        total_carbohydrates = sum(
+            (Decimal(carbohydrates or 0) * Decimal(grams or 0) / Decimal('100') for carbohydrates, grams in portions),
+            Decimal('0'),
+        )
+        return (total_carbohydrates / Decimal('12')).quantize(Decimal('0.01'))
 
-        total_carbohydrates = Decimal('0')
-        for portion in qs:
-            total_carbohydrates += Decimal(portion.food.carbohydrates)
-        return total_carbohydrates / Decimal('12')
+    def calculate_bread_unit(self):
+        """Bread units from the saved portions, summed in one SQL aggregate."""
+        total = self.portions.aggregate(
+            count=Count('pk'),
+            carbohydrates=Sum(F('food__carbohydrates') * F('grams'), output_field=models.DecimalField()),
+        )
+        if not total['count']:
+            return None
+        return (Decimal(total['carbohydrates'] or 0) / Decimal('1200')).quantize(Decimal('0.01'))
 
     def calculate_dose(self, bread_unit=None):
         bu = bread_unit if bread_unit is not None else self.bread_unit
@@ -148,19 +304,10 @@ class FoodMeasurement(models.Model):
             return None
         return bu
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        bread_unit = self.calculate_bread_unit()
-        dose = self.calculate_dose(bread_unit)
-
-        FoodMeasurement.objects.filter(pk=self.pk).update(
-            bread_unit=bread_unit,
-            insuline_dose_after=dose,
-        )
-
+    def apply_bread_unit(self, bread_unit):
+        """Set the bread units and the derived dose; they are written by the next ``save``."""
         self.bread_unit = bread_unit
-        self.insuline_dose_after = dose
+        self.insuline_dose_after = self.calculate_dose(bread_unit)
 
     def __str__(self):
         return f'''
@@ -171,9 +318,14 @@ class FoodMeasurement(models.Model):
     class Meta:
         verbose_name = 'Замір їжі'
         verbose_name_plural = 'Заміри їжі'
-        ordering = ['-date_of_measurement', '-time_of_eating']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'date_of_measurement']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['category', 'bread_unit', 'insuline_dose_before'],
+                name='food_patient_measured_idx',
+            ),
         ]
 
 
@@ -189,7 +341,8 @@ class FoodPortion(models.Model):
         verbose_name = 'Порція'
         verbose_name_plural = 'Порції'
 
-class InsulineDoseMeasurement(models.Model):
+class InsulineDoseMeasurement(MeasuredAtModel):
+    MEASURED_TIME_FIELD = 'time'
 
     CATEGORY = (
         ('Натщесердце', 'Натщесердце'),
@@ -223,13 +376,21 @@ class InsulineDoseMeasurement(models.Model):
     class Meta:
         verbose_name = 'Замір інсуліну'
         verbose_name_plural = 'Заміри інсуліну'
-        ordering = ['-date_of_measurement', '-time']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'date_of_measurement']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['insuline_dose', 'category'],
+                name='insuline_patient_measured_idx',
+            ),
         ]
 
 
-class AnthropometricMeasurement(models.Model):
+class AnthropometricMeasurement(MeasuredAtModel):
+    MEASURED_DATE_FIELD = 'measurement_date'
+    MEASURED_TIME_FIELD = 'measurement_time'
+
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='anthropometric_measurements')
     measurement_date = models.DateField(default=timezone.localdate)
     measurement_time = models.TimeField(default=current_local_time)
@@ -244,33 +405,119 @@ class AnthropometricMeasurement(models.Model):
     class Meta:
         verbose_name = 'Антропометричний замір'
         verbose_name_plural = 'Антропометричні заміри'
-        ordering = ['-measurement_date', '-created_at']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'measurement_date']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['weight', 'bmi'],
+                name='anthropo_patient_measured_idx',
+            ),
         ]
     
     def __str__(self):
         return f'Антропометричний замір від {self.measurement_date} о {self.measurement_time}'
 
 
-class GlycemicProfileMeasurement(models.Model):
+class GlycemicProfileMeasurement(MeasuredAtModel):
+    MEASURED_DATE_FIELD = 'measurement_date'
+    MEASURED_TIME_FIELD = 'measurement_time'
+
+    SOURCE_MANUAL = 'manual'
+    SOURCE_AUTO = 'auto'
+    # Poorly controlled diabetes routinely exceeds 10 %; values above 20 % are not clinically plausible.
+    HBA1C_MAX = 20
+    SOURCE_CHOICES = (
+        (SOURCE_MANUAL, 'Введено вручну'),
+        (SOURCE_AUTO, 'Розраховано із замірів глюкози'),
+    )
+
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='glycemic_profile_measurements')
     measurement_date = models.DateField(default=timezone.localdate)
     measurement_time = models.TimeField(default=current_local_time)
     average_glucose = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(35)])
-    hba1c = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(10)])
+    hba1c = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(HBA1C_MAX)])
     hypoglycemic_events = models.IntegerField(validators=[MinValueValidator(0)])
     hyperglycemic_events = models.IntegerField(validators=[MinValueValidator(0)])
+    source = models.CharField(
+        max_length=10,
+        choices=SOURCE_CHOICES,
+        default=SOURCE_MANUAL,
+        editable=False,
+        verbose_name='Джерело',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Замір глюкозного профілю'
         verbose_name_plural = 'Заміри глюкозного профілю'
-        ordering = ['-measurement_date', '-created_at']
+        ordering = ['-measured_at', '-id']
         indexes = [
             models.Index(fields=['patient', 'measurement_date']),
+            models.Index(
+                fields=['patient', '-measured_at', '-id'],
+                include=['average_glucose', 'hba1c'],
+                name='glycemic_patient_measured_idx',
+            ),
         ]
 
     def __str__(self):
-        return f'Замір глюкозного профілю від {self.patient} {self.measurement_date} о {self.measurement_time}'
\ No newline at end of file
+        return f'Замір глюкозного профілю від {self.patient} {self.measurement_date} о {self.measurement_time}'
+
+class PatientLatestSnapshot(models.Model):
+    """
+    Latest record of every measurement type for a patient, maintained by ``card.snapshots``
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, related_name='latest_snapshot')
+
+    glucose_record_id = models.BigIntegerField(blank=True, null=True)
+    glucose_at = models.DateTimeField(blank=True, null=True)
+    glucose_value = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+    glucose_category = models.CharField(max_length=50, blank=True, null=True)
+
+    insuline_record_id = models.BigIntegerField(blank=True, null=True)
+    insuline_at = models.DateTimeField(blank=True, null=True)
+    insuline_dose = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    insuline_category = models.CharField(max_length=50, blank=True, null=True)
+
+    glycemic_record_id = models.BigIntegerField(blank=True, null=True)
+    glycemic_at = models.DateTimeField(blank=True, null=True)
+    glycemic_average_glucose = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    glycemic_hba1c = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+
+    activity_record_id = models.BigIntegerField(blank=True, null=True)
+    activity_at = models.DateTimeField(blank=True, null=True)
+    activity_name = models.CharField(max_length=100, blank=True, null=True)
+
+    food_record_id = models.BigIntegerField(blank=True, null=True)
+    food_at = models.DateTimeField(blank=True, null=True)
+    food_category = models.CharField(max_length=50, blank=True, null=True)
+
+    anthropometry_record_id = models.BigIntegerField(blank=True, null=True)
+    anthropometry_at = models.DateTimeField(blank=True, null=True)
+    anthropometry_weight = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    anthropometry_bmi = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Останні показники пацієнта'
+        verbose_name_plural = 'Останні показники пацієнтів'
+
+    def __str__(self):
+        return f'Останні показники: {self.patient}'
+
+    @property
+    def latest_at(self):
+        """Most recent timestamp across all measurement types."""
+        moments = [
+            self.glucose_at,
+            self.insuline_at,
+            self.glycemic_at,
+            self.activity_at,
+            self.food_at,
+            self.anthropometry_at,
+        ]
+        moments = [moment for moment in moments if moment is not None]
+        return max(moments) if moments else None
@@ -0,0 +1,241 @@
+"""
+Monthly range partitioning of the large measurement tables on PostgreSQL.
+
+``convert_to_partitioned`` rebuilds a heap table as a table partitioned by
+``date_of_measurement`` month. Rows are copied into monthly partitions. The
+primary key becomes ``(id, date_of_measurement)``, as PostgreSQL requires
+the partition key in every unique constraint. Indexes and constraints are
+recreated on the parent and cascade to each partition.
+
+Foreign keys *referencing* a partitioned table (``FoodPortion.measurement``) cannot
+point at ``id`` alone and are dropped; Django still cascades those deletes in
+the ORM. ``ensure_future_partitions`` and ``detach_old_partitions`` keep the
+partition set rolling. On other databases every function is a no-op.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+
+PARTITIONED_TABLES = {
+    'card_glucosemeasurement': 'date_of_measurement',
+    'card_insulinedosemeasurement': 'date_of_measurement',
+    'card_foodmeasurement': 'date_of_measurement',
+}
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def partitioning_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def create_month_partition(connection, table, month):
+    """
+    Create the partition holding ``month`` if it does not exist yet.
+
+    Rows dated past the pre-created months (e.g. a meter with a wrong clock)
+    land in the DEFAULT partition, and PostgreSQL refuses to create a month
+    whose rows the default already holds. In that case the default is
+    detached, the month created, its rows moved over and the default
+    reattached, all in one transaction.
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    default = f'{table}_default'
+    key = qn(PARTITIONED_TABLES[table])
+    bounds = [month, add_months(month, 1)]
+    create = f'CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        misplaced = False
+        if not _partition_exists(connection, name) and _partition_exists(connection, default):
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE {key} >= %s AND {key} < %s)', bounds)
+            misplaced = cursor.fetchone()[0]
+        if not misplaced:
+            cursor.execute(create, bounds)
+            return
+        cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}')
+        cursor.execute(create, bounds)
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default)} WHERE {key} >= %s AND {key} < %s RETURNING *) '
+            f'INSERT INTO {qn(table)} SELECT * FROM moved',
+            bounds,
+        )
+        cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT')
+
+
+def convert_to_partitioned(connection, table, key):
+    """
+    Rebuild ``table`` as a monthly partitioned table. Must run inside a transaction.
+    """
+    if is_partitioned(connection, table):
+        return False
+
+    qn = connection.ops.quote_name
+    legacy = f'{table}_legacy'
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = %s::regclass
+              AND NOT i.indisprimary
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conrelid = i.indrelid AND c.conindid = i.indexrelid
+              )
+            """,
+            [table],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('u', 'f')",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        for name, contype, definition in constraints:
+            if contype == 'u' and key not in definition:
+                raise ValueError(f'Unique constraint {name} on {table} does not include the partition key {key}')
+
+        cursor.execute(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        for name, referencing_table in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT {qn(name)}')
+
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({qn(key)})'
+        )
+
+        cursor.execute(f'SELECT MIN({qn(key)}), MAX({qn(key)}), MAX(id) FROM {qn(legacy)}')
+        first_day, last_day, max_id = cursor.fetchone()
+        month = month_start(first_day or date.today())
+        last_month = month_start(max(last_day or date.today(), date.today()))
+        while month <= last_month:
+            create_month_partition(connection, table, month)
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}')
+        cursor.execute(f'DROP TABLE {qn(legacy)}')
+
+        sequence = f'{table}_id_seq'
+        cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+        cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max_id or 1, max_id is not None])
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_pkey")} PRIMARY KEY (id, {qn(key)})')
+        for name, _, definition in constraints:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+        for definition in index_definitions:
+            cursor.execute(re.sub(r' ON (ONLY )?\S+ USING ', f' ON {qn(table)} USING ', definition, count=1))
+    return True
+
+
+def convert_all(connection):
+    """Convert every measurement table; returns the names of tables that were converted."""
+    if not partitioning_supported(connection):
+        return []
+    return [table for table, key in PARTITIONED_TABLES.items() if convert_to_partitioned(connection, table, key)]
+
+
+def ensure_future_partitions(connection, months_ahead=3, today=None):
+    """Pre-create partitions up to ``months_ahead`` months after the current one."""
+    created = []
+    if not partitioning_supported(connection):
+        return created
+    current = month_start(today or date.today())
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if not _partition_exists(connection, partition_name(table, month)):
+                create_month_partition(connection, table, month)
+                created.append(partition_name(table, month))
+    return created
+
+
+def maintain_partitions():
+    """Scheduled job: keep ``MEASUREMENT_PARTITIONS_AHEAD`` months of partitions ready."""
+    with transaction.atomic():
+        return ensure_future_partitions(default_connection, getattr(settings, 'MEASUREMENT_PARTITIONS_AHEAD', 3))
+
+
+def _partition_exists(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+        return cursor.fetchone()[0]
+
+
+def list_partitions(connection, table):
+    """Return ``[(partition_name, month)]`` for the monthly partitions of ``table``."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass ORDER BY c.relname',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return partitions
+
+
+def detach_old_partitions(connection, keep_months, archive_schema=None, drop=False, today=None):
+    """
+    Detach partitions whose month ended more than ``keep_months`` months ago.
+
+    Detached partitions are moved to ``archive_schema``, dropped with ``drop``,
+    or left as standalone tables.
+    """
+    detached = []
+    if not partitioning_supported(connection):
+        return detached
+    qn = connection.ops.quote_name
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    with connection.cursor() as cursor:
+        if archive_schema and not drop:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {qn(archive_schema)}')
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(connection, table):
+                continue
+            for name, month in list_partitions(connection, table):
+                if month >= cutoff:
+                    continue
+                cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}')
+                if drop:
+                    cursor.execute(f'DROP TABLE {qn(name)}')
+                elif archive_schema:
+                    cursor.execute(f'ALTER TABLE {qn(name)} SET SCHEMA {qn(archive_schema)}')
+                detached.append(name)
+    return detached
@@ -0,0 +1,165 @@
+"""
+Daily glycemic profiles derived from raw glucose readings.
+
+``generate_glycemic_profiles`` follows a ``ProcessingCursor`` over settled
+``GlucoseMeasurement`` primary keys (see ``user_auth.outbox``), collects the
+(patient, day) pairs that received new readings since the last run and
+rebuilds only those days: one ``GlycemicProfileMeasurement`` with
+``source='auto'`` per patient-day, holding the day's mean, the number of
+hypo/hyper events and an HbA1c estimate from the trailing 90-day mean (ADAG
+formula). The trailing means come from one grouped per-day aggregate, so no
+patient history is rescanned row by row. Manually entered profiles are never
+touched.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from user_auth.outbox import consume_new_rows
+from user_auth.stats import adjust_site_counter
+
+from .models import GlucoseMeasurement, GlycemicProfileMeasurement
+from .snapshots import refresh_snapshot
+
+GLYCEMIC_PROFILES_CURSOR = 'glycemic_profiles'
+
+HYPO_THRESHOLD = Decimal('3.9')
+HYPER_THRESHOLD = Decimal('10.0')
+HBA1C_WINDOW_DAYS = 90
+
+TWO_PLACES = Decimal('0.01')
+
+
+def estimate_hba1c(mean_glucose):
+    """
+    HbA1c (%) from mean glucose (mmol/L): eAG = 1.59 * HbA1c - 2.59.
+
+    Capped at ``GlycemicProfileMeasurement.HBA1C_MAX``: ``bulk_create`` skips
+    field validators, and a mean near the glucose ceiling would otherwise
+    store a row that the admin and forms refuse to save again.
+    """
+    estimate = (Decimal(mean_glucose) + Decimal('2.59')) / Decimal('1.59')
+    return min(estimate, Decimal(GlycemicProfileMeasurement.HBA1C_MAX)).quantize(TWO_PLACES)
+
+
+def count_events(values, predicate):
+    """Number of runs of consecutive values matching ``predicate``."""
+    events = 0
+    inside = False
+    for value in values:
+        matches = predicate(value)
+        if matches and not inside:
+            events += 1
+        inside = matches
+    return events
+
+
+def _trailing_means(days_by_patient):
+    """Mean glucose of the HbA1c window ending on each requested day, from per-day sums."""
+    first_day = min(min(days) for days in days_by_patient.values()) - timedelta(days=HBA1C_WINDOW_DAYS - 1)
+    last_day = max(max(days) for days in days_by_patient.values())
+    daily = defaultdict(dict)
+    rows = (
+        GlucoseMeasurement.objects.filter(
+            patient_id__in=list(days_by_patient),
+            date_of_measurement__range=(first_day, last_day),
+        )
+        .values('patient_id', 'date_of_measurement')
+        .annotate(readings=Count('id'), total=Sum('glucose'))
+        .order_by()
+    )
+    for row in rows:
+        daily[row['patient_id']][row['date_of_measurement']] = (row['readings'], row['total'])
+
+    means = {}
+    for patient_id, days in days_by_patient.items():
+        sums = daily[patient_id]
+        for day in days:
+            window = [
+                sums[day - timedelta(days=offset)]
+                for offset in range(HBA1C_WINDOW_DAYS)
+                if day - timedelta(days=offset) in sums
+            ]
+            readings = sum(count for count, _ in window)
+            if readings:
+                means[patient_id, day] = sum(total for _, total in window) / readings
+    return means
+
+
+def rebuild_profiles(days_by_patient):
+    """
+    Replace the auto profiles of the given ``{patient_id: {day, ...}}``.
+
+    Returns ``(created, deleted)``.
+    """
+    selected_days = Q()
+    for patient_id, days in days_by_patient.items():
+        selected_days |= Q(patient_id=patient_id, date_of_measurement__in=days)
+
+    readings = defaultdict(list)
+    rows = (
+        GlucoseMeasurement.objects.filter(selected_days)
+        .order_by('patient_id', 'measured_at', 'pk')
+        .values_list('patient_id', 'date_of_measurement', 'time_of_measurement', 'glucose')
+        .iterator(chunk_size=getattr(settings, 'GLYCEMIC_PROFILES_CHUNK_SIZE', 2000))
+    )
+    for patient_id, day, moment, glucose in rows:
+        readings[patient_id, day].append((moment, glucose))
+
+    trailing = _trailing_means(days_by_patient)
+    profiles = []
+    for (patient_id, day), day_readings in readings.items():
+        values = [glucose for _, glucose in day_readings]
+        profiles.append(GlycemicProfileMeasurement(
+            patient_id=patient_id,
+            measurement_date=day,
+            measurement_time=day_readings[-1][0],
+            average_glucose=(sum(values) / len(values)).quantize(TWO_PLACES),
+            hba1c=estimate_hba1c(trailing[patient_id, day]),
+            hypoglycemic_events=count_events(values, lambda value: value < HYPO_THRESHOLD),
+            hyperglycemic_events=count_events(values, lambda value: value > HYPER_THRESHOLD),
+            source=GlycemicProfileMeasurement.SOURCE_AUTO,
+        ))
+
+    stale = Q()
+    for patient_id, days in days_by_patient.items():
+        stale |= Q(patient_id=patient_id, measurement_date__in=days)
+    deleted, _ = GlycemicProfileMeasurement.objects.filter(
+        stale,
+        source=GlycemicProfileMeasurement.SOURCE_AUTO,
+    ).delete()
+    GlycemicProfileMeasurement.objects.bulk_create(profiles)
+    return len(profiles), deleted
+
+
+def generate_glycemic_profiles(batch_size=None):
+    """
+    Rebuild the profiles of patient-days with readings inserted since the last run.
+
+    Returns the number of profiles written.
+    """
+    def rebuild(rows):
+        days_by_patient = defaultdict(set)
+        for _, patient_id, day in rows:
+            days_by_patient[patient_id].add(day)
+
+        created, _ = rebuild_profiles(days_by_patient)
+
+        # Replaced profiles are counted down by their post_delete signals; bulk_create sends no post_save.
+        transaction.on_commit(lambda: adjust_site_counter('glycemic_profile', created))
+        for patient_id in days_by_patient:
+            transaction.on_commit(lambda patient_id=patient_id: refresh_snapshot(patient_id, kinds=['glycemic']))
+        return created
+
+    return sum(consume_new_rows(
+        GLYCEMIC_PROFILES_CURSOR,
+        GlucoseMeasurement.objects.all(),
+        ['patient_id', 'date_of_measurement'],
+        rebuild,
+        batch_size=batch_size or getattr(settings, 'GLYCEMIC_PROFILES_BATCH_SIZE', 5000),
+        settle_seconds=getattr(settings, 'GLYCEMIC_PROFILES_SETTLE_SECONDS', 900),
+    ))
@@ -0,0 +1,131 @@
+"""
+Columnar per-day glucose series.
+
+With ``GLUCOSE_DAY_SERIES_ENABLED`` each (patient, day) keeps one
+``GlucoseDaySeries`` row with the day's readings packed as 4-byte
+``(minute uint16, centi-mmol/L int16)`` pairs, rebuilt from the raw rows
+after every change. Analytics decode the blobs with ``numpy.frombuffer``
+without copying, so long-range scans read a few hundred rows instead of one
+row per reading. Raw ``GlucoseMeasurement`` rows remain the source of truth.
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from user_auth.models import ProcessingCursor
+
+from .models import GlucoseDaySeries, GlucoseMeasurement
+
+logger = logging.getLogger(__name__)
+
+SERIES_DTYPE = np.dtype([('minute', '<u2'), ('centi', '<i2')])
+
+# Written by ``rebuild_glucose_series``: readings up to ``last_id`` are packed.
+SERIES_BACKFILL_CURSOR = 'glucose_day_series'
+
+
+def series_enabled():
+    return getattr(settings, 'GLUCOSE_DAY_SERIES_ENABLED', False)
+
+
+def series_backfilled():
+    return ProcessingCursor.objects.filter(name=SERIES_BACKFILL_CURSOR).exists()
+
+
+def mark_series_backfilled(last_id):
+    ProcessingCursor.objects.update_or_create(name=SERIES_BACKFILL_CURSOR, defaults={'last_id': last_id})
+
+
+def pack_points(rows):
+    """Pack ``(time, glucose)`` pairs into the series byte format, sorted by minute of day."""
+    points = np.array(
+        [(t.hour * 60 + t.minute, int(round(glucose * 100))) for t, glucose in rows],
+        dtype=SERIES_DTYPE,
+    )
+    points.sort(order='minute', kind='stable')
+    return points.tobytes()
+
+
+def decode_points(blob):
+    """Zero-copy view of a packed series."""
+    return np.frombuffer(blob, dtype=SERIES_DTYPE)
+
+
+def rebuild_day_series(patient_id, days):
+    """Re-pack the given days of a patient from the raw measurement rows."""
+    to_date = GlucoseMeasurement._meta.get_field('date_of_measurement').to_python
+    days = {to_date(day) for day in days}
+    if not days:
+        return
+    by_day = {day: [] for day in days}
+    for day, measured_time, glucose in (
+        GlucoseMeasurement.objects.filter(patient_id=patient_id, date_of_measurement__in=days)
+        .order_by('date_of_measurement', 'time_of_measurement', 'pk')
+        .values_list('date_of_measurement', 'time_of_measurement', 'glucose')
+    ):
+        by_day[day].append((measured_time, glucose))
+
+    empty_days = [day for day, rows in by_day.items() if not rows]
+    if empty_days:
+        GlucoseDaySeries.objects.filter(patient_id=patient_id, day__in=empty_days).delete()
+    series = [
+        GlucoseDaySeries(patient_id=patient_id, day=day, points=pack_points(rows), point_count=len(rows))
+        for day, rows in by_day.items()
+        if rows
+    ]
+    GlucoseDaySeries.objects.bulk_create(
+        series,
+        update_conflicts=True,
+        unique_fields=['patient', 'day'],
+        update_fields=['points', 'point_count', 'updated_at'],
+    )
+
+
+def load_glucose_series(patient, start_date=None, end_date=None):
+    """
+    Return ``(days, minutes, values)`` numpy arrays for the patient's readings in the range.
+
+    ``days`` holds ``datetime64[D]`` dates, ``minutes`` minute-of-day and ``values`` mmol/L.
+    Reads packed series when enabled, otherwise projects the raw rows. Until
+    ``rebuild_glucose_series`` has backfilled the history, packed series would
+    miss older days, so the raw rows are read instead.
+    """
+    use_series = series_enabled()
+    if use_series and not series_backfilled():
+        logger.warning('GLUCOSE_DAY_SERIES_ENABLED is set but rebuild_glucose_series has not run; reading raw rows')
+        use_series = False
+    if use_series:
+        qs = GlucoseDaySeries.objects.filter(patient=patient)
+        if start_date:
+            qs = qs.filter(day__gte=start_date)
+        if end_date:
+            qs = qs.filter(day__lte=end_date)
+        chunks = [(day, decode_points(blob)) for day, blob in qs.order_by('day').values_list('day', 'points')]
+        if not chunks:
+            return _empty_series()
+        points = np.concatenate([chunk for _, chunk in chunks])
+        days = np.repeat(
+            np.array([day for day, _ in chunks], dtype='datetime64[D]'),
+            [len(chunk) for _, chunk in chunks],
+        )
+        return days, points['minute'].astype(np.int32), points['centi'] / 100.0
+
+    qs = GlucoseMeasurement.objects.filter(patient=patient)
+    if start_date:
+        qs = qs.filter(date_of_measurement__gte=start_date)
+    if end_date:
+        qs = qs.filter(date_of_measurement__lte=end_date)
+    rows = list(qs.order_by('date_of_measurement', 'time_of_measurement').values_list(
+        'date_of_measurement', 'time_of_measurement', 'glucose'
+    ))
+    if not rows:
+        return _empty_series()
+    days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    minutes = np.array([row[1].hour * 60 + row[1].minute for row in rows], dtype=np.int32)
+    values = np.array([float(row[2]) for row in rows], dtype=np.float64)
+    return days, minutes, values
+
+
+def _empty_series():
+    return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int32), np.array([], dtype=np.float64)
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .foods import bump_catalog_version
+from .models import FoodItem, GlucoseMeasurement
+from .series import rebuild_day_series, series_enabled
+from .snapshots import SNAPSHOT_SOURCES, record_deleted, record_saved
+
+
+def _connect_snapshot(kind, model_name):
+    label = f'card.{model_name}'
+
+    def measurement_saved(sender, instance, raw=False, **kwargs):
+        """
+        Keep the patient's latest-readings snapshot current; applied after commit
+        so a rolled-back write never reaches it.
+        """
+        if not raw:
+            transaction.on_commit(lambda: record_saved(kind, instance))
+
+    def measurement_deleted(sender, instance, **kwargs):
+        # The instance loses its pk once deleted, so capture the identifiers now.
+        patient_id, record_id = instance.patient_id, instance.pk
+        transaction.on_commit(lambda: record_deleted(kind, patient_id, record_id))
+
+    post_save.connect(measurement_saved, sender=label, weak=False, dispatch_uid=f'snapshot_saved:{kind}')
+    post_delete.connect(measurement_deleted, sender=label, weak=False, dispatch_uid=f'snapshot_deleted:{kind}')
+
+
+for _kind, _source in SNAPSHOT_SOURCES.items():
+    _connect_snapshot(_kind, _source['model'])
+
+
+@receiver(pre_save, sender=GlucoseMeasurement)
+def remember_series_day(sender, instance, raw=False, **kwargs):
+    """An edit may move the reading to another day; both days need re-packing."""
+    instance._series_previous_day = None
+    if series_enabled() and instance.pk and not raw:
+        instance._series_previous_day = (
+            GlucoseMeasurement.objects.filter(pk=instance.pk).values_list('date_of_measurement', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=GlucoseMeasurement)
+def update_series_on_save(sender, instance, raw=False, **kwargs):
+    if raw or not series_enabled():
+        return
+    days = {instance.date_of_measurement, getattr(instance, '_series_previous_day', None)} - {None}
+    patient_id = instance.patient_id
+    transaction.on_commit(lambda: rebuild_day_series(patient_id, days))
+
+
+@receiver(post_delete, sender=GlucoseMeasurement)
+def update_series_on_delete(sender, instance, **kwargs):
+    if not series_enabled():
+        return
+    patient_id, day = instance.patient_id, instance.date_of_measurement
+    transaction.on_commit(lambda: rebuild_day_series(patient_id, [day]))
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def food_catalog_changed(sender, raw=False, **kwargs):
+    """Autocomplete indexes in every process rebuild once they see the new catalog version."""
+    if not raw:
+        transaction.on_commit(bump_catalog_version)
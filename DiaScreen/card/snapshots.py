@@ -0,0 +1,147 @@
+"""
+Maintenance of ``PatientLatestSnapshot``.
+
+Every measurement save/delete adjusts the patient's snapshot after the write
+commits, so pages that show "the latest reading" read one row instead of
+querying each measurement table. Bulk writes (``bulk_create``,
+``QuerySet.update``) bypass signals and must call ``refresh_snapshot``.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PatientLatestSnapshot
+
+# kind -> source model and {snapshot field: source field path}
+SNAPSHOT_SOURCES = {
+    'glucose': {
+        'model': 'GlucoseMeasurement',
+        'fields': {'glucose_value': 'glucose', 'glucose_category': 'glucose_measurement_category'},
+    },
+    'insuline': {
+        'model': 'InsulineDoseMeasurement',
+        'fields': {'insuline_dose': 'insuline_dose', 'insuline_category': 'category'},
+    },
+    'glycemic': {
+        'model': 'GlycemicProfileMeasurement',
+        'fields': {'glycemic_average_glucose': 'average_glucose', 'glycemic_hba1c': 'hba1c'},
+    },
+    'activity': {
+        'model': 'PhysicalActivityMeasurement',
+        'fields': {'activity_name': 'type_of_activity__name'},
+    },
+    'food': {
+        'model': 'FoodMeasurement',
+        'fields': {'food_category': 'category'},
+    },
+    'anthropometry': {
+        'model': 'AnthropometricMeasurement',
+        'fields': {'anthropometry_weight': 'weight', 'anthropometry_bmi': 'bmi'},
+    },
+}
+
+
+def snapshot_kind(model):
+    for kind, source in SNAPSHOT_SOURCES.items():
+        if source['model'] == model.__name__:
+            return kind
+    return None
+
+
+def _empty_values(kind):
+    values = {f'{kind}_record_id': None, f'{kind}_at': None}
+    values.update({field: None for field in SNAPSHOT_SOURCES[kind]['fields']})
+    return values
+
+
+def _resolve(instance, path):
+    value = instance
+    for attr in path.split('__'):
+        value = getattr(value, attr, None)
+        if value is None:
+            return None
+    return value
+
+
+def _instance_values(kind, instance):
+    values = {f'{kind}_record_id': instance.pk, f'{kind}_at': instance.measured_at}
+    for field, path in SNAPSHOT_SOURCES[kind]['fields'].items():
+        values[field] = _resolve(instance, path)
+    return values
+
+
+def latest_values(kind, patient_id):
+    """Snapshot values for the newest ``kind`` record of the patient, read from the measurement table."""
+    source = SNAPSHOT_SOURCES[kind]
+    model = apps.get_model('card', source['model'])
+    paths = list(source['fields'].values())
+    row = (
+        model.objects.filter(patient_id=patient_id)
+        .order_by('-measured_at', '-pk')
+        .values('pk', 'measured_at', *paths)
+        .first()
+    )
+    if row is None:
+        return _empty_values(kind)
+    values = {f'{kind}_record_id': row['pk'], f'{kind}_at': row['measured_at']}
+    for field, path in source['fields'].items():
+        values[field] = row[path]
+    return values
+
+
+def build_snapshot_values(patient_id):
+    values = {}
+    for kind in SNAPSHOT_SOURCES:
+        values.update(latest_values(kind, patient_id))
+    return values
+
+
+def get_latest_snapshot(patient):
+    """Return the patient's snapshot, building it on first access."""
+    try:
+        return patient.latest_snapshot
+    except PatientLatestSnapshot.DoesNotExist:
+        snapshot, _ = PatientLatestSnapshot.objects.get_or_create(
+            patient=patient,
+            defaults=build_snapshot_values(patient.pk),
+        )
+        return snapshot
+
+
+def refresh_snapshot(patient_id, kinds=None):
+    """Recompute the given kinds (all by default) from the measurement tables."""
+    values = {}
+    for kind in kinds or SNAPSHOT_SOURCES:
+        values.update(latest_values(kind, patient_id))
+    PatientLatestSnapshot.objects.filter(patient_id=patient_id).update(updated_at=timezone.now(), **values)
+
+
+def record_saved(kind, instance):
+    with transaction.atomic():
+        snapshot = PatientLatestSnapshot.objects.select_for_update().filter(patient_id=instance.patient_id).first()
+        if snapshot is None:
+            snapshot, created = PatientLatestSnapshot.objects.get_or_create(
+                patient_id=instance.patient_id,
+                defaults=build_snapshot_values(instance.patient_id),
+            )
+            if created:
+                return
+
+        values = _instance_values(kind, instance)
+        current_id = getattr(snapshot, f'{kind}_record_id')
+        current_at = getattr(snapshot, f'{kind}_at')
+        if current_id == instance.pk and current_at is not None and values[f'{kind}_at'] < current_at:
+            # The latest record was moved back in time; another record may now be newer.
+            values = latest_values(kind, instance.patient_id)
+        elif current_at is not None and current_id != instance.pk and values[f'{kind}_at'] < current_at:
+            return
+
+        PatientLatestSnapshot.objects.filter(pk=snapshot.pk).update(updated_at=timezone.now(), **values)
+
+
+def record_deleted(kind, patient_id, record_id):
+    current_id = PatientLatestSnapshot.objects.filter(patient_id=patient_id).values_list(
+        f'{kind}_record_id', flat=True
+    ).first()
+    if current_id == record_id:
+        refresh_snapshot(patient_id, kinds=[kind])
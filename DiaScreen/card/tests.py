@@ -1,21 +1,42 @@
-from datetime import datetime, time
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from user_auth.models import Address, Patient
 
 from .models import (
     AnthropometricMeasurement,
+    FoodItem,
     FoodMeasurement,
     FoodPortion,
+    GlucoseDaySeries,
+    GlucoseDevice,
     GlucoseMeasurement,
     GlycemicProfileMeasurement,
     InsulineDoseMeasurement,
+    PatientLatestSnapshot,
     PhysicalActivityMeasurement,
     TypeOfActivity,
 )
+from .foods import FoodCatalogIndex, resolve_food_items
+from .imports import import_glucose_readings
+from .partitioning import add_months, convert_all, ensure_future_partitions, month_start, partition_name
+from .profiles import estimate_hba1c, generate_glycemic_profiles
+from .series import decode_points, load_glucose_series, pack_points
+from .snapshots import get_latest_snapshot
 
 
 User = get_user_model()
@@ -101,6 +122,57 @@ class CardViewTests(TestCase):
         portion = meal.portions.first()
         self.assertIsInstance(portion, FoodPortion)
 
+    def test_meal_bread_units_are_weighted_by_grams_and_follow_edits(self):
+        self.client.force_login(self.user)
+        payload = {
+            'action': 'create_food',
+            'category': 'Обід',
+            'date_of_measurement': datetime.today().date(),
+            'time_of_eating': time(13, 0),
+            'insuline_dose_before': '4',
+            'portion-TOTAL_FORMS': '2',
+            'portion-INITIAL_FORMS': '0',
+            'portion-MIN_NUM_FORMS': '0',
+            'portion-MAX_NUM_FORMS': '1000',
+            'portion-0-food_name': 'Гречка',
+            'portion-0-carbohydrates': '60',
+            'portion-0-grams': '150',
+            'portion-1-food_name': 'Яблуко',
+            'portion-1-carbohydrates': '12',
+            'portion-1-grams': '200',
+        }
+        self.client.post(reverse('card:patient_card'), data=payload)
+        meal = FoodMeasurement.objects.get(patient=self.patient)
+        # (60 * 150 + 12 * 200) / 100 / 12
+        self.assertEqual(meal.bread_unit, Decimal('9.50'))
+        self.assertEqual(meal.calculate_bread_unit(), Decimal('9.50'))
+
+        portions = list(meal.portions.order_by('pk'))
+        edit = {
+            'category': 'Обід',
+            'date_of_measurement': meal.date_of_measurement,
+            'time_of_eating': time(13, 0),
+            'insuline_dose_before': '4',
+            'portion-TOTAL_FORMS': '2',
+            'portion-INITIAL_FORMS': '2',
+            'portion-MIN_NUM_FORMS': '0',
+            'portion-MAX_NUM_FORMS': '1000',
+            'portion-0-id': portions[0].pk,
+            'portion-0-food_name': 'Гречка',
+            'portion-0-carbohydrates': '60',
+            'portion-0-grams': '100',
+            'portion-1-id': portions[1].pk,
+            'portion-1-food_name': 'Яблуко',
+            'portion-1-carbohydrates': '12',
+            'portion-1-grams': '200',
+            'portion-1-DELETE': 'on',
+        }
+        self.client.post(reverse('card:food_edit', args=[meal.pk]), data=edit)
+        meal.refresh_from_db()
+        self.assertEqual(meal.bread_unit, Decimal('5.00'))
+        self.assertEqual(meal.insuline_dose_after, Decimal('5.00'))
+        self.assertEqual(list(meal.portions.values_list('grams', flat=True)), [Decimal('100.00')])
+
     def test_create_insuline_measurement(self):
         self.client.force_login(self.user)
         payload = {
@@ -144,3 +216,708 @@ class CardViewTests(TestCase):
         response = self.client.post(reverse('card:patient_card'), data=payload, follow=True)
         self.assertRedirects(response, reverse('card:patient_card'))
         self.assertEqual(AnthropometricMeasurement.objects.filter(patient=self.patient).count(), 1)
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False)
+class PatientLatestSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="snapshot",
+            email="snapshot@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def _glucose(self, value, day, at):
+        with self.captureOnCommitCallbacks(execute=True):
+            return GlucoseMeasurement.objects.create(
+                patient=self.patient,
+                glucose=value,
+                date_of_measurement=day,
+                time_of_measurement=at,
+            )
+
+    def test_snapshot_follows_create_update_and_delete(self):
+        today = datetime.today().date()
+        first = self._glucose('5.5', today, time(8, 0))
+        second = self._glucose('7.1', today, time(12, 0))
+        self._glucose('4.2', today, time(6, 0))
+
+        snapshot = get_latest_snapshot(self.patient)
+        self.assertEqual(snapshot.glucose_record_id, second.pk)
+
+        second.time_of_measurement = time(7, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.glucose_record_id, first.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.glucose_record_id, second.pk)
+        self.assertEqual(str(snapshot.glucose_value), '7.10')
+
+    def test_snapshot_is_built_on_first_access(self):
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=self.patient, glucose='6.3', date_of_measurement=datetime.today().date(), time_of_measurement=time(9, 0)),
+        ])
+        self.assertFalse(PatientLatestSnapshot.objects.exists())
+
+        snapshot = get_latest_snapshot(self.patient)
+        self.assertEqual(str(snapshot.glucose_value), '6.30')
+        self.assertIsNone(snapshot.insuline_at)
+
+
+class FoodItemResolutionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="foods",
+            email="foods@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def test_resolves_all_names_with_fixed_queries(self):
+        FoodItem.objects.create(name="Рис", proteins=7, fats=1, carbohydrates=Decimal('78'))
+        FoodItem.objects.create(name="Банан", proteins=1, fats=0, carbohydrates=Decimal('21'))
+        # select, insert missing, re-select created, bulk update changed carbohydrates
+        with self.assertNumQueries(4):
+            items = resolve_food_items({'Рис': Decimal('77'), 'Банан': Decimal('21'), 'Кефір': Decimal('4'), 'Хліб': Decimal('49')})
+
+        self.assertEqual(set(items), {'Рис', 'Банан', 'Кефір', 'Хліб'})
+        self.assertEqual(FoodItem.objects.get(name="Рис").carbohydrates, Decimal('77.00'))
+        self.assertEqual(FoodItem.objects.count(), 4)
+
+    def test_edit_formset_loads_products_with_portions(self):
+        meal = FoodMeasurement.objects.create(patient=self.patient, insuline_dose_before='1')
+        for index in range(5):
+            FoodPortion.objects.create(measurement=meal, food=FoodItem.objects.create(name=f"Продукт {index}", proteins=0, fats=0, carbohydrates=10), grams=50)
+
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('card:food_edit', args=[meal.pk]))
+        self.assertContains(response, 'Продукт 4')
+        self.assertFalse([query for query in queries if 'FROM "card_fooditem"' in query['sql']])
+
+
+class FoodCatalogLoadTests(TestCase):
+    def test_loader_normalizes_deduplicates_and_upserts(self):
+        FoodItem.objects.create(name="Гречка", proteins=0, fats=0, carbohydrates=Decimal('50'))
+        csv_data = (
+            "назва,білки,жири,вуглеводи\n"
+            "  ГРЕЧКА ,12.6,3.3,\"62,1\"\n"
+            "Рис білий,7,1,78\n"
+            "рис  білий,6.7,0.7,79\n"
+            ",1,1,1\n"
+            "Кефір,3,2.5,-4\n"
+        )
+        out = io.StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as handle:
+            handle.write(csv_data)
+        try:
+            call_command('load_food_items', handle.name, stdout=out)
+        finally:
+            os.unlink(handle.name)
+
+        self.assertEqual(FoodItem.objects.count(), 2)
+        buckwheat = FoodItem.objects.get(normalized_name='гречка')
+        self.assertEqual((buckwheat.name, buckwheat.carbohydrates), ('ГРЕЧКА', Decimal('62.10')))
+        self.assertEqual(FoodItem.objects.get(normalized_name='рис білий').carbohydrates, Decimal('79.00'))
+        self.assertIn('Завантажено продуктів: 2, дублікатів: 1, помилок: 2', out.getvalue())
+
+    def test_blank_carbohydrates_keep_the_loaded_value(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as handle:
+            handle.write("назва,білки,жири,вуглеводи\nГречка,12.6,3.3,60\n")
+        try:
+            call_command('load_food_items', handle.name, stdout=io.StringIO())
+        finally:
+            os.unlink(handle.name)
+
+        user = User.objects.create_user(username="blankcarbs", email="blankcarbs@example.com", password="StrongPass123")
+        self.client.force_login(user)
+        self.client.post(reverse('card:patient_card'), data={
+            'action': 'create_food',
+            'category': 'Обід',
+            'date_of_measurement': datetime.today().date(),
+            'time_of_eating': time(13, 0),
+            'insuline_dose_before': '4',
+            'portion-TOTAL_FORMS': '1',
+            'portion-INITIAL_FORMS': '0',
+            'portion-MIN_NUM_FORMS': '0',
+            'portion-MAX_NUM_FORMS': '1000',
+            'portion-0-food_name': 'гречка',
+            'portion-0-carbohydrates': '',
+            'portion-0-grams': '120',
+        })
+
+        self.assertEqual(FoodItem.objects.get(normalized_name='гречка').carbohydrates, Decimal('60.00'))
+        meal = FoodMeasurement.objects.get(patient__user=user)
+        # 60 * 120 / 100 / 12
+        self.assertEqual(meal.bread_unit, Decimal('6.00'))
+        self.assertEqual(meal.portions.get().food.normalized_name, 'гречка')
+
+    def test_portion_names_reuse_normalized_entries(self):
+        FoodItem.objects.create(name="Вівсянка", proteins=12, fats=6, carbohydrates=Decimal('60'))
+        items = resolve_food_items({'вівсянка ': Decimal('60')})
+        self.assertEqual(items['вівсянка '].name, 'Вівсянка')
+        self.assertEqual(FoodItem.objects.count(), 1)
+
+
+class FoodAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="autocomplete",
+            email="autocomplete@example.com",
+            password="StrongPass123",
+        )
+
+    def test_index_matches_case_words_and_transliteration(self):
+        index = FoodCatalogIndex([
+            (1, 'Гречка варена', Decimal('20')),
+            (2, 'Хліб житній', Decimal('40')),
+            (3, 'Каша гречана', Decimal('25')),
+        ])
+        self.assertEqual([item['id'] for item in index.search('ГРЕЧ')], [1, 3])
+        self.assertEqual([item['id'] for item in index.search('hlib')], [2])
+        self.assertEqual([item['id'] for item in index.search('khlib zh')], [2])
+        self.assertEqual(index.search('греч', limit=1)[0]['carbohydrates'], Decimal('20'))
+        self.assertEqual(index.search(' '), [])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'food-autocomplete-tests'}})
+    def test_api_sees_catalog_changes_without_table_scans(self):
+        self.client.force_login(self.user)
+        url = reverse('card:food_autocomplete')
+        with self.captureOnCommitCallbacks(execute=True):
+            FoodItem.objects.create(name="Йогурт", proteins=4, fats=2, carbohydrates=Decimal('6'))
+        self.assertEqual(self.client.get(url, {'q': 'йог'}).json()['results'][0]['name'], 'Йогурт')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FoodItem.objects.create(name="Йогурт грецький", proteins=9, fats=5, carbohydrates=Decimal('4'))
+        self.assertEqual(len(self.client.get(url, {'q': 'yogurt'}).json()['results']), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'q': 'йогурт г'})
+        self.assertFalse([query for query in queries if 'card_fooditem' in query['sql']])
+
+
+class MeasuredAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="measured",
+            email="measured@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def test_measured_at_follows_save_update_fields_and_bulk_create(self):
+        reading = GlucoseMeasurement.objects.create(patient=self.patient, glucose='5.0', date_of_measurement='2024-05-01', time_of_measurement='07:30')
+        self.assertEqual(reading.measured_at, datetime(2024, 5, 1, 7, 30, tzinfo=dt_timezone.utc))
+
+        reading.time_of_measurement = time(9, 0)
+        reading.save(update_fields=['time_of_measurement'])
+        reading.refresh_from_db()
+        self.assertEqual(reading.measured_at, datetime(2024, 5, 1, 9, 0, tzinfo=dt_timezone.utc))
+
+        InsulineDoseMeasurement.objects.bulk_create([
+            InsulineDoseMeasurement(patient=self.patient, category='Інше', insuline_dose='3', date_of_measurement=date(2024, 5, 2), time=time(8, 0)),
+        ])
+        self.assertEqual(
+            InsulineDoseMeasurement.objects.get(patient=self.patient).measured_at,
+            datetime(2024, 5, 2, 8, 0, tzinfo=dt_timezone.utc),
+        )
+
+
+class PatientCardLoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="loader",
+            email="loader@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def _add_history(self, start):
+        for offset in range(start, start + 12):
+            activity_type = TypeOfActivity.objects.create(name=f"Активність {offset}")
+            PhysicalActivityMeasurement.objects.create(
+                patient=self.patient,
+                type_of_activity=activity_type,
+                date_of_measurement=datetime.today().date(),
+                time_of_activity=time(offset % 24, 0),
+            )
+            GlucoseMeasurement.objects.create(
+                patient=self.patient,
+                glucose='5.5',
+                date_of_measurement=datetime.today().date(),
+                time_of_measurement=time(offset % 24, 0),
+            )
+
+    def test_patient_card_query_count_does_not_grow_with_history(self):
+        self.client.force_login(self.user)
+        self._add_history(0)
+        with CaptureQueriesContext(connection) as short_history:
+            response = self.client.get(reverse('card:patient_card'))
+        self.assertEqual(len(response.context['activity_list']), 10)
+
+        self._add_history(12)
+        with CaptureQueriesContext(connection) as long_history:
+            response = self.client.get(reverse('card:patient_card'))
+
+        self.assertEqual(len(long_history), len(short_history))
+        self.assertEqual(response.context['glucose_latest'], response.context['glucose_list'][0])
+        self.assertEqual(response.context['glucose_latest'].time_of_measurement, time(23, 0))
+        self.assertIsNone(response.context['inactivity_warning'])
+
+
+class DoctorReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="doctor_report",
+            email="doctor_report@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def _add_history(self, start, days):
+        for offset in range(start, start + days):
+            day = date(2020, 1, 1) + timedelta(days=offset)
+            activity_type = TypeOfActivity.objects.create(name=f"Вправа {day}")
+            PhysicalActivityMeasurement.objects.create(patient=self.patient, type_of_activity=activity_type, date_of_measurement=day, time_of_activity=time(18, 0))
+            GlucoseMeasurement.objects.create(patient=self.patient, glucose='6.0', date_of_measurement=day, time_of_measurement=time(8, 0))
+            GlycemicProfileMeasurement.objects.create(
+                patient=self.patient, measurement_date=day, measurement_time=time(9, 0),
+                average_glucose='6.5', hba1c='6.0', hypoglycemic_events=0, hyperglycemic_events=1,
+            )
+
+    def test_full_history_report_has_fixed_query_count(self):
+        self.client.force_login(self.user)
+        self._add_history(0, 3)
+        with CaptureQueriesContext(connection) as short_history:
+            response = self.client.get(reverse('card:doctor_report'), {'period': 'all'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        self._add_history(3, 20)
+        with CaptureQueriesContext(connection) as long_history:
+            self.client.get(reverse('card:doctor_report'), {'period': 'all'})
+        self.assertEqual(len(long_history), len(short_history))
+
+
+class MeasurementHistoryApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="history",
+            email="history@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_keyset_pages_cover_history_without_gaps(self):
+        today = datetime.today().date()
+        for _ in range(3):
+            # Identical timestamps: the id keeps the order stable across pages.
+            GlucoseMeasurement.objects.create(patient=self.patient, glucose='6.0', date_of_measurement=today, time_of_measurement=time(9, 0))
+        GlucoseMeasurement.objects.create(patient=self.patient, glucose='7.0', date_of_measurement=today, time_of_measurement=time(12, 0))
+
+        url = reverse('card:measurement_history', args=['glucose'])
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self.client.get(url, params).json()
+            seen.extend(row['id'] for row in payload['results'])
+            cursor = payload['next_cursor']
+            if not cursor:
+                break
+
+        expected = list(GlucoseMeasurement.objects.filter(patient=self.patient).values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(payload['results'][-1]['glucose'], '6.00')
+
+    def test_food_history_includes_portions(self):
+        meal = FoodMeasurement.objects.create(patient=self.patient, insuline_dose_before='2.00')
+        food = FoodItem.objects.create(name="Гречка", proteins=13, fats=3, carbohydrates=68)
+        FoodPortion.objects.create(measurement=meal, food=food, grams=150)
+
+        payload = self.client.get(reverse('card:measurement_history', args=['food'])).json()
+        self.assertEqual(payload['results'][0]['portions'], [{'food': 'Гречка', 'grams': '150.00'}])
+
+    def test_invalid_cursor_and_unknown_kind(self):
+        url = reverse('card:measurement_history', args=['glucose'])
+        self.assertEqual(self.client.get(url, {'cursor': 'broken'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('card:measurement_history', args=['sleep'])).status_code, 404)
+
+
+class LogbookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="logbook",
+            email="logbook@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+        today = datetime.today().date()
+        running = TypeOfActivity.objects.create(name="Плавання")
+        GlucoseMeasurement.objects.create(patient=cls.patient, glucose='5.1', date_of_measurement=today, time_of_measurement=time(7, 0))
+        InsulineDoseMeasurement.objects.create(patient=cls.patient, category='До сніданку', insuline_dose='4', date_of_measurement=today, time=time(7, 30))
+        GlucoseMeasurement.objects.create(patient=cls.patient, glucose='8.4', date_of_measurement=today, time_of_measurement=time(10, 0))
+        PhysicalActivityMeasurement.objects.create(patient=cls.patient, type_of_activity=running, date_of_measurement=today, time_of_activity=time(7, 30))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_api_interleaves_types_in_time_order_across_pages(self):
+        url = reverse('card:logbook_api')
+        first = self.client.get(url, {'limit': 2}).json()
+        second = self.client.get(url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+
+        kinds = [entry['kind'] for entry in first['results'] + second['results']]
+        self.assertEqual(kinds, ['glucose', 'insuline', 'activity', 'glucose'])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(second['results'][1]['value'], '8.40 ммоль/л')
+
+    def test_html_logbook_is_streamed(self):
+        response = self.client.get(reverse('card:logbook'))
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Плавання', content)
+        self.assertLess(content.index('5.10 ммоль/л'), content.index('8.40 ммоль/л'))
+        self.assertTrue(content.rstrip().endswith('</html>'))
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False)
+class MeasurementExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="exporter",
+            email="exporter@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+        GlucoseMeasurement.objects.create(patient=cls.patient, glucose='5.4', date_of_measurement=date(2024, 5, 1), time_of_measurement=time(7, 0))
+        GlucoseMeasurement.objects.create(patient=cls.patient, glucose='9.1', date_of_measurement=date(2024, 5, 2), time_of_measurement=time(13, 0))
+        InsulineDoseMeasurement.objects.create(patient=cls.patient, category='До обіду', insuline_dose='6', date_of_measurement=date(2024, 5, 2), time=time(12, 45))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_csv_export_streams_all_kinds(self):
+        response = self.client.get(reverse('card:export_measurements'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:6], ['kind', 'id', 'measured_at', 'date', 'time', 'glucose'])
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['glucose', 'glucose', 'insuline'])
+        self.assertIn('9.10', lines[2])
+
+    def test_gzipped_ndjson_export_with_filters(self):
+        response = self.client.get(reverse('card:export_measurements'), {
+            'format': 'ndjson',
+            'kinds': 'glucose',
+            'start': '2024-05-02',
+            'compress': 'gzip',
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        records = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['glucose'], '9.10')
+        self.assertEqual(records[0]['date'], '2024-05-02')
+
+    def test_rejects_unknown_format_or_kind(self):
+        url = reverse('card:export_measurements')
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'kinds': 'sleep'}).status_code, 400)
+
+
+class GlucoseImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="importer",
+            email="importer@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_csv_import_validates_and_deduplicates(self):
+        GlucoseMeasurement.objects.create(patient=self.patient, glucose='5.5', date_of_measurement='2024-01-01', time_of_measurement=time(8, 0))
+        content = (
+            "date,time,glucose,category\n"
+            "2024-01-01,08:00,5.50,Натщесердце\n"
+            "2024-01-01,12:00,7.2,\n"
+            "2024-01-01,12:00,7.2,\n"
+            "2024-01-02,09:15,99,\n"
+            "not-a-date,09:15,6.1,\n"
+        )
+        upload = SimpleUploadedFile("meter.csv", content.encode('utf-8'), content_type="text/csv")
+        with self.captureOnCommitCallbacks(execute=True):
+            payload = self.client.post(reverse('card:import_glucose'), {'file': upload}).json()
+
+        self.assertEqual(payload['created'], 1)
+        self.assertEqual(payload['duplicates'], 2)
+        self.assertEqual(payload['error_count'], 2)
+        self.assertEqual([error['row'] for error in payload['errors']], [5, 6])
+        self.assertIn('glucose', payload['errors'][0]['errors'])
+        self.assertEqual(GlucoseMeasurement.objects.filter(patient=self.patient).count(), 2)
+        self.assertEqual(str(get_latest_snapshot(self.patient).glucose_value), '7.20')
+
+    def test_json_array_and_ndjson_are_streamed(self):
+        readings = [
+            {'timestamp': f'2024-02-01T{hour:02d}:00:00', 'value': '6.4'}
+            for hour in range(24)
+        ]
+        report = import_glucose_readings(self.patient, io.BytesIO(json.dumps(readings).encode()), 'json', batch_size=5)
+        self.assertEqual(report['created'], 24)
+
+        ndjson = '\n'.join(json.dumps({'date': '2024-02-02', 'time': '10:00', 'glucose': value}) for value in ('5.0', '5.1'))
+        report = import_glucose_readings(self.patient, io.BytesIO(ndjson.encode()), 'json')
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['error_count'], 0)
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False)
+class CgmIngestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cgm",
+            email="cgm@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+        cls.device, cls.token = GlucoseDevice.register(cls.patient, "Libre")
+
+    def _post(self, readings, token=None):
+        return self.client.post(
+            reverse('card:cgm_readings'),
+            data=json.dumps({'readings': readings}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f"Bearer {token or self.token}",
+        )
+
+    def test_batch_is_upserted_on_device_timestamp(self):
+        readings = [
+            {'timestamp': f'2024-03-01T10:{minute:02d}:00+00:00', 'glucose': 6.1}
+            for minute in range(0, 60, 5)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            payload = self._post(readings + [{'timestamp': 'yesterday', 'glucose': 5}]).json()
+        self.assertEqual(payload['created'], 12)
+        self.assertEqual(payload['rejected'][0]['index'], 12)
+
+        readings[0]['glucose'] = 7.4
+        payload = self._post(readings[:2]).json()
+        self.assertEqual(payload['created'], 0)
+        self.assertEqual(GlucoseMeasurement.objects.filter(patient=self.patient, source=self.device.source).count(), 12)
+        self.assertTrue(GlucoseMeasurement.objects.filter(patient=self.patient, glucose='7.40').exists())
+
+    def test_non_finite_values_are_rejected_per_reading(self):
+        readings = [
+            {'timestamp': '2024-03-01T10:00:00+00:00', 'glucose': 'NaN'},
+            {'timestamp': '2024-03-01T10:05:00+00:00', 'glucose': 'sNaN'},
+            {'timestamp': '2024-03-01T10:10:00+00:00', 'glucose': 'Infinity'},
+            {'timestamp': '2024-03-01T10:15:00+00:00', 'glucose': 6.1},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post(readings)
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['created'], 1)
+        self.assertEqual([row['index'] for row in payload['rejected']], [0, 1, 2])
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self._post([], token='wrong').status_code, 401)
+
+    def test_full_queue_returns_429(self):
+        with mock.patch('card.cgm._write_slots.acquire', return_value=False):
+            response = self._post([{'timestamp': '2024-03-01T10:00:00+00:00', 'glucose': 6.1}])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False, GLUCOSE_DAY_SERIES_ENABLED=True)
+class GlucoseDaySeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="series",
+            email="series@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def test_pack_round_trip_is_sorted_by_minute(self):
+        blob = pack_points([(time(23, 55), Decimal('12.34')), (time(0, 5), Decimal('4.10'))])
+        points = decode_points(blob)
+        self.assertEqual(len(blob), 8)
+        self.assertEqual(points['minute'].tolist(), [5, 1435])
+        self.assertEqual(points['centi'].tolist(), [410, 1234])
+
+    def test_raw_rows_are_read_until_the_backfill_has_run(self):
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=self.patient, glucose='5.0', date_of_measurement=date(2024, 5, 1), time_of_measurement=time(7, 0)),
+            GlucoseMeasurement(patient=self.patient, glucose='8.0', date_of_measurement=date(2024, 5, 2), time_of_measurement=time(7, 0)),
+        ])
+        with self.assertLogs('card.series', 'WARNING'):
+            self.assertEqual(load_glucose_series(self.patient)[2].tolist(), [5.0, 8.0])
+
+        call_command('rebuild_glucose_series', stdout=io.StringIO())
+        # Signal-free update: only the packed series still holds the old value.
+        GlucoseMeasurement.objects.filter(glucose='8.0').update(glucose='9.0')
+        self.assertEqual(load_glucose_series(self.patient)[2].tolist(), [5.0, 8.0])
+
+    def test_series_follows_edits_across_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reading = GlucoseMeasurement.objects.create(patient=self.patient, glucose='6.0', date_of_measurement=date(2024, 5, 1), time_of_measurement=time(7, 0))
+        reading.date_of_measurement = date(2024, 5, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            reading.save()
+
+        self.assertEqual(list(GlucoseDaySeries.objects.values_list('day', flat=True)), [date(2024, 5, 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            reading.delete()
+        self.assertFalse(GlucoseDaySeries.objects.exists())
+
+
+class MeasurementPartitioningTests(TestCase):
+    def test_month_arithmetic_and_partition_names(self):
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(partition_name('card_glucosemeasurement', date(2025, 2, 1)), 'card_glucosemeasurement_p202502')
+
+    def test_command_is_noop_without_postgresql(self):
+        out = io.StringIO()
+        call_command('manage_partitions', 'create', stdout=out)
+        self.assertIn('нічого не змінено', out.getvalue())
+        self.assertEqual(ensure_future_partitions(connection), [])
+        GlucoseMeasurement.objects.create(
+            patient=Patient.objects.get(user=User.objects.create_user(username="part", email="part@example.com", password="StrongPass123")),
+            glucose='5.5',
+            date_of_measurement=date(2024, 5, 1),
+            time_of_measurement=time(8, 0),
+        )
+        self.assertEqual(GlucoseMeasurement.objects.count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Partitioning needs PostgreSQL')
+    def test_future_dated_rows_move_out_of_the_default_partition(self):
+        patient = Patient.objects.get(user=User.objects.create_user(username="future", email="future@example.com", password="StrongPass123"))
+        today = date.today()
+        convert_all(connection)
+        far_month = add_months(month_start(today), 8)
+        reading = GlucoseMeasurement.objects.create(
+            patient=patient,
+            glucose='5.5',
+            date_of_measurement=far_month.replace(day=15),
+            time_of_measurement=time(8, 0),
+        )
+
+        def rows_in(partition):
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(partition)}')
+                return cursor.fetchone()[0]
+
+        self.assertEqual(rows_in('card_glucosemeasurement_default'), 1)
+        created = ensure_future_partitions(connection, months_ahead=8, today=today)
+        self.assertIn(partition_name('card_glucosemeasurement', far_month), created)
+        self.assertEqual(rows_in('card_glucosemeasurement_default'), 0)
+        self.assertEqual(rows_in(partition_name('card_glucosemeasurement', far_month)), 1)
+        self.assertEqual(GlucoseMeasurement.objects.get().pk, reading.pk)
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False, GLYCEMIC_PROFILES_SETTLE_SECONDS=0)
+class GlycemicProfileGenerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="profiles",
+            email="profiles@example.com",
+            password="StrongPass123",
+        )
+        cls.patient = Patient.objects.get(user=cls.user)
+
+    def _readings(self, day, values):
+        GlucoseMeasurement.objects.bulk_create([
+            GlucoseMeasurement(patient=self.patient, glucose=value, date_of_measurement=day, time_of_measurement=time(6 + index, 0))
+            for index, value in enumerate(values)
+        ])
+
+    def test_profiles_are_rebuilt_only_for_days_with_new_readings(self):
+        GlycemicProfileMeasurement.objects.create(
+            patient=self.patient,
+            measurement_date=date(2024, 5, 1),
+            measurement_time=time(20, 0),
+            average_glucose='7.00',
+            hba1c='6.00',
+            hypoglycemic_events=0,
+            hyperglycemic_events=0,
+        )
+        self._readings(date(2024, 5, 1), ['3.5', '3.2', '6.0', '11.0', '12.0', '3.0'])
+        self._readings(date(2024, 5, 2), ['8.0', '8.0'])
+
+        # 1 May spans two batches, so it is rebuilt twice.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(generate_glycemic_profiles(batch_size=3), 3)
+        self.assertEqual(GlycemicProfileMeasurement.objects.filter(source='auto').count(), 2)
+
+        first = GlycemicProfileMeasurement.objects.get(source='auto', measurement_date=date(2024, 5, 1))
+        self.assertEqual(first.average_glucose, Decimal('6.45'))
+        self.assertEqual(first.hypoglycemic_events, 2)
+        self.assertEqual(first.hyperglycemic_events, 1)
+        self.assertEqual(first.measurement_time, time(11, 0))
+        self.assertEqual(first.hba1c, estimate_hba1c(Decimal('6.45')))
+        second = GlycemicProfileMeasurement.objects.get(source='auto', measurement_date=date(2024, 5, 2))
+        # Trailing mean over both days: (38.7 + 16) / 8.
+        self.assertEqual(second.hba1c, estimate_hba1c(Decimal('54.7') / 8))
+        self.assertEqual(GlycemicProfileMeasurement.objects.filter(source='manual').count(), 1)
+        self.assertEqual(get_latest_snapshot(self.patient).glycemic_record_id, second.pk)
+
+        self.assertEqual(generate_glycemic_profiles(), 0)
+
+        self._readings(date(2024, 5, 2), ['2.0'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(generate_glycemic_profiles(), 1)
+        self.assertEqual(GlycemicProfileMeasurement.objects.filter(source='auto').count(), 2)
+        self.assertEqual(
+            GlycemicProfileMeasurement.objects.get(source='auto', measurement_date=date(2024, 5, 2)).hypoglycemic_events,
+            1,
+        )
+        # 1 May had no new readings and keeps its profile.
+        self.assertEqual(
+            GlycemicProfileMeasurement.objects.get(source='auto', measurement_date=date(2024, 5, 1)).pk,
+            first.pk,
+        )
+
+    @override_settings(GLYCEMIC_PROFILES_SETTLE_SECONDS=60)
+    def test_readings_wait_for_the_settle_window(self):
+        self._readings(date(2024, 6, 1), ['6.0', '7.0'])
+        self.assertEqual(generate_glycemic_profiles(), 0)
+
+        GlucoseMeasurement.objects.update(created_at=datetime.now(dt_timezone.utc) - timedelta(minutes=5))
+        self.assertEqual(generate_glycemic_profiles(), 1)
+
+    def test_high_mean_glucose_yields_a_profile_that_passes_validation(self):
+        self._readings(date(2024, 6, 1), ['15.0', '16.0', '17.0'])
+        generate_glycemic_profiles()
+
+        profile = GlycemicProfileMeasurement.objects.get(source='auto')
+        self.assertEqual(profile.hba1c, estimate_hba1c(Decimal('16.0')))
+        self.assertGreater(profile.hba1c, 10)
+        profile.full_clean()
+        self.assertEqual(estimate_hba1c(Decimal('35')), Decimal(GlycemicProfileMeasurement.HBA1C_MAX))
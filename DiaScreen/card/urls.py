@@ -18,6 +18,14 @@ urlpatterns = [
     path('insuline/<int:pk>/edit/', views.InsulineUpdateView.as_view(), name='insuline_edit'),
     path('insuline/<int:pk>/delete/', views.InsulineDeleteView.as_view(), name='insuline_delete'),
 
+    path('api/history/<str:kind>/', views.measurement_history, name='measurement_history'),
+    path('logbook/', views.logbook_view, name='logbook'),
+    path('import/glucose/', views.import_glucose, name='import_glucose'),
+    path('api/cgm/readings/', views.cgm_readings, name='cgm_readings'),
+    path('api/logbook/', views.logbook_api, name='logbook_api'),
+    path('export/', views.export_measurements, name='export_measurements'),
+    path('api/foods/autocomplete/', views.food_autocomplete, name='food_autocomplete'),
+
     path('doctor-report/', views.doctor_report, name='doctor_report'),
 ]
 
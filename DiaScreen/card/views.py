@@ -1,14 +1,20 @@
-from datetime import datetime, timedelta
+import json
+from datetime import date, timedelta
 from io import BytesIO
 from pathlib import Path
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.db.models import Avg, Count
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
+from django.utils.html import format_html
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from django.views.generic import DeleteView, UpdateView
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
@@ -16,6 +22,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from .cgm import IngestionBusy, authenticate_device, ingest_readings, parse_readings
 from .forms import (
     AnthropometricMeasurementForm,
     FoodMeasurementForm,
@@ -34,6 +41,12 @@ from .models import (
     InsulineDoseMeasurement,
     PhysicalActivityMeasurement,
 )
+from .exports import EXPORT_FORMATS, stream_export
+from .foods import search_food_items
+from .history import HISTORY_SOURCES, fetch_history_page
+from .imports import detect_format, import_glucose_readings
+from .loaders import load_patient_card
+from .logbook import describe_entry, iter_logbook, logbook_page
 from support.forms import SupportTicketForm
 
 PDF_PRIMARY_FONT = "DiaScreenSans"
@@ -119,11 +132,10 @@ def patient_card(request):
             if food_form.is_valid() and portion_formset.is_valid():
                 meal = food_form.save(commit=False)
                 meal.patient = patient
+                meal.apply_bread_unit(portion_formset.bread_unit())
                 meal.save()
                 portion_formset.instance = meal
                 portion_formset.save()
-                # meal.save() will recalc in model
-                meal.save()
                 messages.success(request, 'Прийом їжі додано')
                 return redirect('card:patient_card')
 
@@ -154,53 +166,7 @@ def patient_card(request):
                 messages.success(request, 'Антропометричний запис додано')
                 return redirect('card:patient_card')
 
-    glucose_qs = GlucoseMeasurement.objects.filter(patient=patient).order_by('-date_of_measurement', '-time_of_measurement')
-    activity_qs = PhysicalActivityMeasurement.objects.filter(patient=patient).order_by('-date_of_measurement', '-time_of_activity')
-    food_qs = FoodMeasurement.objects.filter(patient=patient).order_by('-date_of_measurement', '-time_of_eating')
-    insuline_qs = InsulineDoseMeasurement.objects.filter(patient=patient).order_by('-date_of_measurement', '-time')
-    glycemic_qs = GlycemicProfileMeasurement.objects.filter(patient=patient).order_by('-measurement_date', '-measurement_time')
-    anthropometry_qs = AnthropometricMeasurement.objects.filter(patient=patient).order_by('-measurement_date', '-measurement_time')
-
-    glucose_list = list(glucose_qs[:10])
-    activity_list = list(activity_qs[:10])
-    food_list = list(food_qs[:10])
-    insuline_list = list(insuline_qs[:10])
-    glycemic_list = list(glycemic_qs[:10])
-    anthropometry_list = list(anthropometry_qs[:10])
-
-    inactivity_warning = None
-    latest_dt = None
-    current_tz = timezone.get_current_timezone()
-
-    latest_records = [
-        glucose_qs.first(),
-        insuline_qs.first(),
-        glycemic_qs.first(),
-        anthropometry_qs.first(),
-        activity_qs.first(),
-        food_qs.first(),
-    ]
-
-    for record in latest_records:
-        if not record:
-            continue
-        if hasattr(record, 'date_of_measurement') and hasattr(record, 'time_of_measurement'):
-            combined = datetime.combine(record.date_of_measurement, record.time_of_measurement)
-        elif hasattr(record, 'date_of_measurement') and hasattr(record, 'time'):
-            combined = datetime.combine(record.date_of_measurement, record.time)
-        elif hasattr(record, 'measurement_date') and hasattr(record, 'measurement_time'):
-            combined = datetime.combine(record.measurement_date, record.measurement_time)
-        else:
-            continue
-
-        aware = timezone.make_aware(combined, current_tz)
-        if latest_dt is None or aware > latest_dt:
-            latest_dt = aware
-
-    if latest_dt is None:
-        inactivity_warning = 'Ви ще не додали жодного запису. Почніть вести картку, щоб система могла аналізувати ваш стан.'
-    elif timezone.now() - latest_dt > timedelta(days=2):
-        inactivity_warning = 'Більше двох днів без нових записів у картці. Будь ласка, оновіть дані для точнішого моніторингу.'
+    card_data = load_patient_card(patient)
 
     return render(request, 'card/patient_card.html', {
         'glucose_form': glucose_form,
@@ -211,23 +177,227 @@ def patient_card(request):
         'glycemic_form': glycemic_form,
         'anthropometry_form': anthropometry_form,
         'support_ticket_form': support_ticket_form,
-        'glucose_list': glucose_list,
-        'activity_list': activity_list,
-        'food_list': food_list,
-        'insuline_list': insuline_list,
-        'glycemic_list': glycemic_list,
-        'anthropometry_list': anthropometry_list,
-        'glucose_latest': glucose_qs.first(),
-        'activity_latest': activity_qs.first(),
-        'food_latest': food_qs.first(),
-        'insuline_latest': insuline_qs.first(),
-        'glycemic_latest': glycemic_qs.first(),
-        'anthropometry_latest': anthropometry_qs.first(),
         'patient': patient,
-        'inactivity_warning': inactivity_warning,
+        **card_data,
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def measurement_history(request, kind):
+    """JSON history of one measurement type, newest first, continued with ``?cursor=``."""
+    if kind not in HISTORY_SOURCES:
+        return JsonResponse({'success': False, 'error': 'Невідомий тип записів'}, status=404)
+
+    try:
+        limit = int(request.GET.get('limit') or 0) or None
+        rows, next_cursor = fetch_history_page(
+            request.user.profile,
+            kind,
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+        )
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Некоректні параметри запиту'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'results': rows,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@require_http_methods(["POST"])
+def import_glucose(request):
+    """Import a glucose meter export (CSV, NDJSON or JSON array) and report per-row errors."""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'Файл не завантажено'}, status=400)
+
+    file_format = request.POST.get('format') or detect_format(upload.name)
+    if file_format not in ('csv', 'json'):
+        return JsonResponse({'success': False, 'error': 'Непідтримуваний формат файлу'}, status=400)
+
+    report = import_glucose_readings(request.user.profile, upload, file_format)
+    return JsonResponse({'success': True, **report})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def cgm_readings(request):
+    """
+    Batch ingestion for CGM devices: ``{"readings": [{"timestamp": ISO 8601, "glucose": mmol/l}, ...]}``.
+    """
+    device = authenticate_device(request.headers.get('Authorization'))
+    if device is None:
+        return JsonResponse({'success': False, 'error': 'Недійсний токен пристрою'}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'Некоректний JSON'}, status=400)
+    items = payload.get('readings') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return JsonResponse({'success': False, 'error': 'Очікується масив readings'}, status=400)
+    if len(items) > settings.CGM_MAX_BATCH_SIZE:
+        return JsonResponse({'success': False, 'error': 'Забагато записів в одному пакеті'}, status=413)
+
+    readings, rejected = parse_readings(items)
+    try:
+        created = ingest_readings(device, readings)
+    except IngestionBusy:
+        response = JsonResponse({'success': False, 'error': 'Сервер перевантажено, повторіть пізніше'}, status=429)
+        response['Retry-After'] = str(settings.CGM_RETRY_AFTER_SECONDS)
+        return response
+
+    return JsonResponse({
+        'success': True,
+        'accepted': len(readings),
+        'created': created,
+        'rejected': rejected,
     })
 
 
+def _logbook_range(request, default_days=None):
+    """Parse ``start``/``end`` query parameters; raises ``ValueError`` on malformed dates."""
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+    start = date.fromisoformat(start) if start else None
+    end = date.fromisoformat(end) if end else None
+    if default_days and start is None and end is None:
+        end = timezone.localdate()
+        start = end - timedelta(days=default_days - 1)
+    return start, end
+
+
+@login_required
+@require_http_methods(["GET"])
+def logbook_api(request):
+    """Chronological logbook page as JSON, continued with ``?cursor=``."""
+    try:
+        start, end = _logbook_range(request)
+        limit = int(request.GET.get('limit') or 0) or None
+        entries, next_cursor = logbook_page(
+            request.user.profile,
+            start=start,
+            end=end,
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+        )
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Некоректні параметри запиту'}, status=400)
+
+    results = []
+    for entry in entries:
+        value, details = describe_entry(entry)
+        results.append({
+            'kind': entry['kind'],
+            'id': entry['id'],
+            'date': entry['date'],
+            'time': entry['time'],
+            'value': value,
+            'details': details,
+        })
+    return JsonResponse({'success': True, 'results': results, 'next_cursor': next_cursor})
+
+
+LOGBOOK_ROWS_SENTINEL = '<!-- logbook-rows -->'
+
+
+def _logbook_rows(entries, flush_every=200):
+    buffer = []
+    current_date = None
+    for entry in entries:
+        if entry['date'] != current_date:
+            current_date = entry['date']
+            buffer.append(format_html(
+                '<tr class="table-secondary"><th colspan="4">{}</th></tr>',
+                current_date.strftime('%d.%m.%Y'),
+            ))
+        value, details = describe_entry(entry)
+        buffer.append(format_html(
+            '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            entry['time'].strftime('%H:%M'),
+            entry['label'],
+            value,
+            details,
+        ))
+        if len(buffer) >= flush_every:
+            yield ''.join(buffer)
+            buffer = []
+    if current_date is None:
+        buffer.append('<tr><td colspan="4" class="text-center text-muted">Записів немає</td></tr>')
+    if buffer:
+        yield ''.join(buffer)
+
+
+@login_required
+@require_http_methods(["GET"])
+def logbook_view(request):
+    """
+    Day-by-day logbook page; rows are streamed between the rendered page head and tail.
+    """
+    try:
+        start, end = _logbook_range(request, default_days=30)
+    except ValueError:
+        return redirect('card:logbook')
+
+    shell = render_to_string('card/logbook.html', {'start': start, 'end': end}, request=request)
+    head, tail = shell.split(LOGBOOK_ROWS_SENTINEL, 1)
+    entries = iter_logbook(request.user.profile, start=start, end=end)
+
+    def stream():
+        yield head
+        yield from _logbook_rows(entries)
+        yield tail
+
+    return StreamingHttpResponse(stream(), content_type='text/html; charset=utf-8')
+
+
+@login_required
+@require_http_methods(["GET"])
+def food_autocomplete(request):
+    """Food catalog suggestions for ``?q=`` with carbohydrates per 100 g."""
+    query = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit') or 0) or None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Некоректні параметри запиту'}, status=400)
+    if limit:
+        limit = min(max(limit, 1), getattr(settings, 'FOOD_AUTOCOMPLETE_MAX_LIMIT', 50))
+    return JsonResponse({'success': True, 'results': search_food_items(query, limit=limit)})
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_measurements(request):
+    """
+    Full measurement history as a CSV or NDJSON download, streamed and optionally gzip-compressed.
+    """
+    file_format = request.GET.get('format', 'csv')
+    kinds = [kind for kind in request.GET.get('kinds', '').split(',') if kind] or list(HISTORY_SOURCES)
+    if file_format not in EXPORT_FORMATS or any(kind not in HISTORY_SOURCES for kind in kinds):
+        return JsonResponse({'success': False, 'error': 'Некоректні параметри запиту'}, status=400)
+    try:
+        start, end = _logbook_range(request)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Некоректні параметри запиту'}, status=400)
+
+    compress = request.GET.get('compress') == 'gzip'
+    content_type, extension = EXPORT_FORMATS[file_format]
+    filename = f"DiaScreen_Export_{request.user.username}_{timezone.localdate().strftime('%Y%m%d')}.{extension}"
+    if compress:
+        content_type, filename = 'application/gzip', f'{filename}.gz'
+
+    response = StreamingHttpResponse(
+        stream_export(request.user.profile, kinds, file_format=file_format, compress=compress, start=start, end=end),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class GlucoseUpdateView(UpdateView):
     model = GlucoseMeasurement
     form_class = GlucoseMeasurementForm
@@ -280,10 +450,11 @@ class FoodUpdateView(UpdateView):
         return self.form_invalid(form, formset)
 
     def form_valid(self, form, formset):
-        self.object = form.save()
+        self.object = form.save(commit=False)
+        self.object.apply_bread_unit(formset.bread_unit())
+        self.object.save()
         formset.instance = self.object
         formset.save()
-        self.object.save()
         messages.success(self.request, 'Прийом їжі оновлено')
         return redirect('card:patient_card')
 
@@ -339,26 +510,28 @@ def doctor_report(request):
     else:
         glycemic_filter = {}
 
-    glucose_qs = GlucoseMeasurement.objects.filter(patient=patient, **date_filter).order_by('-date_of_measurement', '-time_of_measurement')
-    food_qs = FoodMeasurement.objects.filter(patient=patient, **date_filter).order_by('-date_of_measurement', '-time_of_eating')
-    activity_qs = PhysicalActivityMeasurement.objects.filter(patient=patient, **date_filter).order_by('-date_of_measurement', '-time_of_activity')
-    insuline_qs = InsulineDoseMeasurement.objects.filter(patient=patient, **date_filter).order_by('-date_of_measurement', '-time')
-    glycemic_qs = GlycemicProfileMeasurement.objects.filter(patient=patient, **glycemic_filter).order_by('-measurement_date', '-measurement_time')
-    anthropometry_qs = AnthropometricMeasurement.objects.filter(patient=patient).order_by('-measurement_date', '-measurement_time')
+    glucose_qs = GlucoseMeasurement.objects.filter(patient=patient, **date_filter).order_by('-measured_at', '-id')
+    food_qs = FoodMeasurement.objects.filter(patient=patient, **date_filter).order_by('-measured_at', '-id')
+    activity_qs = PhysicalActivityMeasurement.objects.filter(patient=patient, **date_filter).order_by('-measured_at', '-id')
+    insuline_qs = InsulineDoseMeasurement.objects.filter(patient=patient, **date_filter).order_by('-measured_at', '-id')
+    glycemic_qs = GlycemicProfileMeasurement.objects.filter(patient=patient, **glycemic_filter).order_by('-measured_at', '-id')
+    anthropometry_qs = AnthropometricMeasurement.objects.filter(patient=patient).order_by('-measured_at', '-id')
+
+    glucose_stats = glucose_qs.aggregate(total=Count('id'), average=Avg('glucose'))
+    glycemic_stats = glycemic_qs.aggregate(total=Count('id'), average=Avg('hba1c'))
 
-    last_glucose = glucose_qs.first()
-    glucose_values = [float(g.glucose) for g in glucose_qs]
-    hba1c_values = [float(g.hba1c) for g in glycemic_qs]
+    glucose_records = list(glucose_qs[:15])
+    anthropometry_records = list(anthropometry_qs[:1])
     summary = {
-        'glucose_total': glucose_qs.count(),
-        'food_total': food_qs.count(),
-        'activity_total': activity_qs.count(),
-        'insuline_total': insuline_qs.count(),
-        'glycemic_total': glycemic_qs.count(),
-        'anthropometry_total': anthropometry_qs.count(),
-        'glucose_avg': round(sum(glucose_values) / len(glucose_values), 2) if glucose_values else None,
-        'hba1c_avg': round(sum(hba1c_values) / len(hba1c_values), 2) if hba1c_values else None,
-        'last_glucose': last_glucose,
+        'glucose_total': glucose_stats['total'],
+        'food_total': food_qs.aggregate(total=Count('id'))['total'],
+        'activity_total': activity_qs.aggregate(total=Count('id'))['total'],
+        'insuline_total': insuline_qs.aggregate(total=Count('id'))['total'],
+        'glycemic_total': glycemic_stats['total'],
+        'anthropometry_total': anthropometry_qs.aggregate(total=Count('id'))['total'],
+        'glucose_avg': round(float(glucose_stats['average']), 2) if glucose_stats['average'] is not None else None,
+        'hba1c_avg': round(float(glycemic_stats['average']), 2) if glycemic_stats['average'] is not None else None,
+        'last_glucose': glucose_records[0] if glucose_records else None,
     }
 
     font_ready = _ensure_pdf_fonts()
@@ -372,12 +545,12 @@ def doctor_report(request):
         start_date=start_date,
         end_date=today,
         summary=summary,
-        glucose_records=list(glucose_qs[:15]),
+        glucose_records=glucose_records,
         food_records=list(food_qs[:10]),
-        activity_records=list(activity_qs[:10]),
+        activity_records=list(activity_qs.select_related('type_of_activity')[:10]),
         insuline_records=list(insuline_qs[:10]),
         glycemic_records=list(glycemic_qs[:5]),
-        anthropometry_latest=anthropometry_qs.first(),
+        anthropometry_latest=anthropometry_records[0] if anthropometry_records else None,
         font_regular=font_regular,
         font_bold=font_bold,
     )
@@ -1,3 +1,31 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import RagLatencyAggregate
+from .telemetry import REPORT_PERCENTILES, build_latency_report
+
+
+@admin.register(RagLatencyAggregate)
+class RagLatencyAggregateAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/chatAI/raglatencyaggregate/change_list.html'
+    list_display = ('minute', 'source', 'mode', 'error_type', 'latency_bucket', 'request_count', 'total_ms')
+    list_filter = ('source', 'mode', 'error_type')
+    date_hierarchy = 'minute'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        # Report parameters are not changelist filters, so strip them before the changelist sees them.
+        params = request.GET.copy()
+        period = params.pop('report_period', ['24h'])[-1]
+        source = params.pop('report_source', [''])[-1] or None
+        request.GET = params
+        extra_context = extra_context or {}
+        extra_context['latency_report'] = build_latency_report(period=period, source=source)
+        extra_context['report_percentiles'] = REPORT_PERCENTILES
+        extra_context['report_periods'] = [('24h', '24 години'), ('7d', '7 днів'), ('30d', '30 днів')]
+        extra_context['report_sources'] = RagLatencyAggregate.SOURCE_CHOICES
+        return super().changelist_view(request, extra_context=extra_context)
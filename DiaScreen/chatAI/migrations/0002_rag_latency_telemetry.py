@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatAI', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimessage',
+            name='connect_time_ms',
+            field=models.IntegerField(blank=True, help_text='Час встановлення зʼєднання з мікросервісом в мілісекундах', null=True, verbose_name='Час зʼєднання (мс)'),
+        ),
+        migrations.AddField(
+            model_name='aimessage',
+            name='first_byte_time_ms',
+            field=models.IntegerField(blank=True, help_text='Час від надсилання запиту до отримання заголовків відповіді в мілісекундах', null=True, verbose_name='Час до першого байта (мс)'),
+        ),
+        migrations.AlterField(
+            model_name='aimessage',
+            name='response_time_ms',
+            field=models.IntegerField(blank=True, help_text='Повний час виклику мікросервісу, виміряний на боці клієнта, в мілісекундах', null=True, verbose_name='Час відповіді (мс)'),
+        ),
+        migrations.CreateModel(
+            name='RagLatencyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(verbose_name='Хвилина')),
+                ('source', models.CharField(choices=[('chat', 'Чат'), ('analytics', 'Аналітика')], max_length=20, verbose_name='Джерело')),
+                ('mode', models.CharField(choices=[('standard', 'Стандартний'), ('personalized', 'Персоналізований')], max_length=20, verbose_name='Режим')),
+                ('error_type', models.CharField(blank=True, default='', help_text='Порожньо для успішних викликів', max_length=20, verbose_name='Тип помилки')),
+                ('latency_bucket', models.PositiveSmallIntegerField(verbose_name='Кошик затримки')),
+                ('request_count', models.PositiveIntegerField(default=0, verbose_name='Кількість викликів')),
+                ('total_ms', models.BigIntegerField(default=0, verbose_name='Сумарний час (мс)')),
+            ],
+            options={
+                'verbose_name': 'Затримка RAG',
+                'verbose_name_plural': 'Затримки RAG',
+                'ordering': ['-minute'],
+                'constraints': [models.UniqueConstraint(fields=('minute', 'source', 'mode', 'error_type', 'latency_bucket'), name='unique_rag_latency_bucket')],
+            },
+        ),
+    ]
@@ -133,7 +133,19 @@ class AIMessage(models.Model):
         blank=True,
         null=True,
         verbose_name='Час відповіді (мс)',
-        help_text='Час обробки запиту мікросервісом в мілісекундах'
+        help_text='Повний час виклику мікросервісу, виміряний на боці клієнта, в мілісекундах'
+    )
+    connect_time_ms = models.IntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Час зʼєднання (мс)',
+        help_text='Час встановлення зʼєднання з мікросервісом в мілісекундах'
+    )
+    first_byte_time_ms = models.IntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Час до першого байта (мс)',
+        help_text='Час від надсилання запиту до отримання заголовків відповіді в мілісекундах'
     )
     error_message = models.TextField(
         blank=True,
@@ -171,3 +183,50 @@ class AIMessage(models.Model):
         session_summary = (self.session.summary or '').strip()
         if self.sender == 'user' and (not session_summary or session_summary.lower() in default_summaries):
             self.session.update_summary_from_first_message()
+
+
+class RagLatencyAggregate(models.Model):
+    """
+    Per-minute histogram of client-side RAG call latency.
+
+    One row holds the number of calls of a given source/mode/outcome whose
+    total time fell into one latency bucket (see ``chatAI.telemetry``).
+    """
+
+    SOURCE_CHOICES = [
+        ('chat', 'Чат'),
+        ('analytics', 'Аналітика'),
+    ]
+
+    MODE_CHOICES = [
+        ('standard', 'Стандартний'),
+        ('personalized', 'Персоналізований'),
+    ]
+
+    minute = models.DateTimeField(verbose_name='Хвилина')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name='Джерело')
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, verbose_name='Режим')
+    error_type = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        verbose_name='Тип помилки',
+        help_text='Порожньо для успішних викликів'
+    )
+    latency_bucket = models.PositiveSmallIntegerField(verbose_name='Кошик затримки')
+    request_count = models.PositiveIntegerField(default=0, verbose_name='Кількість викликів')
+    total_ms = models.BigIntegerField(default=0, verbose_name='Сумарний час (мс)')
+
+    class Meta:
+        verbose_name = 'Затримка RAG'
+        verbose_name_plural = 'Затримки RAG'
+        ordering = ['-minute']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['minute', 'source', 'mode', 'error_type', 'latency_bucket'],
+                name='unique_rag_latency_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.minute:%d.%m.%Y %H:%M} {self.source}/{self.mode}: {self.request_count}"
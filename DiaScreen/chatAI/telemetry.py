@@ -0,0 +1,193 @@
+"""
+Client-side latency telemetry for RAG API calls
+"""
+import bisect
+import logging
+from datetime import timedelta
+
+import requests
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import RagLatencyAggregate
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKET_BOUNDS_MS = [
+    100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500,
+    10000, 15000, 20000, 30000, 45000, 60000, 120000, 300000,
+]
+
+REPORT_PERCENTILES = (50, 95, 99)
+
+
+def latency_bucket(total_ms):
+    """Return the histogram bucket index for a call duration in milliseconds."""
+    return bisect.bisect_left(LATENCY_BUCKET_BOUNDS_MS, max(int(total_ms or 0), 0))
+
+
+def classify_rag_error(exc):
+    """Map an exception raised around a RAG call to an ``error_type`` label."""
+    if isinstance(exc, requests.Timeout):
+        return 'timeout'
+    if isinstance(exc, requests.ConnectionError):
+        return 'connection'
+    if isinstance(exc, requests.HTTPError):
+        return 'http'
+    return 'unknown'
+
+
+def record_rag_call(*, source, mode, timings, error_type=''):
+    """
+    Add one RAG call to the per-minute latency aggregate.
+
+    Telemetry must never break the request that produced it, so failures are logged and swallowed.
+    """
+    total_ms = (timings or {}).get('total_ms')
+    if total_ms is None:
+        return
+
+    key = {
+        'minute': timezone.now().replace(second=0, microsecond=0),
+        'source': source,
+        'mode': mode,
+        'error_type': error_type or '',
+        'latency_bucket': latency_bucket(total_ms),
+    }
+    try:
+        updated = RagLatencyAggregate.objects.filter(**key).update(
+            request_count=F('request_count') + 1,
+            total_ms=F('total_ms') + total_ms,
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                RagLatencyAggregate.objects.create(request_count=1, total_ms=total_ms, **key)
+        except IntegrityError:
+            RagLatencyAggregate.objects.filter(**key).update(
+                request_count=F('request_count') + 1,
+                total_ms=F('total_ms') + total_ms,
+            )
+    except Exception as exc:
+        logger.error(f"Failed to record RAG latency telemetry: {exc}")
+
+
+def histogram_percentile(histogram, percentile):
+    """
+    Estimate a percentile from ``{bucket_index: count}`` by linear interpolation inside the bucket.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    rank = total * percentile / 100
+    cumulative = 0
+    for index in sorted(histogram):
+        count = histogram[index]
+        if cumulative + count >= rank:
+            lower = LATENCY_BUCKET_BOUNDS_MS[index - 1] if index > 0 else 0
+            if index >= len(LATENCY_BUCKET_BOUNDS_MS):
+                return lower
+            upper = LATENCY_BUCKET_BOUNDS_MS[index]
+            fraction = (rank - cumulative) / count if count else 0
+            return int(round(lower + (upper - lower) * fraction))
+        cumulative += count
+    return LATENCY_BUCKET_BOUNDS_MS[-1]
+
+
+def _summarize(histogram, errors_by_type):
+    total = sum(histogram.values())
+    error_total = sum(errors_by_type.values())
+    summary = {
+        'count': total,
+        'error_count': error_total,
+        'error_rate': round(error_total / total * 100, 1) if total else 0,
+    }
+    for percentile in REPORT_PERCENTILES:
+        summary[f'p{percentile}'] = histogram_percentile(histogram, percentile)
+    return summary
+
+
+def build_latency_report(*, period='24h', source=None):
+    """
+    Build the admin latency report: overall and per-mode percentiles,
+    error rate by ``error_type`` and a time series of volume per mode.
+    """
+    if period == '7d':
+        since, trunc, label_format = timedelta(days=7), TruncDay, '%d.%m'
+    elif period == '30d':
+        since, trunc, label_format = timedelta(days=30), TruncDay, '%d.%m'
+    else:
+        period = '24h'
+        since, trunc, label_format = timedelta(hours=24), TruncHour, '%d.%m %H:00'
+
+    qs = RagLatencyAggregate.objects.filter(minute__gte=timezone.now() - since)
+    if source:
+        qs = qs.filter(source=source)
+
+    rows = (
+        qs.annotate(step=trunc('minute'))
+        .values('step', 'mode', 'error_type', 'latency_bucket')
+        .annotate(calls=Sum('request_count'))
+        .order_by('step')
+    )
+
+    overall_histogram = {}
+    overall_errors = {}
+    by_mode = {}
+    steps = {}
+    for row in rows:
+        calls = row['calls'] or 0
+        bucket = row['latency_bucket']
+        mode = row['mode']
+        error_type = row['error_type']
+
+        overall_histogram[bucket] = overall_histogram.get(bucket, 0) + calls
+        mode_entry = by_mode.setdefault(mode, ({}, {}))
+        mode_entry[0][bucket] = mode_entry[0].get(bucket, 0) + calls
+
+        step_entry = steps.setdefault(row['step'], {'histogram': {}, 'errors': {}, 'modes': {}})
+        step_entry['histogram'][bucket] = step_entry['histogram'].get(bucket, 0) + calls
+        step_entry['modes'][mode] = step_entry['modes'].get(mode, 0) + calls
+
+        if error_type:
+            overall_errors[error_type] = overall_errors.get(error_type, 0) + calls
+            mode_entry[1][error_type] = mode_entry[1].get(error_type, 0) + calls
+            step_entry['errors'][error_type] = step_entry['errors'].get(error_type, 0) + calls
+
+    overall = _summarize(overall_histogram, overall_errors)
+    total_calls = overall['count']
+    errors = [
+        {
+            'error_type': error_type,
+            'count': count,
+            'rate': round(count / total_calls * 100, 1) if total_calls else 0,
+        }
+        for error_type, count in sorted(overall_errors.items(), key=lambda item: -item[1])
+    ]
+    modes = [
+        {'mode': mode, **_summarize(histogram, mode_errors)}
+        for mode, (histogram, mode_errors) in sorted(by_mode.items())
+    ]
+    timeline = []
+    for step, entry in steps.items():
+        summary = _summarize(entry['histogram'], entry['errors'])
+        timeline.append({
+            'label': timezone.localtime(step).strftime(label_format),
+            'standard': entry['modes'].get('standard', 0),
+            'personalized': entry['modes'].get('personalized', 0),
+            **summary,
+        })
+
+    return {
+        'period': period,
+        'source': source or '',
+        'overall': overall,
+        'modes': modes,
+        'errors': errors,
+        'timeline': timeline,
+    }
@@ -1,3 +1,68 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .models import AIMessage, RagLatencyAggregate
+from .telemetry import build_latency_report, histogram_percentile, latency_bucket, record_rag_call
+
+
+User = get_user_model()
+
+
+class RagTelemetryTests(TestCase):
+    def test_histogram_percentile_interpolates_inside_bucket(self):
+        histogram = {latency_bucket(50): 50, latency_bucket(400): 50}
+        self.assertEqual(histogram_percentile(histogram, 50), 100)
+        self.assertEqual(histogram_percentile(histogram, 99), 495)
+        self.assertIsNone(histogram_percentile({}, 50))
+
+    def test_record_rag_call_accumulates_same_minute_bucket(self):
+        record_rag_call(source='chat', mode='standard', timings={'total_ms': 120})
+        record_rag_call(source='chat', mode='standard', timings={'total_ms': 180})
+        record_rag_call(source='chat', mode='personalized', timings={'total_ms': 900}, error_type='timeout')
+
+        row = RagLatencyAggregate.objects.get(mode='standard')
+        self.assertEqual(row.request_count, 2)
+        self.assertEqual(row.total_ms, 300)
+
+        report = build_latency_report(period='24h')
+        self.assertEqual(report['overall']['count'], 3)
+        self.assertEqual(report['overall']['error_count'], 1)
+        self.assertEqual(report['errors'][0]['error_type'], 'timeout')
+        self.assertEqual(sum(row['standard'] for row in report['timeline']), 2)
+
+
+class SendMessageTelemetryTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="chatter",
+            email="chatter@example.com",
+            password="StrongPass123",
+        )
+        self.client.force_login(self.user)
+
+    def test_send_message_stores_client_side_timings(self):
+        response_mock = mock.Mock(status_code=200)
+        response_mock.json.return_value = {'answer': 'Відповідь', 'sources': [], 'metadata': {}}
+
+        def fake_call(url, timings=None, **kwargs):
+            timings.update({'connect_ms': 5, 'first_byte_ms': 40, 'total_ms': 55, 'attempts': 1})
+            return response_mock, None
+
+        with mock.patch('chatAI.views.call_rag_api_with_retry', side_effect=fake_call):
+            response = self.client.post(
+                reverse('send_message'),
+                data=json.dumps({'message': 'Привіт'}),
+                content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        assistant = AIMessage.objects.get(sender='assistant')
+        self.assertEqual(assistant.response_time_ms, 55)
+        self.assertEqual(assistant.connect_time_ms, 5)
+        self.assertEqual(assistant.first_byte_time_ms, 40)
+        self.assertEqual(RagLatencyAggregate.objects.get().request_count, 1)
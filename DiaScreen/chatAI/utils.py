@@ -3,13 +3,61 @@ Utilities for RAG API communication with retry logic
 """
 import time
 import logging
+import threading
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.util.retry import Retry
 from typing import Optional, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
+_connect_timings = threading.local()
+
+
+class _TimedConnectionMixin:
+    """
+    Record how long TCP (and TLS) connection setup took for the current thread.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _connect_timings.connect_ms = getattr(_connect_timings, 'connect_ms', 0.0) + elapsed_ms
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools measure connection setup time.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
 
 def create_retry_session(
     max_retries: int = 0,
@@ -40,7 +88,7 @@ def create_retry_session(
         raise_on_status=False
     )
     
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = TimedHTTPAdapter(max_retries=retry_strategy)
     session = requests.Session()
     session.mount("http://", adapter)
     session.mount("https://", adapter)
@@ -54,6 +102,7 @@ def call_rag_api_with_retry(
     max_retries: int = 0,
     backoff_factor: float = 0.5,
     timeout: int = 60,
+    timings: Optional[Dict[str, Any]] = None,
     **kwargs
 ) -> Tuple[Optional[requests.Response], Optional[Exception]]:
     """
@@ -65,11 +114,27 @@ def call_rag_api_with_retry(
         max_retries: Maximum number of retry attempts
         backoff_factor: Multiplier for exponential backoff delay
         timeout: Request timeout in seconds
+        timings: Optional dict filled with client-side timings of the call:
+            connect_ms, first_byte_ms and total_ms (all attempts included),
+            plus the number of attempts made
         **kwargs: Additional arguments to pass to requests (params, json, etc.)
     
     Returns:
         Tuple of (Response object or None, Exception or None)
     """
+    if timings is None:
+        timings = {}
+    timings.update({'connect_ms': None, 'first_byte_ms': None, 'total_ms': None, 'attempts': 0})
+    _connect_timings.connect_ms = 0.0
+    started = time.perf_counter()
+
+    def finish_timings(response=None):
+        connect_ms = getattr(_connect_timings, 'connect_ms', 0.0)
+        timings['connect_ms'] = int(round(connect_ms)) if connect_ms else None
+        if response is not None:
+            timings['first_byte_ms'] = int(round(response.elapsed.total_seconds() * 1000))
+        timings['total_ms'] = int(round((time.perf_counter() - started) * 1000))
+
     session = create_retry_session(
         max_retries=max_retries,
         backoff_factor=backoff_factor,
@@ -79,6 +144,7 @@ def call_rag_api_with_retry(
     last_exception = None
     
     for attempt in range(max_retries + 1):
+        timings['attempts'] = attempt + 1
         try:
             if method.upper() == "POST":
                 response = session.post(url, timeout=timeout, **kwargs)
@@ -86,6 +152,7 @@ def call_rag_api_with_retry(
                 response = session.get(url, timeout=timeout, **kwargs)
             
             if response.status_code < 500 or attempt == max_retries:
+                finish_timings(response)
                 return response, None
             
             logger.warning(
@@ -129,5 +196,6 @@ def call_rag_api_with_retry(
                 delay = backoff_factor * (2 ** attempt)
                 time.sleep(delay)
     
+    finish_timings()
     return None, last_exception
 
@@ -10,24 +10,26 @@ from django.views.decorators.http import require_http_methods
 import json
 import requests
 
+from .telemetry import record_rag_call
 from .utils import call_rag_api_with_retry
 
 logger = logging.getLogger(__name__)
 
 MAX_PERSONAL_CONTEXT_LENGTH = getattr(settings, 'MAX_PERSONAL_CONTEXT_LENGTH', 2000)
 
-from card.models import (
-    GlucoseMeasurement,
-    InsulineDoseMeasurement,
-    GlycemicProfileMeasurement,
-    PhysicalActivityMeasurement,
-    FoodMeasurement,
-    AnthropometricMeasurement,
-)
+from card.snapshots import get_latest_snapshot
 from support.forms import SupportTicketForm
 
 from .models import AISession, AIMessage
 
+RAG_TIMING_FIELDS = ['response_time_ms', 'connect_time_ms', 'first_byte_time_ms']
+
+
+def _apply_rag_timings(message, timings):
+    message.response_time_ms = timings.get('total_ms')
+    message.connect_time_ms = timings.get('connect_ms')
+    message.first_byte_time_ms = timings.get('first_byte_ms')
+
 
 def build_personal_context(user):
     patient = getattr(user, 'profile', None)
@@ -55,67 +57,34 @@ def build_personal_context(user):
     if patient.bmi:
         parts.append(f"ІМТ: {patient.bmi:.1f}")
 
-    latest_glucose = (
-        GlucoseMeasurement.objects.filter(patient=patient)
-        .order_by('-date_of_measurement', '-time_of_measurement')
-        .first()
-    )
-    latest_insuline = (
-        InsulineDoseMeasurement.objects.filter(patient=patient)
-        .order_by('-date_of_measurement', '-time')
-        .first()
-    )
-    latest_glycemic = (
-        GlycemicProfileMeasurement.objects.filter(patient=patient)
-        .order_by('-measurement_date', '-measurement_time')
-        .first()
-    )
-    latest_activity = (
-        PhysicalActivityMeasurement.objects.filter(patient=patient)
-        .order_by('-date_of_measurement', '-time_of_activity')
-        .first()
-    )
-    latest_food = (
-        FoodMeasurement.objects.filter(patient=patient)
-        .order_by('-date_of_measurement', '-time_of_eating')
-        .first()
-    )
-    latest_anthropometry = (
-        AnthropometricMeasurement.objects.filter(patient=patient)
-        .order_by('-measurement_date', '-measurement_time')
-        .first()
-    )
-
-    def format_datetime(date_obj, time_obj):
-        if date_obj and time_obj:
-            return f"{date_obj.strftime('%d.%m.%Y')} {time_obj.strftime('%H:%M')}"
-        if date_obj:
-            return date_obj.strftime('%d.%m.%Y')
-        return ''
-
-    if latest_glucose:
+    snapshot = get_latest_snapshot(patient)
+
+    def format_moment(moment):
+        return timezone.localtime(moment).strftime('%d.%m.%Y %H:%M')
+
+    if snapshot.glucose_at:
         parts.append(
-            f"Останній замір глюкози: {latest_glucose.glucose} ммоль/л ({format_datetime(latest_glucose.date_of_measurement, latest_glucose.time_of_measurement)})"
+            f"Останній замір глюкози: {snapshot.glucose_value} ммоль/л ({format_moment(snapshot.glucose_at)})"
         )
-    if latest_insuline:
+    if snapshot.insuline_at:
         parts.append(
-            f"Остання інʼєкція інсуліну: {latest_insuline.insuline_dose} ОД, категорія {latest_insuline.category} ({format_datetime(latest_insuline.date_of_measurement, latest_insuline.time)})"
+            f"Остання інʼєкція інсуліну: {snapshot.insuline_dose} ОД, категорія {snapshot.insuline_category} ({format_moment(snapshot.insuline_at)})"
         )
-    if latest_glycemic:
+    if snapshot.glycemic_at:
         parts.append(
-            f"Останній глікемічний профіль: середня глюкоза {latest_glycemic.average_glucose} ммоль/л, HbA1c {latest_glycemic.hba1c}% ({format_datetime(latest_glycemic.measurement_date, latest_glycemic.measurement_time)})"
+            f"Останній глікемічний профіль: середня глюкоза {snapshot.glycemic_average_glucose} ммоль/л, HbA1c {snapshot.glycemic_hba1c}% ({format_moment(snapshot.glycemic_at)})"
         )
-    if latest_activity:
+    if snapshot.activity_at:
         parts.append(
-            f"Остання активність: {latest_activity.type_of_activity.name} ({format_datetime(latest_activity.date_of_measurement, latest_activity.time_of_activity)})"
+            f"Остання активність: {snapshot.activity_name} ({format_moment(snapshot.activity_at)})"
         )
-    if latest_food:
+    if snapshot.food_at:
         parts.append(
-            f"Останній прийом їжі: {latest_food.category} ({format_datetime(latest_food.date_of_measurement, latest_food.time_of_eating)})"
+            f"Останній прийом їжі: {snapshot.food_category} ({format_moment(snapshot.food_at)})"
         )
-    if latest_anthropometry:
+    if snapshot.anthropometry_at:
         parts.append(
-            f"Остання антропометрія: вага {latest_anthropometry.weight} кг, ІМТ {latest_anthropometry.bmi} ({format_datetime(latest_anthropometry.measurement_date, latest_anthropometry.measurement_time)})"
+            f"Остання антропометрія: вага {snapshot.anthropometry_weight} кг, ІМТ {snapshot.anthropometry_bmi} ({format_moment(snapshot.anthropometry_at)})"
         )
 
     if not parts:
@@ -257,6 +226,7 @@ def send_message(request):
         max_retries = getattr(settings, 'RAG_API_RETRY_MAX_ATTEMPTS', 3)
         backoff_factor = getattr(settings, 'RAG_API_RETRY_BACKOFF_FACTOR', 0.5)
         timeout = getattr(settings, 'RAG_API_TIMEOUT', 60)
+        timings = {}
 
         try:
             if personal_context:
@@ -266,6 +236,7 @@ def send_message(request):
                     max_retries=max_retries,
                     backoff_factor=backoff_factor,
                     timeout=timeout,
+                    timings=timings,
                     json={
                         'question': message_text,
                         'context': personal_context,
@@ -279,11 +250,13 @@ def send_message(request):
                     max_retries=max_retries,
                     backoff_factor=backoff_factor,
                     timeout=timeout,
+                    timings=timings,
                     params={
                         'question': message_text,
                         'mode': mode,
                     }
                 )
+            _apply_rag_timings(ai_message, timings)
             
             if error or response is None:
                 raise error or requests.RequestException("RAG API request failed after retries")
@@ -309,8 +282,7 @@ def send_message(request):
             ai_message.status = 'completed'
             ai_message.sources = sources
             ai_message.metadata = metadata
-            ai_message.response_time_ms = metadata.get('response_time_ms')
-            ai_message.save(update_fields=['message_text', 'status', 'sources', 'metadata', 'response_time_ms'])
+            ai_message.save(update_fields=['message_text', 'status', 'sources', 'metadata', *RAG_TIMING_FIELDS])
             
         except requests.Timeout as exc:
             logger.error(f"RAG API timeout after {max_retries + 1} attempts: {exc}")
@@ -327,7 +299,7 @@ def send_message(request):
                 'session_id': session.session_id,
                 'error_type': 'timeout',
             }
-            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata'])
+            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata', *RAG_TIMING_FIELDS])
             
         except requests.ConnectionError as exc:
             logger.error(f"RAG API connection error after {max_retries + 1} attempts: {exc}")
@@ -344,7 +316,7 @@ def send_message(request):
                 'session_id': session.session_id,
                 'error_type': 'connection',
             }
-            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata'])
+            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata', *RAG_TIMING_FIELDS])
             
         except requests.HTTPError as exc:
             status_code = exc.response.status_code if exc.response else None
@@ -367,7 +339,7 @@ def send_message(request):
                 'error_type': 'http',
                 'http_status': status_code,
             }
-            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata'])
+            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata', *RAG_TIMING_FIELDS])
             
         except (requests.RequestException, ValueError) as exc:
             logger.error(f"RAG API request error: {exc}")
@@ -381,7 +353,14 @@ def send_message(request):
                 'session_id': session.session_id,
                 'error_type': 'unknown',
             }
-            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata'])
+            ai_message.save(update_fields=['message_text', 'status', 'error_message', 'metadata', *RAG_TIMING_FIELDS])
+
+        record_rag_call(
+            source='chat',
+            mode=mode,
+            timings=timings,
+            error_type=(ai_message.metadata or {}).get('error_type', '') if ai_message.status == 'error' else '',
+        )
 
         ai_message.refresh_from_db()
         
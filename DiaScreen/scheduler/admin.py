@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import ScheduledJobState
+
+
+@admin.register(ScheduledJobState)
+class ScheduledJobStateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'next_run_at', 'last_success_at', 'last_duration_ms', 'run_count', 'failure_count', 'locked_by')
+    search_fields = ('name',)
+    readonly_fields = (
+        'name',
+        'last_started_at',
+        'last_finished_at',
+        'last_success_at',
+        'last_duration_ms',
+        'total_duration_ms',
+        'run_count',
+        'failure_count',
+        'last_error',
+        'locked_until',
+        'locked_by',
+    )
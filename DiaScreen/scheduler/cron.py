@@ -0,0 +1,88 @@
+"""
+Minimal five-field cron expressions: ``minute hour day-of-month month day-of-week``.
+
+Each field accepts ``*``, numbers, ranges ``a-b``, steps ``*/n`` or ``a-b/n`` and
+comma-separated lists. Day of week runs 0-6 from Sunday (7 is also Sunday). As
+in cron, when both day fields are restricted a day matching either one fires.
+"""
+from datetime import datetime, timedelta
+
+FIELD_RANGES = [
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+]
+
+# Upper bound of the search: a schedule pinned to 29 February on a given weekday can wait years.
+MAX_SEARCH_DAYS = 366 * 8
+
+
+class InvalidCronExpression(ValueError):
+    pass
+
+
+def _parse_field(spec, name, low, high):
+    values = set()
+    for part in spec.split(','):
+        base, _, step = part.partition('/')
+        try:
+            step = int(step) if step else 1
+            if base == '*':
+                start, end = low, high
+            elif '-' in base:
+                start, end = (int(value) for value in base.split('-', 1))
+            else:
+                start = end = int(base)
+        except ValueError as exc:
+            raise InvalidCronExpression(f'Invalid {name} field: {spec!r}') from exc
+        if step < 1 or start < low or end > high or start > end:
+            raise InvalidCronExpression(f'Invalid {name} field: {spec!r}')
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise InvalidCronExpression(f'Expected 5 fields, got {expression!r}')
+        self.expression = expression
+        parsed = [_parse_field(spec, *field) for spec, field in zip(fields, FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def __repr__(self):
+        return f'CronSchedule({self.expression!r})'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        # datetime.weekday() is Monday=0; cron counts from Sunday.
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """First matching minute strictly after ``moment`` (a naive or aware datetime in the schedule's zone)."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_SEARCH_DAYS)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = datetime.combine(candidate.date() + timedelta(days=1), datetime.min.time(), candidate.tzinfo)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise InvalidCronExpression(f'{self.expression!r} never fires')
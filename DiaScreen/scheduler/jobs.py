@@ -0,0 +1,74 @@
+"""
+Registry of periodic jobs declared by the installed apps.
+
+An app lists its jobs in a ``scheduled_jobs`` attribute of its ``AppConfig``::
+
+    scheduled_jobs = [
+        {'name': 'analytic.risk_scores', 'func': 'analytic.risk.run_risk_scoring', 'cron': '30 2 * * *'},
+        {'name': 'user_auth.glucose_alerts', 'func': 'user_auth.alerts.process_glucose_alerts', 'every': 60},
+    ]
+
+``cron`` is a five-field expression in ``TIME_ZONE``; ``every`` is an interval
+in seconds counted from the previous start. ``timeout`` (seconds) bounds the
+lock lease on databases without advisory locks.
+"""
+from datetime import timedelta
+from functools import cache
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cron import CronSchedule, InvalidCronExpression
+
+DEFAULT_JOB_TIMEOUT = 3600
+
+
+class ScheduledJob:
+    def __init__(self, name, func, cron=None, every=None, timeout=None, app_label=None):
+        if (cron is None) == (every is None):
+            raise ImproperlyConfigured(f'Scheduled job {name!r} needs exactly one of "cron" or "every"')
+        self.name = name
+        self.func = func
+        self.app_label = app_label
+        self.every = timedelta(seconds=every) if every is not None else None
+        self.timeout = timedelta(seconds=timeout or DEFAULT_JOB_TIMEOUT)
+        try:
+            self.cron = CronSchedule(cron) if cron is not None else None
+        except InvalidCronExpression as exc:
+            raise ImproperlyConfigured(f'Scheduled job {name!r}: {exc}') from exc
+
+    def __repr__(self):
+        return f'ScheduledJob({self.name!r})'
+
+    @property
+    def schedule_display(self):
+        return self.cron.expression if self.cron else f'кожні {int(self.every.total_seconds())} с'
+
+    def resolve(self):
+        return import_string(self.func)
+
+    def first_run(self, now):
+        """Interval jobs start right away; cron jobs wait for their next slot."""
+        return now if self.every else self.next_run(now, now)
+
+    def next_run(self, started_at, now):
+        if self.every:
+            # Skip missed intervals instead of firing them back to back after a pause.
+            return max(started_at + self.every, now)
+        local_now = timezone.localtime(now).replace(tzinfo=None)
+        return timezone.make_aware(self.cron.next_after(local_now))
+
+
+@cache
+def get_jobs():
+    """All jobs of the installed apps, keyed by name."""
+    jobs = {}
+    for config in apps.get_app_configs():
+        for spec in getattr(config, 'scheduled_jobs', ()):
+            job = ScheduledJob(app_label=config.label, **spec)
+            if job.name in jobs:
+                raise ImproperlyConfigured(f'Scheduled job {job.name!r} is registered twice')
+            jobs[job.name] = job
+    return jobs
@@ -0,0 +1,73 @@
+"""
+Django management command для запуску періодичних задач, оголошених у AppConfig.scheduled_jobs.
+
+Використання:
+    python manage.py run_scheduler
+    python manage.py run_scheduler --once
+    python manage.py run_scheduler --job analytic.risk_scores
+    python manage.py run_scheduler --list
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.runner import Scheduler
+
+
+class Command(BaseCommand):
+    help = 'Запускає цикл планувальника періодичних задач (перерахунки, очищення, дайджести)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Виконати задачі, час яких настав, і завершити роботу')
+        parser.add_argument('--job', default=None, help='Негайно виконати одну задачу за назвою')
+        parser.add_argument('--list', action='store_true', help='Показати зареєстровані задачі та їх стан')
+        parser.add_argument('--tick', type=int, default=None, help='Максимальна пауза між перевірками, с')
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler(tick=options['tick'])
+        if not scheduler.jobs:
+            raise CommandError('Жодної періодичної задачі не зареєстровано')
+
+        states = scheduler.ensure_states()
+
+        if options['list']:
+            for name, job in sorted(scheduler.jobs.items()):
+                state = states[name]
+                self.stdout.write(
+                    f'{name} [{job.schedule_display}] наступний запуск: {state.next_run_at or "—"}, '
+                    f'останній успіх: {state.last_success_at or "—"}, '
+                    f'запусків: {state.run_count}, збоїв: {state.failure_count}, '
+                    f'середня тривалість: {state.average_duration_ms if state.average_duration_ms is not None else "—"} мс'
+                )
+            return
+
+        if options['job']:
+            job = scheduler.jobs.get(options['job'])
+            if job is None:
+                raise CommandError(f"Невідома задача: {options['job']}")
+            try:
+                ran = scheduler.run_job(job, force=True)
+            finally:
+                scheduler.close()
+            if not ran:
+                raise CommandError(f'Задача {job.name} вже виконується іншим процесом')
+            self.stdout.write(self.style.SUCCESS(f'Задачу {job.name} виконано'))
+            return
+
+        if options['once']:
+            try:
+                ran = scheduler.run_pending()
+            finally:
+                scheduler.close()
+            self.stdout.write(self.style.SUCCESS(f"Виконано задач: {len(ran)}{': ' + ', '.join(ran) if ran else ''}"))
+            return
+
+        def stop(signum, frame):
+            self.stdout.write('Зупинка планувальника після поточної задачі...')
+            scheduler.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(self.style.SUCCESS(f'Планувальник запущено, задач: {len(scheduler.jobs)}'))
+        scheduler.run_forever()
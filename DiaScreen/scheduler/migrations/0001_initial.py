@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Назва')),
+                ('next_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Наступний запуск')),
+                ('last_started_at', models.DateTimeField(blank=True, null=True, verbose_name='Останній старт')),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Останнє завершення')),
+                ('last_success_at', models.DateTimeField(blank=True, null=True, verbose_name='Останній успішний запуск')),
+                ('last_duration_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Тривалість останнього запуску (мс)')),
+                ('total_duration_ms', models.BigIntegerField(default=0, verbose_name='Сумарна тривалість (мс)')),
+                ('run_count', models.PositiveIntegerField(default=0, verbose_name='Кількість запусків')),
+                ('failure_count', models.PositiveIntegerField(default=0, verbose_name='Кількість збоїв')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Остання помилка')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Оренда блокування на базах без advisory locks', null=True, verbose_name='Заблоковано до')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=200, verbose_name='Власник блокування')),
+            ],
+            options={
+                'verbose_name': 'Стан періодичної задачі',
+                'verbose_name_plural': 'Стани періодичних задач',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class ScheduledJobState(models.Model):
+    """
+    Run history and lock of one periodic job registered in an app's ``scheduled_jobs``
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name='Назва')
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name='Наступний запуск')
+    last_started_at = models.DateTimeField(null=True, blank=True, verbose_name='Останній старт')
+    last_finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Останнє завершення')
+    last_success_at = models.DateTimeField(null=True, blank=True, verbose_name='Останній успішний запуск')
+    last_duration_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='Тривалість останнього запуску (мс)')
+    total_duration_ms = models.BigIntegerField(default=0, verbose_name='Сумарна тривалість (мс)')
+    run_count = models.PositiveIntegerField(default=0, verbose_name='Кількість запусків')
+    failure_count = models.PositiveIntegerField(default=0, verbose_name='Кількість збоїв')
+    last_error = models.TextField(blank=True, default='', verbose_name='Остання помилка')
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Заблоковано до',
+        help_text='Оренда блокування на базах без advisory locks',
+    )
+    locked_by = models.CharField(max_length=200, blank=True, default='', verbose_name='Власник блокування')
+
+    class Meta:
+        verbose_name = 'Стан періодичної задачі'
+        verbose_name_plural = 'Стани періодичних задач'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def average_duration_ms(self):
+        return self.total_duration_ms // self.run_count if self.run_count else None
@@ -0,0 +1,177 @@
+"""
+In-process periodic job runner used by the ``run_scheduler`` command.
+
+Any number of scheduler processes may run side by side: a job only runs in
+the process that takes its lock. PostgreSQL uses session-level advisory
+locks on a dedicated connection, so jobs that close or reset the default
+connection cannot drop the lock by accident. Other databases lease the
+job's ``ScheduledJobState`` row with a conditional ``UPDATE``. Each run
+records its timing, outcome and the next due time on that row.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import zlib
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .jobs import get_jobs
+from .models import ScheduledJobState
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 4000
+
+
+def advisory_lock_key(name):
+    return zlib.crc32(f'scheduler:{name}'.encode())
+
+
+class Scheduler:
+    def __init__(self, jobs=None, tick=None):
+        self.jobs = get_jobs() if jobs is None else jobs
+        self.tick = tick or getattr(settings, 'SCHEDULER_TICK_SECONDS', 30)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._lock_connection = None
+
+    # Locking
+
+    def _advisory(self, function, job):
+        if self._lock_connection is None:
+            self._lock_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        with self._lock_connection.cursor() as cursor:
+            cursor.execute(f'SELECT {function}(%s)', [advisory_lock_key(job.name)])
+            return cursor.fetchone()[0]
+
+    def acquire(self, job):
+        if connection.vendor == 'postgresql':
+            return self._advisory('pg_try_advisory_lock', job)
+        now = timezone.now()
+        return bool(
+            ScheduledJobState.objects.filter(name=job.name)
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .update(locked_until=now + job.timeout, locked_by=self.owner)
+        )
+
+    def release(self, job):
+        if connection.vendor == 'postgresql':
+            self._advisory('pg_advisory_unlock', job)
+            return
+        ScheduledJobState.objects.filter(name=job.name, locked_by=self.owner).update(locked_until=None, locked_by='')
+
+    # Running
+
+    def ensure_states(self, now=None):
+        """Job states keyed by name, creating rows for newly registered jobs."""
+        now = now or timezone.now()
+        states = ScheduledJobState.objects.in_bulk(list(self.jobs), field_name='name')
+        missing = [
+            ScheduledJobState(name=name, next_run_at=job.first_run(now))
+            for name, job in self.jobs.items()
+            if name not in states
+        ]
+        if missing:
+            ScheduledJobState.objects.bulk_create(missing, ignore_conflicts=True)
+            states = ScheduledJobState.objects.in_bulk(list(self.jobs), field_name='name')
+        return states
+
+    def run_job(self, job, force=False):
+        """
+        Run ``job`` if its lock is free and it is still due (or ``force``).
+
+        The job's state row must exist (see ``ensure_states``). Returns True
+        when the job ran, whether it succeeded or not.
+        """
+        if not self.acquire(job):
+            logger.info('Scheduled job %s is running elsewhere', job.name)
+            return False
+        try:
+            state = ScheduledJobState.objects.get(name=job.name)
+            started_at = timezone.now()
+            if not force and state.next_run_at and state.next_run_at > started_at:
+                # Another instance finished it between our check and the lock.
+                return False
+
+            started = time.monotonic()
+            error = ''
+            try:
+                job.resolve()()
+            except Exception:
+                logger.exception('Scheduled job %s failed', job.name)
+                error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+            duration_ms = int((time.monotonic() - started) * 1000)
+            finished_at = timezone.now()
+
+            updates = {
+                'last_started_at': started_at,
+                'last_finished_at': finished_at,
+                'last_duration_ms': duration_ms,
+                'total_duration_ms': F('total_duration_ms') + duration_ms,
+                'run_count': F('run_count') + 1,
+                'last_error': error,
+                'next_run_at': job.next_run(started_at, finished_at),
+            }
+            if error:
+                updates['failure_count'] = F('failure_count') + 1
+            else:
+                updates['last_success_at'] = finished_at
+            ScheduledJobState.objects.filter(pk=state.pk).update(**updates)
+            logger.info('Scheduled job %s finished in %d ms%s', job.name, duration_ms, ' with an error' if error else '')
+            return True
+        finally:
+            self.release(job)
+
+    def run_pending(self):
+        """Run every due job once; returns the names of the jobs that ran."""
+        now = timezone.now()
+        states = self.ensure_states(now)
+        ran = []
+        for name, job in sorted(self.jobs.items()):
+            if self._stop.is_set():
+                break
+            next_run_at = states[name].next_run_at
+            if next_run_at is None or next_run_at <= now:
+                if self.run_job(job):
+                    ran.append(name)
+        return ran
+
+    def seconds_until_next(self):
+        upcoming = (
+            ScheduledJobState.objects.filter(name__in=list(self.jobs), next_run_at__isnull=False)
+            .order_by('next_run_at')
+            .values_list('next_run_at', flat=True)
+            .first()
+        )
+        if upcoming is None:
+            return self.tick
+        return min(max((upcoming - timezone.now()).total_seconds(), 1), self.tick)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            # Same connection hygiene as a request: drop broken or expired connections.
+            close_old_connections()
+            try:
+                self.run_pending()
+                wait = self.seconds_until_next()
+            except Exception:
+                # A database outage must not kill the loop; try again on the next tick.
+                logger.exception('Scheduler iteration failed')
+                self.close()
+                wait = self.tick
+            self._stop.wait(wait)
+        self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self._lock_connection is not None:
+            self._lock_connection.close()
+            self._lock_connection = None
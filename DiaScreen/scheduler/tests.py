@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .cron import CronSchedule
+from .jobs import ScheduledJob, get_jobs
+from .models import ScheduledJobState
+from .runner import Scheduler
+
+CALLS = []
+
+
+def record_call():
+    CALLS.append(timezone.now())
+
+
+def failing_job():
+    raise RuntimeError('boom')
+
+
+class CronScheduleTests(TestCase):
+    def test_next_after_handles_steps_weekdays_and_day_fields(self):
+        monday = datetime(2026, 10, 19, 5, 7)
+        self.assertEqual(CronSchedule('*/15 * * * *').next_after(monday), datetime(2026, 10, 19, 5, 15))
+        self.assertEqual(CronSchedule('30 2 * * *').next_after(monday), datetime(2026, 10, 20, 2, 30))
+        self.assertEqual(CronSchedule('0 9 * * 1-5').next_after(datetime(2026, 10, 24, 5, 7)), datetime(2026, 10, 26, 9, 0))
+        # Both day fields restricted: either one matches, as in cron.
+        self.assertEqual(CronSchedule('0 0 1 * 0').next_after(monday), datetime(2026, 10, 25, 0, 0))
+        self.assertEqual(CronSchedule('0 0 29 2 *').next_after(monday), datetime(2028, 2, 29, 0, 0))
+        with self.assertRaises(ValueError):
+            CronSchedule('61 * * * *')
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.job = ScheduledJob(name='tests.record', func='scheduler.tests.record_call', every=300)
+        self.scheduler = Scheduler(jobs={self.job.name: self.job})
+
+    def test_apps_declare_their_jobs(self):
+        jobs = get_jobs()
+        self.assertIn('analytic.risk_scores', jobs)
+        self.assertIn('user_auth.glucose_alerts', jobs)
+        self.assertEqual(jobs['card.measurement_partitions'].app_label, 'card')
+
+    def test_due_job_runs_once_and_records_timing(self):
+        self.assertEqual(self.scheduler.run_pending(), ['tests.record'])
+        self.assertEqual(self.scheduler.run_pending(), [])
+        self.assertEqual(len(CALLS), 1)
+
+        state = ScheduledJobState.objects.get(name='tests.record')
+        self.assertEqual(state.run_count, 1)
+        self.assertEqual(state.failure_count, 0)
+        self.assertIsNotNone(state.last_success_at)
+        self.assertIsNotNone(state.last_duration_ms)
+        self.assertAlmostEqual(state.next_run_at, state.last_started_at + timedelta(seconds=300), delta=timedelta(seconds=1))
+        self.assertEqual(state.locked_by, '')
+
+    def test_job_locked_by_another_instance_is_skipped(self):
+        self.scheduler.ensure_states()
+        ScheduledJobState.objects.filter(name='tests.record').update(
+            locked_until=timezone.now() + timedelta(minutes=5),
+            locked_by='other-host:1',
+        )
+        self.assertEqual(self.scheduler.run_pending(), [])
+        self.assertEqual(CALLS, [])
+
+        # An expired lease is taken over.
+        ScheduledJobState.objects.filter(name='tests.record').update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.scheduler.run_pending(), ['tests.record'])
+
+    def test_failure_is_recorded_and_rescheduled(self):
+        job = ScheduledJob(name='tests.fail', func='scheduler.tests.failing_job', cron='0 3 * * *')
+        scheduler = Scheduler(jobs={job.name: job})
+        scheduler.ensure_states()
+        self.assertTrue(scheduler.run_job(job, force=True))
+
+        state = ScheduledJobState.objects.get(name='tests.fail')
+        self.assertEqual(state.failure_count, 1)
+        self.assertIsNone(state.last_success_at)
+        self.assertIn('RuntimeError: boom', state.last_error)
+        self.assertGreater(state.next_run_at, timezone.now())
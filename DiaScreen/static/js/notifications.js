@@ -1,19 +1,19 @@
 
 class NotificationSystem {
     constructor() {
-        this.pollInterval = 30000;
-        this.lastCheckTime = null;
+        this.retryDelay = 30000;
+        this.version = null;
         this.processedNotifications = new Set();
         this.notificationContainer = null;
         this.init();
     }
 
-    init() {
+    async init() {
         this.createNotificationContainer();
         
-        this.checkNotifications();
+        await this.checkNotifications();
         
-        setInterval(() => this.checkNotifications(), this.pollInterval);
+        this.waitForNotifications();
     }
 
     createNotificationContainer() {
@@ -34,14 +34,47 @@ class NotificationSystem {
             
             const data = await response.json();
             if (data.success) {
-                this.updateNotificationBadge(data.unread_count);
-                this.showNewNotifications(data.notifications);
+                this.applyNotifications(data);
             }
         } catch (error) {
             console.error('Помилка при отриманні сповіщень:', error);
         }
     }
 
+    async waitForNotifications() {
+        // Long-poll: the server answers as soon as the notification version changes or after its timeout.
+        while (true) {
+            try {
+                const version = this.version === null ? '' : this.version;
+                const response = await fetch(`/api/notifications/wait/?version=${encodeURIComponent(version)}`);
+                if (!response.ok) {
+                    await this.sleep(this.retryDelay);
+                    continue;
+                }
+
+                const data = await response.json();
+                if (data.success && data.changed) {
+                    this.applyNotifications(data);
+                } else if (data.success) {
+                    this.version = data.version;
+                }
+            } catch (error) {
+                console.error('Помилка при очікуванні сповіщень:', error);
+                await this.sleep(this.retryDelay);
+            }
+        }
+    }
+
+    applyNotifications(data) {
+        this.version = data.version;
+        this.updateNotificationBadge(data.unread_count);
+        this.showNewNotifications(data.notifications);
+    }
+
+    sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
     updateNotificationBadge(unreadCount) {
         const badge = document.getElementById('notification-badge');
         if (badge) {
@@ -0,0 +1,208 @@
+"""
+Batched glucose threshold alerts.
+
+Glucose inserts are not evaluated inline. ``GlucoseMeasurement`` itself acts as
+the outbox: ``process_glucose_alerts`` consumes rows past a ``ProcessingCursor``
+in batches (see ``user_auth.outbox``; readings younger than
+``GLUCOSE_ALERTS_SETTLE_SECONDS`` wait for the next run), classifies them in
+SQL, drops back-dated imports and repeated alerts, and writes notifications
+with one ``bulk_create``.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, CharField, DecimalField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Notification
+from .notifications import bump_notification_version, increment_unread_count
+from .outbox import consume_new_rows, has_unconsumed_rows
+
+logger = logging.getLogger(__name__)
+
+GLUCOSE_ALERTS_CURSOR = 'glucose_alerts'
+
+CRITICAL_LOW_GLUCOSE = Decimal('3.5')
+CRITICAL_HIGH_GLUCOSE = Decimal('15.0')
+DEFAULT_TARGET_MIN = Decimal('4.0')
+DEFAULT_TARGET_MAX = Decimal('9.0')
+
+GLUCOSE_ALERTS = {
+    'critical_low': {
+        'title': '⚠️ Критична гіпоглікемія!',
+        'message': 'Рівень глюкози {value} ммоль/л є критично низьким. Негайно прийміть заходи!',
+        'notification_type': 'danger',
+    },
+    'low': {
+        'title': '⚠️ Низький рівень глюкози',
+        'message': 'Рівень глюкози {value} ммоль/л нижчий за цільовий діапазон ({target_min}-{target_max} ммоль/л).',
+        'notification_type': 'warning',
+    },
+    'critical_high': {
+        'title': '🔴 Критична гіперглікемія!',
+        'message': 'Рівень глюкози {value} ммоль/л є критично високим. Перевірте дозування інсуліну!',
+        'notification_type': 'danger',
+    },
+    'high': {
+        'title': '⚠️ Високий рівень глюкози',
+        'message': 'Рівень глюкози {value} ммоль/л вищий за цільовий діапазон ({target_min}-{target_max} ммоль/л).',
+        'notification_type': 'warning',
+    },
+}
+
+
+def _alert_level_expression():
+    target_field = DecimalField(max_digits=4, decimal_places=1)
+    target_min = Coalesce(F('patient__target_glucose_min'), Value(DEFAULT_TARGET_MIN), output_field=target_field)
+    target_max = Coalesce(F('patient__target_glucose_max'), Value(DEFAULT_TARGET_MAX), output_field=target_field)
+    return Case(
+        When(glucose__lt=CRITICAL_LOW_GLUCOSE, then=Value('critical_low')),
+        When(glucose__lt=target_min, then=Value('low')),
+        When(glucose__gt=CRITICAL_HIGH_GLUCOSE, then=Value('critical_high')),
+        When(glucose__gt=target_max, then=Value('high')),
+        default=Value(''),
+        output_field=CharField(),
+    )
+
+
+def process_glucose_alerts(batch_size=None):
+    """
+    Evaluate glucose readings inserted since the last run.
+
+    Returns the number of notifications created.
+    """
+    from card.models import GlucoseMeasurement
+
+    batch_size = batch_size or getattr(settings, 'GLUCOSE_ALERTS_BATCH_SIZE', 1000)
+    max_delay = timedelta(minutes=getattr(settings, 'GLUCOSE_ALERTS_MAX_DELAY_MINUTES', 360))
+    dedup_window = timedelta(minutes=getattr(settings, 'GLUCOSE_ALERTS_DEDUP_MINUTES', 60))
+    current_tz = timezone.get_default_timezone()
+    now = timezone.now()
+
+    def create_alerts(rows):
+        candidates = []
+        for _, user_id, glucose, measured_date, measured_time, created_at, target_min, target_max, level in rows:
+            if not level:
+                continue
+            measured_at = timezone.make_aware(datetime.combine(measured_date, measured_time), current_tz)
+            if created_at - measured_at > max_delay or now - created_at > max_delay:
+                # Back-dated entry (e.g. an imported meter history) or a stale backlog: not actionable.
+                continue
+            candidates.append((user_id, level, created_at, glucose, target_min, target_max))
+        if not candidates:
+            return []
+
+        titles = {GLUCOSE_ALERTS[level]['title']: level for level in GLUCOSE_ALERTS}
+        last_alert_at = {}
+        recent = Notification.objects.filter(
+            user_id__in={candidate[0] for candidate in candidates},
+            title__in=titles,
+            created_at__gte=min(candidate[2] for candidate in candidates) - dedup_window,
+        ).values_list('user_id', 'title', 'created_at')
+        for user_id, title, created_at in recent:
+            key = (user_id, titles[title])
+            if key not in last_alert_at or created_at > last_alert_at[key]:
+                last_alert_at[key] = created_at
+
+        notifications = []
+        for user_id, level, created_at, glucose, target_min, target_max in candidates:
+            key = (user_id, level)
+            previous = last_alert_at.get(key)
+            if previous is not None and created_at - previous < dedup_window:
+                continue
+            last_alert_at[key] = created_at
+
+            alert = GLUCOSE_ALERTS[level]
+            notifications.append(Notification(
+                user_id=user_id,
+                title=alert['title'],
+                message=alert['message'].format(
+                    value=float(glucose),
+                    target_min=float(target_min if target_min is not None else DEFAULT_TARGET_MIN),
+                    target_max=float(target_max if target_max is not None else DEFAULT_TARGET_MAX),
+                ),
+                notification_type=alert['notification_type'],
+                link='/card/',
+            ))
+        Notification.objects.bulk_create(notifications)
+        return notifications
+
+    def update_counters(notifications):
+        # bulk_create skips post_save, so update the cached counters ourselves.
+        per_user = {}
+        for notification in notifications:
+            per_user[notification.user_id] = per_user.get(notification.user_id, 0) + 1
+        for user_id, count in per_user.items():
+            increment_unread_count(user_id, count)
+            bump_notification_version(user_id)
+
+    batches = consume_new_rows(
+        GLUCOSE_ALERTS_CURSOR,
+        GlucoseMeasurement.objects.annotate(level=_alert_level_expression()),
+        [
+            'patient__user_id',
+            'glucose',
+            'date_of_measurement',
+            'time_of_measurement',
+            'created_at',
+            'patient__target_glucose_min',
+            'patient__target_glucose_max',
+            'level',
+        ],
+        create_alerts,
+        batch_size=batch_size,
+        settle_seconds=alerts_settle_seconds(),
+        after_batch=update_counters,
+    )
+    return sum(len(notifications) for notifications in batches)
+
+
+def alerts_settle_seconds():
+    return getattr(settings, 'GLUCOSE_ALERTS_SETTLE_SECONDS', 10)
+
+
+_flush_lock = threading.Lock()
+_flush_timer = None
+
+
+def _flush_glucose_alerts():
+    global _flush_timer
+    with _flush_lock:
+        _flush_timer = None
+    pending = False
+    try:
+        from card.models import GlucoseMeasurement
+
+        process_glucose_alerts()
+        pending = has_unconsumed_rows(GLUCOSE_ALERTS_CURSOR, GlucoseMeasurement.objects.all())
+    except Exception as e:
+        logger.error(f"Error processing glucose alerts: {e}")
+    finally:
+        connection.close()
+    if pending:
+        # Readings committed while this flush was waiting are still settling; come back for them.
+        schedule_glucose_alerts()
+
+
+def schedule_glucose_alerts():
+    """
+    Debounced background flush of the alert outbox.
+
+    Called after a glucose insert commits; a burst of inserts results in one batch run.
+    """
+    global _flush_timer
+    if not getattr(settings, 'GLUCOSE_ALERTS_BACKGROUND_FLUSH', True):
+        return
+    with _flush_lock:
+        if _flush_timer is not None:
+            return
+        # Readings younger than the settle window are not consumed yet; wait them out.
+        delay = max(getattr(settings, 'GLUCOSE_ALERTS_FLUSH_DELAY', 2.0), alerts_settle_seconds())
+        _flush_timer = threading.Timer(delay, _flush_glucose_alerts)
+        _flush_timer.daemon = True
+        _flush_timer.start()
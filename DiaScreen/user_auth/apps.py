@@ -4,6 +4,10 @@ from django.apps import AppConfig
 class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_auth'
-    
+    scheduled_jobs = [
+        # Safety net for the debounced flush in user_auth.alerts.
+        {'name': 'user_auth.glucose_alerts', 'func': 'user_auth.alerts.process_glucose_alerts', 'every': 60},
+    ]
+
     def ready(self):
         import user_auth.signals
\ No newline at end of file
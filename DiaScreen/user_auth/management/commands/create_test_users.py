@@ -316,7 +316,8 @@ class Command(BaseCommand):
                             measurement=food_measurement,
                             grams=Decimal(str(grams))
                         )
-                        food_measurement.save()  # Перераховує хлібні одиниці
+                        food_measurement.apply_bread_unit(food_measurement.calculate_bread_unit())
+                        food_measurement.save()
 
         # Фізична активність
         activities = [
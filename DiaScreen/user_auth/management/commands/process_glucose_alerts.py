@@ -0,0 +1,31 @@
+"""
+Django management command для пакетної обробки сповіщень про рівень глюкози.
+
+Використання:
+    python manage.py process_glucose_alerts
+    python manage.py process_glucose_alerts --loop --interval 10
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_auth.alerts import process_glucose_alerts
+
+
+class Command(BaseCommand):
+    help = 'Обробляє нові заміри глюкози та створює сповіщення про вихід за цільовий діапазон'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Кількість замірів за один прохід')
+        parser.add_argument('--loop', action='store_true', help='Працювати безперервно')
+        parser.add_argument('--interval', type=float, default=10.0, help='Пауза між проходами в секундах')
+
+    def handle(self, *args, **options):
+        while True:
+            created = process_glucose_alerts(batch_size=options['batch_size'])
+            if created or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Створено сповіщень: {created}'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
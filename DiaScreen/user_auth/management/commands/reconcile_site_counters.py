@@ -0,0 +1,30 @@
+"""
+Django management command для звірки лічильників статистики головної сторінки.
+
+Використання:
+    python manage.py reconcile_site_counters
+    python manage.py reconcile_site_counters --tolerance 0
+"""
+
+from django.core.management.base import BaseCommand
+
+from user_auth.stats import reconcile_site_counters
+
+
+class Command(BaseCommand):
+    help = 'Звіряє лічильники статистики з оцінкою кількості рядків у таблицях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=None,
+            help='Допустиме відхилення (частка), після якого лічильник перераховується',
+        )
+
+    def handle(self, *args, **options):
+        reset = reconcile_site_counters(tolerance=options['tolerance'])
+        if reset:
+            self.stdout.write(self.style.SUCCESS(f'Перераховано лічильники: {", ".join(reset)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Лічильники актуальні'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0003_notification'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='notification',
+            new_name='user_auth_n_user_id_287ef3_idx',
+            old_name='user_auth_n_user_id_created_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='notification',
+            new_name='user_auth_n_user_id_109bb2_idx',
+            old_name='user_auth_n_user_id_is_read_idx',
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('info', 'Інформаційне'), ('warning', 'Попередження'), ('danger', 'Критичне'), ('success', 'Успіх')], default='info', max_length=20, verbose_name='Тип сповіщення'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='notification_unread_idx'),
+        ),
+    ]
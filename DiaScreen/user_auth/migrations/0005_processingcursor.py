@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:06
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_glucose_alerts_cursor(apps, schema_editor):
+    # Start after existing readings so that history is not evaluated as fresh alerts.
+    GlucoseMeasurement = apps.get_model('card', 'GlucoseMeasurement')
+    ProcessingCursor = apps.get_model('user_auth', 'ProcessingCursor')
+    last_id = GlucoseMeasurement.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    ProcessingCursor.objects.update_or_create(name='glucose_alerts', defaults={'last_id': last_id})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0004_notification_unread_index'),
+        ('card', '0002_anthropometricmeasurement_glycemicprofilemeasurement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Назва')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Останній оброблений ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Курсор обробки',
+                'verbose_name_plural': 'Курсори обробки',
+            },
+        ),
+        migrations.RunPython(seed_glucose_alerts_cursor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:08
+
+from django.db import migrations, models
+
+
+SEEDED_COUNTERS = {
+    'patients': ('user_auth', 'Patient'),
+    'glucose': ('card', 'GlucoseMeasurement'),
+    'insuline': ('card', 'InsulineDoseMeasurement'),
+    'glycemic_profile': ('card', 'GlycemicProfileMeasurement'),
+}
+
+
+def seed_site_counters(apps, schema_editor):
+    # One exact count at deploy time; afterwards the counters are maintained by signals.
+    SiteCounter = apps.get_model('user_auth', 'SiteCounter')
+    for name, (app_label, model_name) in SEEDED_COUNTERS.items():
+        value = apps.get_model(app_label, model_name).objects.count()
+        SiteCounter.objects.update_or_create(name=name, shard=0, defaults={'value': value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0005_processingcursor'),
+        ('card', '0002_anthropometricmeasurement_glycemicprofilemeasurement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Лічильник')),
+                ('shard', models.PositiveSmallIntegerField(default=0, verbose_name='Шард')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значення')),
+            ],
+            options={
+                'verbose_name': 'Лічильник сайту',
+                'verbose_name_plural': 'Лічильники сайту',
+                'constraints': [models.UniqueConstraint(fields=('name', 'shard'), name='unique_site_counter_shard')],
+            },
+        ),
+        migrations.RunPython(seed_site_counters, migrations.RunPython.noop),
+    ]
@@ -162,6 +162,11 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at', 'is_read']),
             models.Index(fields=['user', 'is_read']),
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx',
+            ),
         ]
     
     def __str__(self):
@@ -170,6 +175,42 @@ class Notification(models.Model):
     def mark_as_read(self):
         if not self.is_read:
             from django.utils import timezone
+            from .notifications import decrement_unread_count
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
\ No newline at end of file
+            self.save(update_fields=['is_read', 'read_at'])
+            decrement_unread_count(self.user_id)
+
+class ProcessingCursor(models.Model):
+    """
+    Watermark of a background job that consumes a table in primary key order
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name='Назва')
+    last_id = models.BigIntegerField(default=0, verbose_name='Останній оброблений ID')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Оновлено')
+
+    class Meta:
+        verbose_name = 'Курсор обробки'
+        verbose_name_plural = 'Курсори обробки'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+class SiteCounter(models.Model):
+    """
+    One shard of a site-wide counter; the counter value is the sum over its shards
+    """
+    name = models.CharField(max_length=50, verbose_name='Лічильник')
+    shard = models.PositiveSmallIntegerField(default=0, verbose_name='Шард')
+    value = models.BigIntegerField(default=0, verbose_name='Значення')
+
+    class Meta:
+        verbose_name = 'Лічильник сайту'
+        verbose_name_plural = 'Лічильники сайту'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'shard'], name='unique_site_counter_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}[{self.shard}] = {self.value}"
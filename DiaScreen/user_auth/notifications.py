@@ -0,0 +1,90 @@
+"""
+Per-user notification state kept in the cache.
+
+Every change to a user's notifications bumps the version, so waiting clients
+can detect news with a cache read instead of querying the database. The unread
+counter is maintained incrementally and reconciled from the database on a miss.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+NOTIFICATION_VERSION_KEY = 'notifications:version:{user_id}'
+NOTIFICATION_UNREAD_KEY = 'notifications:unread:{user_id}'
+
+
+def notification_version_key(user_id):
+    return NOTIFICATION_VERSION_KEY.format(user_id=user_id)
+
+
+def _initial_version():
+    # Time-based seed: after a cache eviction the new version never matches one a client already holds.
+    return int(time.time() * 1000)
+
+
+def get_notification_version(user_id):
+    key = notification_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_notification_version(user_id):
+    key = notification_version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_notification_version(user_id):
+    key = notification_version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def notification_unread_key(user_id):
+    return NOTIFICATION_UNREAD_KEY.format(user_id=user_id)
+
+
+def get_unread_count(user_id):
+    key = notification_unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        from .models import Notification
+
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        # The TTL bounds any drift from concurrent updates that raced with this reconcile.
+        cache.add(key, count, timeout=getattr(settings, 'NOTIFICATIONS_UNREAD_COUNT_TTL', 3600))
+    return count
+
+
+def increment_unread_count(user_id, delta=1):
+    """Adjust a cached counter; a missing counter is left for the next reconcile."""
+    key = notification_unread_key(user_id)
+    try:
+        if cache.incr(key, delta) < 0:
+            cache.delete(key)
+    except ValueError:
+        pass
+
+
+def decrement_unread_count(user_id, delta=1):
+    increment_unread_count(user_id, -delta)
+
+
+def reset_unread_count(user_id):
+    cache.set(notification_unread_key(user_id), 0, timeout=getattr(settings, 'NOTIFICATIONS_UNREAD_COUNT_TTL', 3600))
+
+
+def notifications_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return f"{request.user.pk}-{get_notification_version(request.user.pk)}"
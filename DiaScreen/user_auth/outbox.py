@@ -0,0 +1,64 @@
+"""
+Batched consumers that follow a table in primary key order.
+
+A ``ProcessingCursor`` remembers the last consumed primary key. Keys are
+allocated when a row is inserted, not when its transaction commits, so a slow
+transaction (a bulk import, a long request) can make a lower key visible after
+higher ones were consumed, and a plain ``pk > last_id`` watermark would skip it
+for good. ``consume_new_rows`` therefore only moves the cursor across rows
+whose ``created_at`` is older than a settle window and stops at the first
+younger row: a row can still be missed only if its transaction stays open for
+longer than the window after the insert.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ProcessingCursor
+
+
+def consume_new_rows(cursor_name, queryset, fields, handle, batch_size, settle_seconds, after_batch=None):
+    """
+    Feed settled rows of ``queryset`` past the cursor to ``handle`` in batches.
+
+    Each batch is a list of ``(pk, *fields)`` tuples in primary key order.
+    ``handle(rows)`` runs in the transaction that advances the cursor, so a
+    failure leaves the batch to the next run; ``after_batch(result)`` runs once
+    that transaction has committed. Returns the list of ``handle`` results.
+    """
+    results = []
+    while True:
+        cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+        with transaction.atomic():
+            cursor, _ = ProcessingCursor.objects.get_or_create(name=cursor_name)
+            cursor = ProcessingCursor.objects.select_for_update().get(pk=cursor.pk)
+
+            fetched = list(
+                queryset.filter(pk__gt=cursor.last_id)
+                .order_by('pk')
+                .values_list('pk', 'created_at', *fields)[:batch_size]
+            )
+            rows = []
+            for pk, created_at, *values in fetched:
+                if created_at > cutoff:
+                    break
+                rows.append((pk, *values))
+            if not rows:
+                return results
+
+            result = handle(rows)
+            cursor.last_id = rows[-1][0]
+            cursor.save(update_fields=['last_id', 'updated_at'])
+
+        results.append(result)
+        if after_batch is not None:
+            after_batch(result)
+        if len(rows) < batch_size:
+            return results
+
+
+def has_unconsumed_rows(cursor_name, queryset):
+    """Whether ``queryset`` has rows past the cursor, e.g. ones still inside the settle window."""
+    last_id = ProcessingCursor.objects.filter(name=cursor_name).values_list('last_id', flat=True).first() or 0
+    return queryset.filter(pk__gt=last_id).exists()
@@ -1,8 +1,11 @@
 import logging
-from decimal import Decimal
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from .alerts import schedule_glucose_alerts
 from .models import User, Patient, Address, Notification
+from .notifications import bump_notification_version, decrement_unread_count, increment_unread_count
+from .stats import COUNTED_MODELS, adjust_site_counter
 
 logger = logging.getLogger(__name__)
 
@@ -21,51 +24,49 @@ def create_patient(sender, instance, created, **kwargs):
                 logger.error(f"Error creating Patient for user {instance.username}: {e}")
 
 
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    """
+    Wake up clients waiting for this user's notifications
+    """
+    if created and not instance.is_read:
+        increment_unread_count(instance.user_id)
+    bump_notification_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        decrement_unread_count(instance.user_id)
+    bump_notification_version(instance.user_id)
+
+
 @receiver(post_save, sender='card.GlucoseMeasurement')
-def check_glucose_levels(sender, instance, created, **kwargs):
-
-    if not created:
-        return
-    
-    try:
-        patient = instance.patient
-        user = patient.user
-        glucose_value = float(instance.glucose)
-        
-        target_min = float(patient.target_glucose_min) if patient.target_glucose_min else 4.0
-        target_max = float(patient.target_glucose_max) if patient.target_glucose_max else 9.0
-        
-        if glucose_value < 3.5:
-            Notification.objects.create(
-                user=user,
-                title='⚠️ Критична гіпоглікемія!',
-                message=f'Рівень глюкози {glucose_value} ммоль/л є критично низьким. Негайно прийміть заходи!',
-                notification_type='danger',
-                link='/card/'
-            )
-        elif glucose_value < target_min:
-            Notification.objects.create(
-                user=user,
-                title='⚠️ Низький рівень глюкози',
-                message=f'Рівень глюкози {glucose_value} ммоль/л нижчий за цільовий діапазон ({target_min}-{target_max} ммоль/л).',
-                notification_type='warning',
-                link='/card/'
-            )
-        elif glucose_value > 15.0:
-            Notification.objects.create(
-                user=user,
-                title='🔴 Критична гіперглікемія!',
-                message=f'Рівень глюкози {glucose_value} ммоль/л є критично високим. Перевірте дозування інсуліну!',
-                notification_type='danger',
-                link='/card/'
-            )
-        elif glucose_value > target_max:
-            Notification.objects.create(
-                user=user,
-                title='⚠️ Високий рівень глюкози',
-                message=f'Рівень глюкози {glucose_value} ммоль/л вищий за цільовий діапазон ({target_min}-{target_max} ммоль/л).',
-                notification_type='warning',
-                link='/card/'
-            )
-    except Exception as e:
-        logger.error(f"Error creating glucose notification: {e}")
\ No newline at end of file
+def queue_glucose_alerts(sender, instance, created, raw=False, **kwargs):
+    """
+    Glucose alerts are evaluated in batches by ``user_auth.alerts``;
+    the insert itself only schedules a flush once it has committed.
+    """
+    if created and not raw:
+        transaction.on_commit(schedule_glucose_alerts)
+
+
+def _count_row(counter, delta):
+    # Applied after commit, so a rolled-back write never skews the counter.
+    transaction.on_commit(lambda: adjust_site_counter(counter, delta))
+
+
+def _connect_site_counter(counter, label):
+    def counter_saved(sender, instance, created, **kwargs):
+        if created:
+            _count_row(counter, 1)
+
+    def counter_deleted(sender, instance, **kwargs):
+        _count_row(counter, -1)
+
+    post_save.connect(counter_saved, sender=label, weak=False, dispatch_uid=f'site_counter_saved:{counter}')
+    post_delete.connect(counter_deleted, sender=label, weak=False, dispatch_uid=f'site_counter_deleted:{counter}')
+
+
+for _counter, _label in COUNTED_MODELS.items():
+    _connect_site_counter(_counter, _label)
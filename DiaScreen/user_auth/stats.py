@@ -0,0 +1,101 @@
+"""
+Site-wide statistics for the landing page.
+
+Row counts of the big tables are kept in sharded ``SiteCounter`` rows that
+signals adjust after each committed insert/delete, so the home page never runs
+``COUNT(*)`` over measurement tables. ``reconcile_site_counters`` periodically
+corrects drift against PostgreSQL's ``pg_class.reltuples`` estimate (or an
+exact count on other databases).
+"""
+import logging
+import random
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+
+from .models import SiteCounter
+
+logger = logging.getLogger(__name__)
+
+SITE_STATS_CACHE_KEY = 'site_stats'
+
+COUNTED_MODELS = {
+    'patients': 'user_auth.Patient',
+    'glucose': 'card.GlucoseMeasurement',
+    'insuline': 'card.InsulineDoseMeasurement',
+    'glycemic_profile': 'card.GlycemicProfileMeasurement',
+}
+
+
+def adjust_site_counter(name, delta):
+    """Add ``delta`` to a random shard of the counter so concurrent writers rarely contend."""
+    if not delta:
+        return
+    shard = random.randrange(getattr(settings, 'SITE_COUNTER_SHARDS', 8))
+    try:
+        updated = SiteCounter.objects.filter(name=name, shard=shard).update(value=F('value') + delta)
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                SiteCounter.objects.create(name=name, shard=shard, value=delta)
+        except IntegrityError:
+            SiteCounter.objects.filter(name=name, shard=shard).update(value=F('value') + delta)
+    except Exception as e:
+        logger.error(f"Error adjusting site counter {name}: {e}")
+
+
+def get_site_stats():
+    stats = cache.get(SITE_STATS_CACHE_KEY)
+    if stats is None:
+        totals = dict(
+            SiteCounter.objects.values('name').annotate(total=Sum('value')).values_list('name', 'total')
+        )
+        stats = {name: max(totals.get(name) or 0, 0) for name in COUNTED_MODELS}
+        cache.set(SITE_STATS_CACHE_KEY, stats, getattr(settings, 'SITE_STATS_CACHE_TTL', 300))
+    return stats
+
+
+def _estimated_count(model):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 (or 0) until the table has been vacuumed/analyzed.
+        if row and row[0] and row[0] > 0:
+            return row[0]
+    return model.objects.count()
+
+
+def reconcile_site_counters(tolerance=None):
+    """
+    Reset counters that drifted more than ``tolerance`` (a fraction) from the table estimate.
+
+    Returns the names of the counters that were reset.
+    """
+    if tolerance is None:
+        tolerance = getattr(settings, 'SITE_COUNTER_RECONCILE_TOLERANCE', 0.05)
+
+    current = dict(
+        SiteCounter.objects.values('name').annotate(total=Sum('value')).values_list('name', 'total')
+    )
+    reset = []
+    for name, label in COUNTED_MODELS.items():
+        estimate = _estimated_count(apps.get_model(label))
+        counted = current.get(name) or 0
+        if abs(estimate - counted) <= tolerance * max(estimate, 1) and name in current:
+            continue
+        with transaction.atomic():
+            SiteCounter.objects.filter(name=name).delete()
+            SiteCounter.objects.create(name=name, shard=0, value=estimate)
+        reset.append(name)
+
+    if reset:
+        cache.delete(SITE_STATS_CACHE_KEY)
+    return reset
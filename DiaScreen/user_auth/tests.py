@@ -1,8 +1,21 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from card.models import GlucoseMeasurement
 
+from . import alerts
+from .alerts import GLUCOSE_ALERTS_CURSOR, process_glucose_alerts
 from .forms import LoginForm, UserRegistrationForm
+from .models import Notification, ProcessingCursor, SiteCounter
+from .notifications import get_unread_count
+from .stats import get_site_stats, reconcile_site_counters
 
 
 User = get_user_model()
@@ -135,3 +148,180 @@ class LogoutViewTests(TestCase):
         response = self.client.post(reverse("logout"), follow=True)
         self.assertRedirects(response, reverse("home"))
         self.assertFalse(response.context["user"].is_authenticated)
+
+
+@override_settings(NOTIFICATIONS_LONG_POLL_TIMEOUT=0, NOTIFICATIONS_LONG_POLL_INTERVAL=0.01)
+class NotificationLongPollTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username="notified",
+            email="notified@example.com",
+            password="Notify12345",
+        )
+        self.client.force_login(self.user)
+
+    def test_wait_times_out_without_changes(self):
+        version = self.client.get(reverse("get_notifications")).json()["version"]
+        response = self.client.get(reverse("wait_for_notifications"), {"version": version})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["changed"])
+        self.assertEqual(response.json()["version"], version)
+
+    def test_wait_returns_new_notification(self):
+        version = self.client.get(reverse("get_notifications")).json()["version"]
+        Notification.objects.create(user=self.user, title="Тест", message="Повідомлення")
+
+        data = self.client.get(reverse("wait_for_notifications"), {"version": version}).json()
+        self.assertTrue(data["changed"])
+        self.assertEqual(data["unread_count"], 1)
+        self.assertEqual(data["notifications"][0]["title"], "Тест")
+        self.assertNotEqual(data["version"], version)
+
+    def test_mark_all_read_bumps_version(self):
+        Notification.objects.create(user=self.user, title="Тест", message="Повідомлення")
+        version = self.client.get(reverse("get_notifications")).json()["version"]
+        self.client.post(reverse("mark_all_notifications_read"))
+        data = self.client.get(reverse("wait_for_notifications"), {"version": version}).json()
+        self.assertTrue(data["changed"])
+        self.assertEqual(data["unread_count"], 0)
+
+    def test_unchanged_notifications_return_not_modified(self):
+        response = self.client.get(reverse("get_notifications"))
+        etag = response["ETag"]
+
+        cached = self.client.get(reverse("get_notifications"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        Notification.objects.create(user=self.user, title="Тест", message="Повідомлення")
+        changed = self.client.get(reverse("get_notifications"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["unread_count"], 1)
+
+    def test_unread_counter_follows_mark_as_read(self):
+        first = Notification.objects.create(user=self.user, title="Перше", message="Повідомлення")
+        Notification.objects.create(user=self.user, title="Друге", message="Повідомлення")
+        self.assertEqual(self.client.get(reverse("get_notifications")).json()["unread_count"], 2)
+
+        self.client.post(reverse("mark_notification_read", args=[first.pk]))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user.pk), 1)
+
+
+@override_settings(GLUCOSE_ALERTS_SETTLE_SECONDS=0)
+class GlucoseAlertOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="alerted",
+            email="alerted@example.com",
+            password="Alerted12345",
+        )
+        self.patient = self.user.profile
+
+    def _reading(self, value, when=None):
+        when = timezone.localtime(when or timezone.now())
+        return GlucoseMeasurement.objects.create(
+            patient=self.patient,
+            glucose=Decimal(value),
+            date_of_measurement=when.date(),
+            time_of_measurement=when.time(),
+        )
+
+    def test_glucose_insert_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self._reading("2.8")
+        self.assertFalse(Notification.objects.exists())
+
+    def test_batch_creates_alerts_and_deduplicates(self):
+        self._reading("2.8")
+        self._reading("3.1")
+        self._reading("6.0")
+        self._reading("16.2")
+
+        self.assertEqual(process_glucose_alerts(), 2)
+        titles = set(Notification.objects.values_list("title", flat=True))
+        self.assertEqual(titles, {"⚠️ Критична гіпоглікемія!", "🔴 Критична гіперглікемія!"})
+        self.assertEqual(get_unread_count(self.user.pk), 2)
+
+        self._reading("2.9")
+        self.assertEqual(process_glucose_alerts(), 0)
+
+    @override_settings(GLUCOSE_ALERTS_SETTLE_SECONDS=60)
+    def test_cursor_stops_at_the_first_unsettled_reading(self):
+        early = self._reading("2.8")
+        late = self._reading("16.2")
+        GlucoseMeasurement.objects.filter(pk=late.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        # The lower id is still inside the settle window, so nothing behind it is consumed either.
+        self.assertEqual(process_glucose_alerts(), 0)
+        self.assertEqual(ProcessingCursor.objects.get(name=GLUCOSE_ALERTS_CURSOR).last_id, 0)
+
+        GlucoseMeasurement.objects.filter(pk=early.pk).update(created_at=timezone.now() - timedelta(minutes=4))
+        self.assertEqual(process_glucose_alerts(), 2)
+        self.assertEqual(ProcessingCursor.objects.get(name=GLUCOSE_ALERTS_CURSOR).last_id, late.pk)
+
+    @override_settings(GLUCOSE_ALERTS_SETTLE_SECONDS=60, GLUCOSE_ALERTS_BACKGROUND_FLUSH=True)
+    def test_flush_rearms_itself_while_readings_are_settling(self):
+        reading = self._reading("2.8")
+        with mock.patch('user_auth.alerts.connection'), mock.patch('user_auth.alerts.threading.Timer') as timer:
+            alerts._flush_glucose_alerts()
+            self.assertEqual(timer.call_count, 1)
+            self.assertFalse(Notification.objects.exists())
+
+            alerts._flush_timer = None
+            GlucoseMeasurement.objects.filter(pk=reading.pk).update(created_at=timezone.now() - timedelta(minutes=2))
+            alerts._flush_glucose_alerts()
+            self.assertEqual(timer.call_count, 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_back_dated_readings_are_skipped(self):
+        self._reading("2.5", when=timezone.now() - timedelta(days=30))
+        self.assertEqual(process_glucose_alerts(), 0)
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(GLUCOSE_ALERTS_BACKGROUND_FLUSH=False)
+class SiteStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _create_user(self, username):
+        with self.captureOnCommitCallbacks(execute=True):
+            return User.objects.create_user(
+                username=username,
+                email=f"{username}@example.com",
+                password="Counted12345",
+            )
+
+    def test_counters_follow_committed_inserts_and_deletes(self):
+        user = self._create_user("counted")
+        with self.captureOnCommitCallbacks(execute=True):
+            reading = GlucoseMeasurement.objects.create(
+                patient=user.profile,
+                glucose=Decimal("5.5"),
+                date_of_measurement=timezone.localdate(),
+                time_of_measurement=timezone.localtime().time(),
+            )
+        self.assertEqual(get_site_stats(), {"patients": 1, "glucose": 1, "insuline": 0, "glycemic_profile": 0})
+
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            reading.delete()
+        self.assertEqual(get_site_stats()["glucose"], 0)
+
+    def test_home_serves_cached_counters(self):
+        self._create_user("visitor")
+        self.client.get(reverse("home"))
+        with self.assertNumQueries(0):
+            response = Client().get(reverse("home"))
+        self.assertEqual(response.context["patient_count"], 1)
+
+    def test_reconcile_resets_drifted_counter(self):
+        self._create_user("drifted")
+        SiteCounter.objects.filter(name="patients").update(value=40)
+
+        self.assertIn("patients", reconcile_site_counters())
+        self.assertEqual(get_site_stats()["patients"], 1)
+        self.assertEqual(SiteCounter.objects.filter(name="patients").count(), 1)
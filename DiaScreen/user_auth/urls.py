@@ -11,6 +11,7 @@ from .views import (
     profile_edit,
     glucose_target_settings,
     get_notifications,
+    wait_for_notifications,
     mark_notification_read,
     mark_all_notifications_read,
 )
@@ -60,6 +61,7 @@ urlpatterns = [
         name='password_reset_complete',
     ),
     path('api/notifications/', get_notifications, name='get_notifications'),
+    path('api/notifications/wait/', wait_for_notifications, name='wait_for_notifications'),
     path('api/notifications/<int:notification_id>/read/', mark_notification_read, name='mark_notification_read'),
     path('api/notifications/read-all/', mark_all_notifications_read, name='mark_all_notifications_read'),
 ]
\ No newline at end of file
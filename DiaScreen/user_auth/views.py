@@ -1,35 +1,42 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import timedelta
 import json
+import time
+
+from asgiref.sync import sync_to_async
 
 from django.contrib import messages
 from django.contrib.auth import login, logout
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 
 from support.models import SupportTicket
-from card.models import (
-    GlucoseMeasurement,
-    InsulineDoseMeasurement,
-    GlycemicProfileMeasurement,
-)
+from card.snapshots import get_latest_snapshot
 
 from .forms import LoginForm, UserRegistrationForm, PatientProfileForm, GlucoseTargetForm
 from .models import Patient, Notification
+from .notifications import (
+    aget_notification_version,
+    bump_notification_version,
+    get_notification_version,
+    get_unread_count,
+    notifications_etag,
+    reset_unread_count,
+)
+from .stats import get_site_stats
 
 
 def home(request):
-    patient_count = Patient.objects.count()
-    total_entries = (
-        GlucoseMeasurement.objects.count()
-        + InsulineDoseMeasurement.objects.count()
-        + GlycemicProfileMeasurement.objects.count()
-    )
+    site_stats = get_site_stats()
+    patient_count = site_stats['patients']
+    total_entries = site_stats['glucose'] + site_stats['insuline'] + site_stats['glycemic_profile']
 
-    latest_glucose = None
-    latest_insuline = None
+    latest_snapshot = None
     daily_status = None
     patient_profile = None
     target_min_value = 4.0
@@ -44,24 +51,10 @@ def home(request):
             if patient_profile.target_glucose_max is not None:
                 target_max_value = float(patient_profile.target_glucose_max)
 
-            latest_glucose = (
-                GlucoseMeasurement.objects.filter(patient=patient_profile)
-                .order_by('-date_of_measurement', '-time_of_measurement')
-                .first()
-            )
-            latest_insuline = (
-                InsulineDoseMeasurement.objects.filter(patient=patient_profile)
-                .order_by('-date_of_measurement', '-time')
-                .first()
-            )
-            latest_glycemic = (
-                GlycemicProfileMeasurement.objects.filter(patient=patient_profile)
-                .order_by('-measurement_date', '-measurement_time')
-                .first()
-            )
+            latest_snapshot = get_latest_snapshot(patient_profile)
 
-            if latest_glucose:
-                glucose_value = float(latest_glucose.glucose)
+            if latest_snapshot.glucose_at:
+                glucose_value = float(latest_snapshot.glucose_value)
                 target_min = target_min_value
                 target_max = target_max_value
 
@@ -84,8 +77,8 @@ def home(request):
                         'message': 'Сьогодні рівень глюкози перевищує ціль. Перевірте свої показники.',
                         'css_class': 'bg-danger-subtle text-danger',
                     }
-            elif latest_glycemic:
-                avg_glucose = float(latest_glycemic.average_glucose)
+            elif latest_snapshot.glycemic_at:
+                avg_glucose = float(latest_snapshot.glycemic_average_glucose)
                 if target_min_value <= avg_glucose <= target_max_value:
                     daily_status = {
                         'type': 'success',
@@ -130,8 +123,7 @@ def home(request):
     context = {
         'patient_count': patient_count,
         'total_entries': total_entries,
-        'latest_glucose': latest_glucose,
-        'latest_insuline': latest_insuline,
+        'latest_snapshot': latest_snapshot,
         'patient_profile': patient_profile,
         'daily_status': daily_status,
         'target_glucose_min': target_min_value,
@@ -217,35 +209,9 @@ def profile_view(request):
 
     last_measurement_message = None
     if patient:
-        last_glucose = (
-            GlucoseMeasurement.objects.filter(patient=patient)
-            .order_by('-date_of_measurement', '-time_of_measurement')
-            .first()
-        )
-        last_insuline = (
-            InsulineDoseMeasurement.objects.filter(patient=patient)
-            .order_by('-date_of_measurement', '-time')
-            .first()
-        )
-
-        latest_dt = None
-        current_tz = timezone.get_current_timezone()
-
-        if last_glucose:
-            combined = datetime.combine(
-                last_glucose.date_of_measurement,
-                last_glucose.time_of_measurement,
-            )
-            latest_dt = timezone.make_aware(combined, current_tz)
-
-        if last_insuline:
-            combined = datetime.combine(
-                last_insuline.date_of_measurement,
-                last_insuline.time,
-            )
-            candidate = timezone.make_aware(combined, current_tz)
-            if latest_dt is None or candidate > latest_dt:
-                latest_dt = candidate
+        snapshot = get_latest_snapshot(patient)
+        moments = [moment for moment in (snapshot.glucose_at, snapshot.insuline_at) if moment is not None]
+        latest_dt = max(moments) if moments else None
 
         if latest_dt is None:
             last_measurement_message = 'Ви ще не додали жодного заміру. Памʼятайте оновлювати дані для точнішого моніторингу.'
@@ -306,16 +272,14 @@ def glucose_target_settings(request):
     return render(request, 'auth/glucose_targets.html', {'form': form})
 
 
-@login_required
-@require_http_methods(["GET"])
-def get_notifications(request):
-    unread_count = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    ).count()
+def build_notifications_payload(user):
+    # Read the version first: anything created after it bumps the version past what we report.
+    version = get_notification_version(user.pk)
+
+    unread_count = get_unread_count(user.pk)
     
     notifications = Notification.objects.filter(
-        user=request.user
+        user=user
     ).order_by('-created_at')[:10]
     
     notifications_data = [
@@ -331,11 +295,50 @@ def get_notifications(request):
         for notif in notifications
     ]
     
-    return JsonResponse({
+    return {
         'success': True,
+        'version': version,
         'unread_count': unread_count,
         'notifications': notifications_data,
-    })
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=notifications_etag)
+def get_notifications(request):
+    return JsonResponse(build_notifications_payload(request.user))
+
+
+@login_required
+@require_http_methods(["GET"])
+async def wait_for_notifications(request):
+    """
+    Long-poll: hold the request until the user's notification version moves past
+    ``?version=`` or the timeout passes. Waiting only reads the cache.
+    """
+    user = await request.auser()
+    timeout = getattr(settings, 'NOTIFICATIONS_LONG_POLL_TIMEOUT', 25)
+    interval = getattr(settings, 'NOTIFICATIONS_LONG_POLL_INTERVAL', 1.0)
+
+    try:
+        client_version = int(request.GET.get('version', ''))
+    except ValueError:
+        client_version = None
+
+    deadline = time.monotonic() + timeout
+    version = await aget_notification_version(user.pk)
+    while version == client_version and time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        version = await aget_notification_version(user.pk)
+
+    if version == client_version:
+        return JsonResponse({'success': True, 'changed': False, 'version': version})
+
+    payload = await sync_to_async(build_notifications_payload)(user)
+    payload['changed'] = True
+    return JsonResponse(payload)
 
 
 @login_required
@@ -362,4 +365,7 @@ def mark_all_notifications_read(request):
         is_read=True,
         read_at=timezone.now()
     )
+    reset_unread_count(request.user.pk)
+    if updated:
+        bump_notification_version(request.user.pk)
     return JsonResponse({'success': True, 'updated_count': updated})
\ No newline at end of file